@@ -0,0 +1,134 @@
+import asyncio
+import os
+import shutil
+import sudoku_async
+import sudoku_bank
+import sudoku_benchmark
+import sudoku_generator
+import sudoku_solver
+import tempfile
+import time
+
+
+def _get_hard_sudoku(name):
+  for hard_name, sudoku in sudoku_benchmark.get_hard_corpus():
+    if hard_name == name:
+      return sudoku
+  raise RuntimeError('Testing failed, no hard sudoku {}.'.format(name))
+
+
+async def _solve_concurrently(api, sudokus):
+  return await asyncio.gather(*[api.solve(sudoku) for sudoku in sudokus])
+
+
+def test_solve():
+  sudokus = [sudoku for _, sudoku in sudoku_benchmark.get_hard_corpus()]
+  expected = []
+  for sudoku in sudokus:
+    clone = sudoku.clone()
+    sudoku_solver.SudokuSolver().solve(clone)
+    expected.append(clone.to_line())
+  api = sudoku_async.AsyncSudoku(max_concurrency=2)
+  clones = [sudoku.clone() for sudoku in sudokus]
+  solutions = asyncio.run(_solve_concurrently(api, sudokus))
+  # The API is used in another event loop too.
+  solutions += asyncio.run(_solve_concurrently(api, clones))
+  api.close()
+  for sudoku, solution, line in zip(sudokus + clones, solutions,
+                                    expected * 2):
+    if solution is None or sudoku.to_line() != line:
+      raise RuntimeError('Testing failed, wrong solution {}.'.format(
+          sudoku.to_line()))
+  print('Tests of async solving passed.')
+
+
+async def _cancel_solve(api, sudoku):
+  task = asyncio.ensure_future(api.solve(sudoku, simple=True))
+  await asyncio.sleep(0.2)
+  task.cancel()
+  try:
+    await task
+    raise RuntimeError('Testing failed, solving is not cancelled.')
+  except asyncio.CancelledError:
+    pass
+
+
+def test_cancel():
+  sudoku = _get_hard_sudoku('easter_monster')
+  line = sudoku.to_line()
+  api = sudoku_async.AsyncSudoku(max_concurrency=1)
+  asyncio.run(_cancel_solve(api, sudoku))
+  start = time.monotonic()
+  # Waits for the aborted solve to free the thread.
+  api.close()
+  if time.monotonic() - start > 1:
+    raise RuntimeError('Testing failed, cancelled solving is not aborted.')
+  if sudoku.to_line() != line:
+    raise RuntimeError('Testing failed, cancelled solving changed the sudoku.')
+  print('Tests of async cancelling passed.')
+
+
+def test_timeout():
+  sudoku = _get_hard_sudoku('easter_monster')
+  line = sudoku.to_line()
+  api = sudoku_async.AsyncSudoku()
+  try:
+    asyncio.run(api.solve(sudoku, timeout=0.1, simple=True))
+    raise RuntimeError('Testing failed, solving is not timed out.')
+  except sudoku_solver.BudgetExceededError:
+    pass
+  api.close()
+  if sudoku.to_line() != line:
+    raise RuntimeError('Testing failed, timed out solving changed the sudoku.')
+  print('Tests of async timeout passed.')
+
+
+async def _get_sudokus(api, levels):
+  return await asyncio.gather(*[api.get_sudoku(level) for level in levels])
+
+
+def test_get_sudoku():
+  levels = ['EASY', 'MEDIUM', 'HARD', 'EASY']
+  api = sudoku_async.AsyncSudoku(sudoku_generator.SudokuGenerator())
+  sudokus = asyncio.run(_get_sudokus(api, levels))
+  solver = sudoku_solver.SudokuSolver()
+  for sudoku in sudokus:
+    nr_solutions, _ = solver.count_solutions(sudoku)
+    if nr_solutions != 1:
+      raise RuntimeError('Testing failed, sudoku has {} solutions.'.format(
+          nr_solutions))
+  try:
+    asyncio.run(api.get_sudoku('IMPOSSIBLE'))
+    raise RuntimeError('Testing failed, invalid level is accepted.')
+  except ValueError:
+    pass
+  api.close()
+  print('Tests of async generating passed.')
+
+
+def test_bank():
+  # The bank is opened here and used from the threads of the thread pool.
+  temp_dir = tempfile.mkdtemp()
+  try:
+    with sudoku_bank.SudokuBank(os.path.join(temp_dir, 'bank.db')) as bank:
+      generator = sudoku_generator.SudokuGenerator(bank=bank)
+      generator.fill_bank(1, max_nr_generations=10)
+      nr_sudokus = bank.count('EASY')
+      api = sudoku_async.AsyncSudoku(generator)
+      sudokus = asyncio.run(_get_sudokus(api, ['EASY'] * 4))
+      api.close()
+      if None in sudokus or bank.count('EASY') != max(nr_sudokus - 4, 0):
+        raise RuntimeError('Testing failed, {} of {} sudokus left.'.format(
+            bank.count('EASY'), nr_sudokus))
+  finally:
+    shutil.rmtree(temp_dir)
+  print('Tests of async bank passed.')
+
+
+def test_async():
+  test_solve()
+  test_cancel()
+  test_timeout()
+  test_get_sudoku()
+  test_bank()
+  print('All tests passed.')
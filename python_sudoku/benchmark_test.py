@@ -0,0 +1,51 @@
+import sudoku_benchmark
+import sudoku_solver
+
+
+def test_hard_sudokus():
+  solver = sudoku_solver.SudokuSolver()
+  for name, sudoku in sudoku_benchmark.get_hard_corpus():
+    nr_solutions, _ = solver.count_solutions(sudoku)
+    if nr_solutions != 1:
+      raise RuntimeError('Testing failed, {} has {} solutions.'.format(
+          name, nr_solutions))
+  print('Tests of hard sudokus passed.')
+
+
+def test_run_benchmark():
+  # A 25x25 sudoku with few spaces is solved by every engine in time.
+  results = sudoku_benchmark.run_benchmark(
+      repeats=1,
+      nr_generated=1,
+      modes=['fast_dlx', 'partial_bitmask'],
+      large_timeout=60,
+      large_sudokus=((5, 100),))
+  if sorted(results['solver']) != ['fast_dlx', 'partial_bitmask']:
+    raise RuntimeError('Testing failed, wrong modes {}.'.format(
+        sorted(results['solver'])))
+  nr_sudokus = results['nr_sudokus'] + results['nr_hard_sudokus']
+  for mode, result in results['solver'].items():
+    if (result['nr_solves'] != nr_sudokus or result['nr_not_solvable'] or
+        result['p50_ms'] > result['p99_ms']):
+      raise RuntimeError('Testing failed, wrong results of {}: {}'.format(
+          mode, result))
+  for engine in sudoku_benchmark.LARGE_ENGINES:
+    result = results['large'][engine]['25x25_100']
+    if result['budget_exceeded']:
+      raise RuntimeError('Testing failed, 25x25 sudoku not solved by {}.'.format(
+          engine))
+  if len(results['generator']) != 4:
+    raise RuntimeError('Testing failed, wrong generator results {}.'.format(
+        results['generator']))
+  try:
+    sudoku_benchmark.run_benchmark(modes=['slow'])
+    raise RuntimeError('Testing failed, invalid mode is accepted.')
+  except ValueError:
+    pass
+  print('Tests of running benchmark passed.')
+
+
+def test_benchmark():
+  test_hard_sudokus()
+  test_run_benchmark()
+  print('All tests passed.')
@@ -0,0 +1,89 @@
+import sudoku_benchmark
+import sudoku_cache
+import sudoku_solver
+
+
+def test_solve():
+  cache = sudoku_cache.SolutionCache()
+  solver = sudoku_solver.SudokuSolver()
+  for _, sudoku in sudoku_benchmark.get_hard_corpus():
+    solved = sudoku.clone()
+    moves = cache.solve(solved, solver)
+    clone = sudoku.clone()
+    # No solver is needed when the solution is cached.
+    cached_moves = cache.solve(clone, None)
+    if clone != solved or sorted(cached_moves) != sorted(moves):
+      raise RuntimeError('Testing failed, wrong cached solution {}.'.format(
+          clone.to_line()))
+    # A sudoku filled in with the solution is solved from the cache.
+    row, col, value = moves[0]
+    clone = sudoku.clone()
+    clone.set(row, col, value)
+    if cache.get_solved_sudoku(clone, sudoku) != solved:
+      raise RuntimeError('Testing failed, filled in sudoku is not cached.')
+    hint = cache.get_hint(clone, sudoku)
+    if hint is None or solved.get(hint[0], hint[1]) != hint[2]:
+      raise RuntimeError('Testing failed, wrong hint {}.'.format(hint))
+    # A sudoku with a wrong number doesn't agree with the solution.
+    clone.set(row, col, '1' if value != '1' else '2')
+    if cache.get_solved_sudoku(clone, sudoku) is not None:
+      raise RuntimeError('Testing failed, wrong number agrees with solution.')
+  if cache.nr_hits != 12 or cache.nr_misses != 8:
+    raise RuntimeError('Testing failed, {} hits and {} misses.'.format(
+        cache.nr_hits, cache.nr_misses))
+  print('Tests of cached solving passed.')
+
+
+def test_puzzle():
+  cache = sudoku_cache.SolutionCache()
+  solver = sudoku_solver.SudokuSolver()
+  _, puzzle = sudoku_benchmark.get_hard_corpus()[0]
+  solved = puzzle.clone()
+  moves = solver.solve(solved)
+  sudoku = puzzle.clone()
+  for row, col, value in moves[:3]:
+    sudoku.set(row, col, value)
+  cache.solve(sudoku.clone(), solver, puzzle)
+  # Solving a sudoku filled in differently is found by its puzzle.
+  sudoku = puzzle.clone()
+  for row, col, value in moves[-3:]:
+    sudoku.set(row, col, value)
+  if cache.get_solved_sudoku(sudoku) is not None:
+    raise RuntimeError('Testing failed, found without puzzle.')
+  if cache.get_solved_sudoku(sudoku, puzzle) != solved:
+    raise RuntimeError('Testing failed, not found by puzzle.')
+  value = solved.get(0, 1)
+  solved.set(0, 1, ' ')
+  if cache.get_hint(solved, puzzle) != (0, 1, value):
+    raise RuntimeError('Testing failed, wrong hint of last space.')
+  print('Tests of cached puzzles passed.')
+
+
+def test_eviction():
+  sudokus = [sudoku for _, sudoku in sudoku_benchmark.get_hard_corpus()]
+  cache = sudoku_cache.SolutionCache(max_entries=3)
+  for sudoku in sudokus:
+    cache.put(sudoku, sudoku)
+  if len(cache) != 3 or cache.get_solved_sudoku(sudokus[0]) is not None:
+    raise RuntimeError('Testing failed, least recently used is not evicted.')
+  # Using a solution keeps it from eviction.
+  cache.get_solved_sudoku(sudokus[1])
+  cache.put(sudokus[0], sudokus[0])
+  if (cache.get_solved_sudoku(sudokus[1]) is None or
+      cache.get_solved_sudoku(sudokus[2]) is not None):
+    raise RuntimeError('Testing failed, recently used is evicted.')
+  cache = sudoku_cache.SolutionCache(max_bytes=81 * 2 * 2)
+  for sudoku in sudokus:
+    cache.put(sudoku, sudoku)
+    cache.put(sudoku, sudoku)
+  if len(cache) != 2 or cache.nr_bytes != 81 * 2 * 2:
+    raise RuntimeError('Testing failed, {} solutions in {} bytes.'.format(
+        len(cache), cache.nr_bytes))
+  print('Tests of cache eviction passed.')
+
+
+def test_caches():
+  test_solve()
+  test_puzzle()
+  test_eviction()
+  print('All tests passed.')
@@ -0,0 +1,75 @@
+import random
+import sudoku_benchmark
+import sudoku_candidates
+import sudoku_data
+import sudoku_solver
+
+
+def check_grid(grid, sudoku):
+  """Compares a grid with the possible numbers and conflicts of a sudoku."""
+  geometry = sudoku.geometry
+  if grid.sudoku != sudoku:
+    raise RuntimeError('Testing failed, sudoku {} out of sync.'.format(
+        grid.sudoku.to_line()))
+  nr_spaces = 0
+  for row, col in geometry.cell_locations:
+    value = sudoku.get(row, col)
+    for symbol in geometry.symbols:
+      if grid.is_valid_value(row, col, symbol) != sudoku.is_valid_value(
+          row, col, symbol):
+        raise RuntimeError('Testing failed, {} at {} {} in {}.'.format(
+            symbol, row, col, sudoku.to_line()))
+    if value == ' ':
+      nr_spaces += 1
+      candidates = [
+          symbol for symbol in geometry.symbols
+          if sudoku.is_valid_value(row, col, symbol)
+      ]
+      conflict = False
+    else:
+      candidates = []
+      conflict = not sudoku.is_valid_value(row, col, value)
+    if grid.get_candidates(row, col) != candidates:
+      raise RuntimeError('Testing failed, candidates {} at {} {}.'.format(
+          grid.get_candidates(row, col), row, col))
+    if grid.is_conflict(row, col) != conflict:
+      raise RuntimeError('Testing failed, conflict at {} {}.'.format(row, col))
+  if grid.nr_spaces != nr_spaces or grid.is_solved() != sudoku.is_solved():
+    raise RuntimeError('Testing failed, {} spaces and solved {}.'.format(
+        grid.nr_spaces, grid.is_solved()))
+
+
+def test_edits(sudoku, nr_edits):
+  random.seed(1)
+  geometry = sudoku.geometry
+  solved = sudoku.clone()
+  sudoku_solver.SudokuSolver().solve(solved)
+  grid = sudoku_candidates.CandidateGrid(sudoku)
+  sudoku = sudoku.clone()
+  check_grid(grid, sudoku)
+  for edit in range(nr_edits):
+    row, col = random.choice(geometry.cell_locations)
+    # Mostly numbers of the solution, sometimes any number or a space.
+    if edit % 3 == 0:
+      value = random.choice(geometry.symbols + ' ')
+    else:
+      value = solved.get(row, col)
+    grid.set(row, col, value)
+    sudoku.set(row, col, value)
+    check_grid(grid, sudoku)
+  # Filling in the solution solves the sudoku.
+  for row, col in geometry.cell_locations:
+    grid.set(row, col, solved.get(row, col))
+  check_grid(grid, solved)
+  if not grid.is_solved():
+    raise RuntimeError('Testing failed, solution not solved.')
+
+
+def test_grids():
+  _, sudoku = sudoku_benchmark.get_hard_corpus()[0]
+  test_edits(sudoku, 200)
+  print('Tests of editing candidates passed.')
+  test_edits(sudoku_data.SudokuData(2), 50)
+  test_edits(sudoku_data.SudokuData(4), 50)
+  print('Tests of candidates of box sizes passed.')
+  print('All tests passed.')
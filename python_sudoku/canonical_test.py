@@ -0,0 +1,89 @@
+import io_test
+import os
+import sudoku_canonical
+import sudoku_data
+import sudoku_solver
+import time
+
+
+def test_transforms(sudokus):
+  for sudoku in sudokus:
+    key, transform = sudoku_canonical.canonicalize(sudoku)
+    if transform.apply(sudoku).to_line().replace('.', '0') != key:
+      raise RuntimeError('Testing failed, {} is not transformed to {}.'.format(
+          sudoku.to_line(), key))
+    for _ in range(3):
+      random_transform = sudoku_canonical.random_transform()
+      equivalent = random_transform.apply(sudoku)
+      if random_transform.inverse().apply(equivalent) != sudoku:
+        raise RuntimeError('Testing failed, {} is not transformed back.'.format(
+            equivalent.to_line()))
+      if sudoku_canonical.get_canonical_key(equivalent) != key:
+        raise RuntimeError(
+            'Testing failed, {} and {} have different canonical keys.'.format(
+                sudoku.to_line(), equivalent.to_line()))
+  print('Tests of canonical transforms passed.')
+
+
+def test_sparse():
+  # Sparse sudokus have many symmetric candidates, which must be pruned.
+  lines = (
+      '.' * 81,
+      '5' + '.' * 80,
+      '.' * 40 + '7' + '.' * 40,
+      '12' + '.' * 38 + '3' + '.' * 39 + '4',
+  )
+  sudokus = []
+  for line in lines:
+    sudoku = sudoku_data.SudokuData()
+    sudoku.from_line(line)
+    sudokus.append(sudoku)
+  start = time.time()
+  test_transforms(sudokus)
+  seconds = time.time() - start
+  # Each sudoku is canonicalized 4 times.
+  if seconds > 10:
+    raise RuntimeError(
+        'Testing failed, sparse sudokus are canonicalized in {:.1f}s.'.format(
+            seconds))
+  if sudoku_canonical.get_canonical_key(sudokus[0]) != '0' * 81:
+    raise RuntimeError('Testing failed, the empty sudoku is changed.')
+  print('Tests of sparse sudokus passed.')
+
+
+def test_canonical_index(sudokus):
+  index = sudoku_canonical.CanonicalIndex()
+  solver = sudoku_solver.SudokuSolver()
+  for sudoku in sudokus:
+    solved_sudoku = sudoku.clone()
+    solver.solve(solved_sudoku, engine='bitmask')
+    if not index.add(sudoku, solved_sudoku):
+      raise RuntimeError('Testing failed, {} is in the index.'.format(
+          sudoku.to_line()))
+  for sudoku in sudokus:
+    equivalent = sudoku_canonical.random_transform().apply(sudoku)
+    if index.add(equivalent):
+      raise RuntimeError('Testing failed, {} is not in the index.'.format(
+          equivalent.to_line()))
+    nr_spaces = equivalent.to_line().count('.')
+    expected = equivalent.clone()
+    solver.solve(expected, engine='bitmask')
+    # The solver is not used since the solution is in the index.
+    solution = index.solve(equivalent, None)
+    if equivalent != expected or len(solution) != nr_spaces:
+      raise RuntimeError('Testing failed, {} is not solved from the index.'
+                         .format(equivalent.to_line()))
+  print('Tests of canonical index passed.')
+
+
+def test_canonical():
+  data_path = 'python_sudoku/test_data'
+  if not os.path.exists(data_path):
+    data_path = 'test_data'
+    if not os.path.exists(data_path):
+      raise RuntimeError('No test_data directory found.')
+  sudokus = io_test.read_test_sudokus(data_path)
+  test_transforms(sudokus)
+  test_sparse()
+  test_canonical_index(sudokus)
+  print('All tests passed.')
@@ -1,3 +1,9 @@
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import sudoku_bank
+import sudoku_data
 import sudoku_generator
 import sudoku_solver
 
@@ -15,10 +21,140 @@ def test_generator(generator, level):
   if not solution:
     print('Can not solve the generated sudoku.')
     passed = False
+  nr_solutions, _ = solver.count_solutions(sudoku)
+  if nr_solutions != 1:
+    print('The generated sudoku has more than one solution.')
+    passed = False
   if not passed:
     raise RuntimeError('Test for {} level failed.'.format(level))
 
 
+def test_background_generator():
+  generator = sudoku_generator.SudokuGenerator()
+  generator.start_background_generation()
+  try:
+    for _ in range(5):
+      test_generator(generator, 'EASY')
+    sudoku = generator.get_sudoku(level='MEDIUM', block=False)
+    if sudoku is not None and generator.get_sudoku_level(sudoku) != 'MEDIUM':
+      raise RuntimeError('Test for background generation failed.')
+    # Without waiting, the sudoku is generated in the calling thread.
+    sudoku = generator.get_sudoku(level='CHALLENGER', timeout=0)
+    # Callers in other threads take sudokus of the same cache.
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+      sudokus = [sudoku] + list(executor.map(
+          lambda level: generator.get_sudoku(level=level, timeout=0),
+          ['CHALLENGER'] * 4))
+    solver = sudoku_solver.SudokuSolver()
+    for sudoku in sudokus:
+      if sudoku is None or solver.count_solutions(sudoku)[0] != 1:
+        raise RuntimeError('Test for background generation timeout failed.')
+  finally:
+    generator.stop_background_generation()
+  print('Tests for background generation passed.')
+
+
+def test_derivation():
+  generator = sudoku_generator.SudokuGenerator(nr_derivations=10)
+  sudoku = generator.get_sudoku(level='HARD')
+  level = generator.get_sudoku_level(sudoku)
+  sudokus = generator.derive_sudokus(sudoku, 10)
+  keys = {derived.to_bytes() for derived in sudokus}
+  if len(sudokus) != 10 or len(keys) != 10 or sudoku.to_bytes() in keys:
+    raise RuntimeError('Test for derivation failed, sudokus are not distinct.')
+  solver = sudoku_solver.SudokuSolver()
+  for derived in sudokus:
+    if generator.get_sudoku_level(derived) != level:
+      raise RuntimeError('Test for derivation failed, level changed.')
+    if solver.count_solutions(derived)[0] != 1:
+      raise RuntimeError('Test for derivation failed, not one solution.')
+  for _ in range(5):
+    test_generator(generator, 'HARD')
+  print('Tests for derivation passed.')
+
+
+def test_bank():
+  temp_dir = tempfile.mkdtemp()
+  try:
+    bank_file = os.path.join(temp_dir, 'bank.db')
+    with sudoku_bank.SudokuBank(bank_file) as bank:
+      generator = sudoku_generator.SudokuGenerator(bank=bank)
+      nr_added = generator.fill_bank(2, max_nr_generations=20)
+      if nr_added != bank.count():
+        raise RuntimeError('Test for bank failed, {} of {} added.'.format(
+            bank.count(), nr_added))
+      level = max(sudoku_bank._LEVELS, key=bank.count)
+      # Every sudoku is drawn once, as drawn sudokus are removed.
+      nr_drawn = bank.count(level)
+      lines = set()
+      for _ in range(nr_drawn):
+        lines.add(bank.draw(level).to_line())
+      if len(lines) != nr_drawn or bank.count(level) or bank.draw(level):
+        raise RuntimeError('Test for bank failed, {} of {} drawn.'.format(
+            len(lines), nr_drawn))
+      sudoku = sudoku_data.SudokuData()
+      sudoku.from_line(lines.pop())
+      if not bank.add(sudoku, level, 0):
+        raise RuntimeError('Test for bank failed, drawn sudoku not added.')
+      if bank.add(sudoku, level, 0):
+        raise RuntimeError('Test for bank failed, duplicate sudoku added.')
+      try:
+        bank.add(sudoku_data.SudokuData(box_size=4), level, 0)
+      except ValueError:
+        pass
+      else:
+        raise RuntimeError('Test for bank failed, box size 4 added.')
+    # Sudokus are served from the reopened bank without generating.
+    with sudoku_bank.SudokuBank(bank_file) as bank:
+      nr_kept = nr_added - nr_drawn + 1
+      if bank.count() != nr_kept or bank.count(level) != 1:
+        raise RuntimeError('Test for bank failed, {} of {} kept.'.format(
+            bank.count(), nr_kept))
+      # Another bank on the same file sees the sudokus drawn and added by this
+      # one.
+      with sudoku_bank.SudokuBank(bank_file) as other_bank:
+        sudoku = other_bank.draw(level)
+        if sudoku is None or bank.draw(level) is not None:
+          raise RuntimeError('Test for bank failed, last sudoku drawn twice.')
+        other_sudoku = sudoku_data.SudokuData()
+        other_sudoku.from_line(lines.pop())
+        if (not bank.add(sudoku, level, 0) or
+            not other_bank.add(other_sudoku, level, 0) or
+            other_bank.add(sudoku, level, 0)):
+          raise RuntimeError('Test for bank failed, not added by two banks.')
+        drawn = {bank.draw(level), other_bank.draw(level)}
+        if drawn != {sudoku, other_sudoku} or bank.count(level):
+          raise RuntimeError('Test for bank failed, {} drawn by two banks.'
+                             .format(drawn))
+      generator = sudoku_generator.SudokuGenerator(bank=bank)
+      test_generator(generator, 'EASY')
+  finally:
+    shutil.rmtree(temp_dir)
+  print('Tests for bank passed.')
+
+
+def test_box_sizes():
+  generator = sudoku_generator.SudokuGenerator(box_size=2)
+  for _ in range(5):
+    test_generator(generator, 'EASY')
+  sudoku = generator.get_sudoku(level='EASY')
+  if sudoku.box_size != 2 or generator.derive_sudokus(sudoku, 3):
+    raise RuntimeError('Test for box size 2 failed.')
+  # A 16x16 sudoku takes seconds to make, so only one is made.
+  generator = sudoku_generator.SudokuGenerator(box_size=4)
+  sudoku, _ = generator._make_sudoku('EASY')
+  nr_solutions, _ = sudoku_solver.SudokuSolver().count_solutions(sudoku)
+  if sudoku.box_size != 4 or nr_solutions != 1:
+    raise RuntimeError('Test for box size 4 failed.')
+  try:
+    sudoku_generator.SudokuGenerator(bank=object(), box_size=4)
+  except ValueError:
+    pass
+  else:
+    raise RuntimeError('Test for box sizes failed, bank accepted.')
+  print('Tests for box sizes passed.')
+
+
 def test_generators():
   generator = sudoku_generator.SudokuGenerator()
   for _ in range(40):
@@ -33,4 +169,8 @@ def test_generators():
   for _ in range(3):
     test_generator(generator, 'CHALLENGER')
   print('Tests for CHALLENGER level passed.')
+  test_background_generator()
+  test_derivation()
+  test_bank()
+  test_box_sizes()
   print('All tests passed.')
@@ -0,0 +1,75 @@
+import sudoku_benchmark
+import sudoku_cache
+import sudoku_data
+import sudoku_hint
+import sudoku_solver
+
+
+def test_hints():
+  cache = sudoku_cache.SolutionCache()
+  solver = sudoku_solver.SudokuSolver()
+  for name, puzzle in sudoku_benchmark.get_hard_corpus():
+    solved = puzzle.clone()
+    solver.solve(solved)
+    session = sudoku_hint.HintSession(
+        puzzle, puzzle=puzzle, solver=solver, cache=cache)
+    techniques = set()
+    while True:
+      hint = session.get_hint()
+      if hint is None:
+        break
+      row, col, value, technique = hint
+      if solved.get(row, col) != value:
+        raise RuntimeError('Testing failed, wrong hint {} of {}.'.format(
+            hint, name))
+      techniques.add(technique)
+      session.set(row, col, value)
+    if session.sudoku != solved or 'solution' not in techniques:
+      raise RuntimeError('Testing failed, {} not solved by hints.'.format(name))
+  # The sudokus are solved once, later hints are from the cached solutions.
+  if cache.nr_misses != len(sudoku_benchmark.get_hard_corpus()):
+    raise RuntimeError('Testing failed, {} sudokus solved.'.format(
+        cache.nr_misses))
+  print('Tests of hints passed.')
+
+
+def test_edits():
+  _, puzzle = sudoku_benchmark.get_hard_corpus()[0]
+  session = sudoku_hint.HintSession(puzzle)
+  row, col, value, technique = session.get_hint()
+  # A hint is the same after filling in and erasing another number.
+  other_row, other_col = (row + 1) % 9, col
+  while puzzle.get(other_row, other_col) != ' ':
+    other_row = (other_row + 1) % 9
+  for other_value in '123456789':
+    if puzzle.is_valid_value(other_row, other_col, other_value):
+      break
+  session.set(other_row, other_col, other_value)
+  session.set(other_row, other_col, ' ')
+  if session.get_hint() != (row, col, value, technique):
+    raise RuntimeError('Testing failed, hint changed after erasing.')
+  # A repeated number makes the sudoku not solvable.
+  for other_value in '123456789':
+    if not puzzle.is_valid_value(row, col, other_value):
+      break
+  session.set(row, col, other_value)
+  if session.is_solvable() or session.get_hint() is not None:
+    raise RuntimeError('Testing failed, conflict not found.')
+  session.set(row, col, value)
+  if not session.is_solvable():
+    raise RuntimeError('Testing failed, conflict not removed.')
+  # Sudokus of other box sizes have hints too.
+  sudoku = sudoku_data.SudokuData(4)
+  session = sudoku_hint.HintSession(sudoku)
+  for _ in range(sudoku.geometry.nr_cells):
+    row, col, value, _ = session.get_hint()
+    session.set(row, col, value)
+  if not session.sudoku.is_solved() or session.get_hint() is not None:
+    raise RuntimeError('Testing failed, 16x16 sudoku not solved by hints.')
+  print('Tests of editing hints passed.')
+
+
+def test_hint_sessions():
+  test_hints()
+  test_edits()
+  print('All tests passed.')
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import sudoku_data
+import sudoku_io
+import solver_test
+
+
+def read_test_sudokus(data_path):
+  path = os.path.join(data_path, 'full')
+  sudokus = []
+  for file_name in sorted(os.listdir(path)):
+    sudoku, expected_solution = solver_test.read_data_file(
+        os.path.join(path, file_name))
+    if expected_solution is not None:
+      sudokus.append(sudoku)
+  return sudokus
+
+
+def compare_sudokus(file_name, sudokus, expected_sudokus):
+  if len(sudokus) != len(expected_sudokus):
+    print('Mismatch found for {}.'.format(file_name))
+    print('Expected {} sudokus. Actual {}'.format(
+        len(expected_sudokus), len(sudokus)))
+    raise RuntimeError('Testing failed.')
+  for sudoku, expected_sudoku in zip(sudokus, expected_sudokus):
+    if sudoku != expected_sudoku:
+      print('Mismatch found for {}.'.format(file_name))
+      print('Expected sudoku: {}'.format(expected_sudoku.to_line()))
+      print('Actual sudoku: {}'.format(sudoku.to_line()))
+      raise RuntimeError('Testing failed.')
+
+
+def test_read_write(temp_dir, sudokus, file_name, format):
+  full_name = os.path.join(temp_dir, file_name)
+  sudoku_io.write_sudokus(full_name, sudokus, format=format)
+  if sudoku_io.detect_format(full_name) != format:
+    raise RuntimeError('Testing failed, format of {} is not {}.'.format(
+        full_name, format))
+  compare_sudokus(full_name, list(sudoku_io.read_sudokus(full_name)), sudokus)
+  print('Tests of reading and writing {!r} passed.'.format(file_name))
+
+
+def test_solve_file(temp_dir, sudokus, file_name, format, workers):
+  input_name = os.path.join(temp_dir, file_name)
+  output_name = os.path.join(temp_dir, 'solved_' + file_name)
+  sudoku_io.write_sudokus(input_name, sudokus, format=format)
+  nr_sudokus, nr_not_solvable = sudoku_io.solve_file(
+      input_name, output_name, workers=workers)
+  if nr_sudokus != len(sudokus) or nr_not_solvable != 0:
+    raise RuntimeError('Testing failed, {} of {} sudokus solved.'.format(
+        nr_sudokus - nr_not_solvable, len(sudokus)))
+  solved_sudokus = list(sudoku_io.read_sudokus(output_name, format=format))
+  for solved_sudoku, sudoku in zip(solved_sudokus, sudokus):
+    if not solved_sudoku.is_solved():
+      raise RuntimeError('Testing failed, {} is not solved.'.format(
+          solved_sudoku.to_line()))
+    for row in range(9):
+      for col in range(9):
+        value = sudoku.get(row, col)
+        if value != ' ' and solved_sudoku.get(row, col) != value:
+          raise RuntimeError('Testing failed, {} is not solution of {}.'.format(
+              solved_sudoku.to_line(), sudoku.to_line()))
+  print('Tests of solving {!r} with {} workers passed.'.format(
+      file_name, workers))
+
+
+def test_line_format():
+  sudoku = sudoku_data.SudokuData()
+  sudoku.from_line('0' * 40 + '5' + '.' * 40)
+  if sudoku.get(4, 4) != '5' or sudoku.get(0, 0) != ' ':
+    raise RuntimeError('Testing failed, line is not loaded correctly.')
+  if sudoku.to_line() != '.' * 40 + '5' + '.' * 40:
+    raise RuntimeError('Testing failed, line is not saved correctly.')
+  print('Tests of line format passed.')
+
+
+def test_io():
+  data_path = 'python_sudoku/test_data'
+  if not os.path.exists(data_path):
+    data_path = 'test_data'
+    if not os.path.exists(data_path):
+      raise RuntimeError('No test_data directory found.')
+  sudokus = read_test_sudokus(data_path)
+  test_line_format()
+  temp_dir = tempfile.mkdtemp()
+  try:
+    test_read_write(temp_dir, sudokus, 'sudokus.txt', 'line')
+    test_read_write(temp_dir, sudokus, 'sudokus.txt.gz', 'line')
+    test_read_write(temp_dir, sudokus, 'sudokus.data', 'comma')
+    test_read_write(temp_dir, sudokus, 'sudokus.data.gz', 'comma')
+    test_solve_file(temp_dir, sudokus, 'sudokus.txt', 'line', 1)
+    test_solve_file(temp_dir, sudokus, 'sudokus.data.gz', 'comma', 2)
+  finally:
+    shutil.rmtree(temp_dir)
+  print('All tests passed.')
@@ -0,0 +1,96 @@
+import collections
+import os
+import solver_test
+import sudoku_benchmark
+import sudoku_rating
+import sudoku_solver
+
+
+def test_rating(file_name, expected_level):
+  sudoku, _ = solver_test.read_data_file(file_name)
+  original = sudoku.clone()
+  rating = sudoku_rating.rate_sudoku(sudoku)
+  if sudoku != original:
+    raise RuntimeError('Testing failed, {} is changed.'.format(file_name))
+  if rating.level != expected_level:
+    print('Mismatch found for {}.'.format(file_name))
+    print('Expected level: {}. Actual {}'.format(expected_level, rating))
+    raise RuntimeError('Testing failed.')
+  if expected_level == 'CHALLENGER':
+    if not rating.nr_guesses:
+      raise RuntimeError('Testing failed, {} is solved without guesses.'.format(
+          file_name))
+  elif rating.nr_guesses or not rating.technique_counts['hidden_single']:
+    raise RuntimeError('Testing failed, techniques of {} are not counted. {}'
+                       .format(file_name, rating))
+  print('Tests of rating {!r} passed.'.format(file_name))
+
+
+def test_level_limits():
+  max_scores = sudoku_rating._LEVEL_MAX_SCORES
+  for index, (level, max_score) in enumerate(max_scores):
+    next_level = sudoku_rating.LEVELS[index + 1]
+    if (sudoku_rating.get_level(max_score) != level or
+        sudoku_rating.get_level(max_score + 1) != next_level):
+      raise RuntimeError('Testing failed, {} ends at {}.'.format(
+          level, max_score))
+    # The same sudoku solved with an extra round is harder.
+    rating = sudoku_rating.Rating(
+        collections.Counter(hidden_single=max_score), 0, 0)
+    harder = sudoku_rating.Rating(
+        collections.Counter(hidden_single=max_score), 1, 0)
+    if rating.level != level or harder.level != next_level:
+      raise RuntimeError('Testing failed, {} and {} are misrated.'.format(
+          rating, harder))
+  print('Tests of level limits passed.')
+
+
+def test_untuned_ratings():
+  # The sudokus are not used to set the level limits. Filling in the solution
+  # step by step must not make a sudoku harder.
+  solver = sudoku_solver.SudokuSolver()
+  for name, sudoku in sudoku_benchmark.get_hard_corpus():
+    solution = sudoku.clone()
+    solver.solve(solution, engine='bitmask')
+    levels = []
+    for row in range(sudoku.size):
+      for col in range(sudoku.size):
+        if sudoku.get(row, col) == ' ':
+          sudoku.set(row, col, solution.get(row, col))
+          levels.append(sudoku_rating.rate_sudoku(sudoku).level)
+    indexes = [sudoku_rating.LEVELS.index(level) for level in levels]
+    if (levels[0] != 'CHALLENGER' or levels[-1] != 'EASY' or
+        indexes != sorted(indexes, reverse=True)):
+      raise RuntimeError('Testing failed, levels of {} are {}.'.format(
+          name, levels))
+  print('Tests of untuned ratings passed.')
+
+
+def test_ratings():
+  data_path = 'python_sudoku/test_data'
+  if not os.path.exists(data_path):
+    data_path = 'test_data'
+    if not os.path.exists(data_path):
+      raise RuntimeError('No test_data directory found.')
+  path = os.path.join(data_path, 'full')
+  test_rating(os.path.join(path, 'easy.data'), 'EASY')
+  test_rating(os.path.join(path, 'hard_411.data'), 'HARD')
+  test_rating(os.path.join(path, 'hard_413.data'), 'HARD')
+  test_rating(os.path.join(path, 'challenger.data'), 'CHALLENGER')
+  test_rating(os.path.join(path, 'challenger_1.data'), 'CHALLENGER')
+  scores = [sudoku_rating.rate_sudoku(
+      solver_test.read_data_file(os.path.join(path, file_name))[0]).score
+            for file_name in ('easy.data', 'hard_411.data', 'challenger.data')]
+  if scores != sorted(scores):
+    raise RuntimeError('Testing failed, scores {} are not increasing.'.format(
+        scores))
+  sudoku, _ = solver_test.read_data_file(
+      os.path.join(path, 'invalid_sudoku_row.data'))
+  try:
+    sudoku_rating.rate_sudoku(sudoku)
+    raise RuntimeError('Testing failed, an invalid sudoku is rated.')
+  except ValueError:
+    pass
+  test_level_limits()
+  test_untuned_ratings()
+  print('All tests passed.')
@@ -0,0 +1,145 @@
+import concurrent.futures
+import json
+import sudoku_benchmark
+import sudoku_data
+import sudoku_server
+import sudoku_solver
+import threading
+import urllib.error
+import urllib.request
+
+
+def _request(port, path, request=None):
+  """Sends a request, returning the HTTP status and the JSON response."""
+  data = None if request is None else json.dumps(request).encode('utf-8')
+  try:
+    with urllib.request.urlopen(
+        'http://localhost:{}{}'.format(port, path), data=data) as f:
+      return f.status, json.loads(f.read())
+  except urllib.error.HTTPError as e:
+    return e.code, json.loads(e.read())
+
+
+def test_backend():
+  backend = sudoku_server.SolvingBackend(workers=2, max_delay=0.05)
+  sudokus = [sudoku for _, sudoku in sudoku_benchmark.get_hard_corpus()] * 5
+  futures = [backend.submit('solve', sudoku) for sudoku in sudokus]
+  for sudoku, future in zip(sudokus, futures):
+    status, response = future.result()
+    clone = sudoku.clone()
+    sudoku_solver.SudokuSolver().solve(clone)
+    if status != 200 or response['solution'] != clone.to_line():
+      raise RuntimeError('Testing failed, wrong response {} {}.'.format(
+          status, response))
+  if backend.nr_requests != len(sudokus) or backend.nr_batches >= len(sudokus):
+    raise RuntimeError('Testing failed, {} requests in {} batches.'.format(
+        backend.nr_requests, backend.nr_batches))
+  try:
+    backend.submit('print', sudokus[0])
+    raise RuntimeError('Testing failed, invalid action is accepted.')
+  except ValueError:
+    pass
+  backend.close()
+  # Validating is limited by the nodes too.
+  backend = sudoku_server.SolvingBackend(workers=1, max_nodes=1)
+  empty = sudoku_data.SudokuData()
+  for action in sudoku_server._ACTIONS:
+    status, _ = backend.submit(action, empty).result()
+    if status != 503:
+      raise RuntimeError('Testing failed, {} of {} within 1 node.'.format(
+          status, action))
+  backend.close()
+  print('Tests of solving backend passed.')
+
+
+def _test_requests(port):
+  sudokus = [sudoku for _, sudoku in sudoku_benchmark.get_hard_corpus()]
+  with concurrent.futures.ThreadPoolExecutor(8) as executor:
+    responses = list(
+        executor.map(
+            lambda sudoku: _request(port, '/solve',
+                                    {'sudoku': sudoku.to_line()}), sudokus))
+  for sudoku, (status, response) in zip(sudokus, responses):
+    solution = response['solution']
+    if status != 200 or solution is None or '.' in solution:
+      raise RuntimeError('Testing failed, wrong response {} {}.'.format(
+          status, response))
+    status, response = _request(port, '/hint', {'sudoku': sudoku.to_line()})
+    row, col, value = response['hint']
+    if status != 200 or solution[row * 9 + col] != value:
+      raise RuntimeError('Testing failed, wrong hint {}.'.format(response))
+    status, response = _request(port, '/validate',
+                                {'sudoku': sudoku.to_line()})
+    if response != {'valid': True, 'solved': False, 'nr_solutions': 1}:
+      raise RuntimeError('Testing failed, wrong validation {}.'.format(response))
+    status, response = _request(port, '/validate', {'sudoku': solution})
+    if response != {'valid': True, 'solved': True, 'nr_solutions': 1}:
+      raise RuntimeError('Testing failed, wrong validation {}.'.format(response))
+  invalid = '11' + '.' * 79
+  invalid_responses = (
+      ('/solve', {'solution': None}),
+      ('/hint', {'hint': None}),
+      ('/validate', {'valid': False, 'solved': False, 'nr_solutions': 0}),
+  )
+  for path, expected in invalid_responses:
+    status, response = _request(port, path, {'sudoku': invalid})
+    if status != 200 or response != expected:
+      raise RuntimeError('Testing failed, wrong response {} of {}.'.format(
+          response, path))
+  status, response = _request(port, '/validate', {'sudoku': '.' * 81})
+  if response['nr_solutions'] != 2:
+    raise RuntimeError('Testing failed, wrong validation {}.'.format(response))
+  status, response = _request(port, '/generate?level=easy')
+  generated = sudoku_data.SudokuData()
+  generated.from_line(response['sudoku'])
+  nr_solutions, _ = sudoku_solver.SudokuSolver().count_solutions(generated)
+  if status != 200 or response['level'] != 'EASY' or nr_solutions != 1:
+    raise RuntimeError('Testing failed, wrong generated {}.'.format(response))
+  status, response = _request(port, '/generate', {'level': 'MEDIUM'})
+  if status != 200 or len(response['sudoku']) != 81:
+    raise RuntimeError('Testing failed, wrong generated {}.'.format(response))
+  bad_requests = (
+      ('/generate?level=IMPOSSIBLE', None, 400),
+      ('/solve', {'sudoku': '123'}, 400),
+      ('/solve', [], 400),
+      ('/print', {}, 404),
+      ('/print', None, 404),
+  )
+  for path, request, expected_status in bad_requests:
+    status, _ = _request(port, path, request)
+    if status != expected_status:
+      raise RuntimeError('Testing failed, status of {} is {} not {}.'.format(
+          path, status, expected_status))
+
+
+def test_server():
+  server = sudoku_server.SudokuServer(port=0, workers=2)
+  thread = threading.Thread(target=server.serve_forever)
+  thread.start()
+  try:
+    _test_requests(server.server_address[1])
+  finally:
+    server.shutdown()
+    thread.join()
+    server.server_close()
+  # Requests not done in time are answered with 504.
+  server = sudoku_server.SudokuServer(port=0, workers=1, request_timeout=0)
+  thread = threading.Thread(target=server.serve_forever)
+  thread.start()
+  try:
+    sudoku = sudoku_benchmark.get_hard_corpus()[0][1]
+    status, _ = _request(server.server_address[1], '/validate',
+                         {'sudoku': sudoku.to_line()})
+    if status != 504:
+      raise RuntimeError('Testing failed, status {} of timeout.'.format(status))
+  finally:
+    server.shutdown()
+    thread.join()
+    server.server_close()
+  print('Tests of sudoku server passed.')
+
+
+def test_servers():
+  test_backend()
+  test_server()
+  print('All tests passed.')
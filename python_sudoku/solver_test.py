@@ -1,6 +1,8 @@
 import os
+import pickle
 import sudoku_data
 import sudoku_solver
+import time
 
 
 def read_data_file(file_name):
@@ -48,7 +50,7 @@ def compare_sudoku(file_name, sudoku, original, solution):
         raise ValueError('Testing failed.')
 
 
-def test_solver(path, type):
+def test_solver(path, type, engine='set', use_trail=False, strategies=()):
   if type == 'partial':
     partial = True
     simple = False
@@ -63,11 +65,294 @@ def test_solver(path, type):
     sudoku, expected_solution = read_data_file(full_name)
     original = sudoku_data.SudokuData()
     original.copy(sudoku)
-    solution = sudoku_solver.SudokuSolver().solve(
-        sudoku, partial=partial, simple=simple)
+    solution = sudoku_solver.SudokuSolver(
+        use_trail=use_trail, strategies=strategies).solve(
+            sudoku, partial=partial, simple=simple, engine=engine)
     compare_solutions(full_name, solution, expected_solution)
     compare_sudoku(full_name, sudoku, original, solution)
-  print('Tests in {!r} with type {!r} passed.'.format(path, type))
+  print('Tests in {!r} with type {!r}, engine {!r}, trail {!r} and strategies '
+        '{!r} passed.'.format(path, type, engine, use_trail, strategies))
+
+
+def test_strategies(path):
+  for strategy in sudoku_solver.STRATEGIES:
+    test_solver(path, 'fast', strategies=(strategy,))
+  test_solver(path, 'fast', strategies=sudoku_solver.STRATEGIES)
+  test_solver(
+      path, 'fast', use_trail=True, strategies=sudoku_solver.STRATEGIES)
+  solver = sudoku_solver.SudokuSolver(randomize_type='min')
+  strategy_solver = sudoku_solver.SudokuSolver(
+      randomize_type='min', strategies=sudoku_solver.STRATEGIES)
+  nr_guesses = 0
+  nr_strategy_guesses = 0
+  for file_name in sorted(os.listdir(path)):
+    sudoku, expected_solution = read_data_file(os.path.join(path, file_name))
+    if expected_solution is None:
+      continue
+    solver.solve(sudoku.clone())
+    nr_guesses += solver.nr_guesses
+    strategy_solver.solve(sudoku.clone())
+    nr_strategy_guesses += strategy_solver.nr_guesses
+  if nr_strategy_guesses >= nr_guesses:
+    raise RuntimeError(
+        'Testing failed, {} guesses with strategies, {} without.'.format(
+            nr_strategy_guesses, nr_guesses))
+  try:
+    sudoku_solver.SudokuSolver(strategies=('swordfish',))
+    raise RuntimeError('Testing failed, invalid strategy is accepted.')
+  except ValueError:
+    pass
+  print('Tests of strategies in {!r} passed.'.format(path))
+
+
+def test_search(path):
+  for file_name in sorted(os.listdir(path)):
+    full_name = os.path.join(path, file_name)
+    sudoku, expected_solution = read_data_file(full_name)
+    original = sudoku.clone()
+    expected = sudoku.clone()
+    expected_moves = sudoku_solver.SudokuSolver(randomize_type='min').solve(
+        expected, engine='bitmask')
+    solver = sudoku_solver.SudokuSolver(randomize_type='min')
+    search = solver.start_search(sudoku)
+    nr_runs = 1
+    # Pause after every node, and use the solver in between.
+    while not search.run(max_nodes=1):
+      solver.solve(sudoku_data.SudokuData())
+      nr_runs += 1
+    if search.solution != expected_moves or sudoku != expected:
+      print('Mismatch found for {}.'.format(full_name))
+      print('Expected solution: {}'.format(expected_moves))
+      print('Actual solution: {}'.format(search.solution))
+      raise RuntimeError('Testing failed.')
+    if expected_solution is not None and nr_runs != search.nr_nodes:
+      raise RuntimeError('Testing failed, {} runs for {} nodes.'.format(
+          nr_runs, search.nr_nodes))
+    # A search of a solver collecting statistics counts in last_stats.
+    solver = sudoku_solver.SudokuSolver(
+        randomize_type='min', collect_stats=True)
+    search = solver.start_search(original)
+    search.run()
+    nr_eliminations = solver.last_stats.nr_eliminations
+    if (search.solution != expected_moves or solver.stats.nr_solves != 0 or
+        (expected_solution is not None and nr_eliminations == 0)):
+      raise RuntimeError('Testing failed, search with statistics.')
+  print('Tests of pausing searches in {!r} passed.'.format(path))
+
+
+def test_budget(path):
+  sudoku, _ = read_data_file(os.path.join(path, 'challenger.data'))
+  for engine in ('set', 'bitmask', 'stack', 'dlx'):
+    for budget in ({'max_nodes': 1}, {'deadline': time.monotonic()}):
+      original = sudoku.clone()
+      try:
+        sudoku_solver.SudokuSolver().solve(sudoku, engine=engine, **budget)
+        raise RuntimeError('Testing failed, {} is not exceeded by {}.'.format(
+            budget, engine))
+      except sudoku_solver.BudgetExceededError as e:
+        if sudoku != original:
+          raise RuntimeError('Testing failed, sudoku is not restored by {}.'
+                             .format(engine))
+        if e.stats.nr_budget_exceeded != 1:
+          raise RuntimeError('Testing failed, wrong statistics {}.'.format(
+              e.stats))
+  solver = sudoku_solver.SudokuSolver(collect_stats=True)
+  try:
+    solver.solve(sudoku, simple=True, max_nodes=10)
+    raise RuntimeError('Testing failed, max_nodes is not exceeded.')
+  except sudoku_solver.BudgetExceededError as e:
+    if e.stats is not solver.last_stats or solver.stats.nr_budget_exceeded != 1:
+      raise RuntimeError('Testing failed, wrong statistics {}.'.format(
+          solver.stats))
+  solution = solver.solve(
+      sudoku.clone(),
+      engine='bitmask',
+      deadline=time.monotonic() + 60,
+      max_nodes=100000)
+  if solution is None or solver.stats.nr_solves != 2:
+    raise RuntimeError('Testing failed, solving within the budget failed.')
+  solver.abort()
+  try:
+    solver.solve(sudoku, deadline=time.monotonic() + 60)
+    raise RuntimeError('Testing failed, solving is not aborted.')
+  except sudoku_solver.BudgetExceededError:
+    pass
+  # A solve without a budget is aborted too.
+  original = sudoku.clone()
+  try:
+    solver.solve(sudoku, engine='bitmask')
+    raise RuntimeError('Testing failed, solving without a budget is not '
+                       'aborted.')
+  except sudoku_solver.BudgetExceededError:
+    pass
+  if sudoku != original:
+    raise RuntimeError('Testing failed, aborted solving changed the sudoku.')
+  # The solver solves again after resetting the abort.
+  solver.reset_abort()
+  solution = solver.solve(sudoku, deadline=time.monotonic() + 60)
+  if solution is None or not sudoku.is_solved():
+    raise RuntimeError('Testing failed, solving after resetting abort failed.')
+  print('Tests of budgets in {!r} passed.'.format(path))
+
+
+def test_stats(path):
+  if sudoku_solver.SudokuSolver().stats is not None:
+    raise RuntimeError('Testing failed, statistics are collected by default.')
+  for engine in ('set', 'bitmask', 'dlx'):
+    solver = sudoku_solver.SudokuSolver(collect_stats=True)
+    total = sudoku_solver.SolverStats()
+    nr_sudokus = 0
+    for file_name in sorted(os.listdir(path)):
+      sudoku, _ = read_data_file(os.path.join(path, file_name))
+      solver.solve(sudoku, engine=engine)
+      if solver.last_stats.nr_guesses != solver.nr_guesses:
+        raise RuntimeError('Testing failed, guesses of {} are {} not {}.'.format(
+            file_name, solver.last_stats.nr_guesses, solver.nr_guesses))
+      total.merge(solver.last_stats)
+      nr_sudokus += 1
+    if total.to_dict() != solver.stats.to_dict():
+      raise RuntimeError('Testing failed, {} is not merged as {}.'.format(
+          solver.stats, total))
+    stats = solver.stats
+    if (stats.nr_solves != nr_sudokus or not stats.nr_not_solvable or
+        not stats.nr_initializations or not stats.phase_times['solve']):
+      raise RuntimeError('Testing failed, wrong statistics {}.'.format(stats))
+    if engine != 'dlx' and (not stats.nr_guesses or not stats.max_depth or
+                            not stats.nr_eliminations):
+      raise RuntimeError('Testing failed, wrong statistics {}.'.format(stats))
+  print('Tests of statistics in {!r} passed.'.format(path))
+
+
+def test_solve_many(path, workers, ordered):
+  file_names = sorted(os.listdir(path))
+  sudokus = []
+  expected_solutions = []
+  for file_name in file_names:
+    sudoku, expected_solution = read_data_file(os.path.join(path, file_name))
+    sudokus.append(sudoku)
+    expected_solutions.append(expected_solution)
+  indexes = []
+  for index, solution in sudoku_solver.solve_many(
+      sudokus, workers=workers, chunksize=3, ordered=ordered):
+    full_name = os.path.join(path, file_names[index])
+    compare_solutions(full_name, solution, expected_solutions[index])
+    indexes.append(index)
+  if sorted(indexes) != list(range(len(file_names))):
+    raise RuntimeError('Testing failed, solutions are missing.')
+  if ordered and indexes != sorted(indexes):
+    raise RuntimeError('Testing failed, solutions are not in order.')
+  print('Tests of solve many in {!r} with {} workers and ordered {!r} passed.'
+        .format(path, workers, ordered))
+
+
+def test_count_solutions(path):
+  for file_name in os.listdir(path):
+    full_name = os.path.join(path, file_name)
+    sudoku, expected_solution = read_data_file(full_name)
+    expected_count = 0 if expected_solution is None else 1
+    nr_solutions, location = sudoku_solver.SudokuSolver().count_solutions(
+        sudoku)
+    if nr_solutions != expected_count or location is not None:
+      print('Mismatch found for {}.'.format(full_name))
+      print('Expected {} solutions. Actual {} solutions at {}'.format(
+          expected_count, nr_solutions, location))
+      raise RuntimeError('Testing failed.')
+  # An empty sudoku has many solutions.
+  sudoku = sudoku_data.SudokuData()
+  nr_solutions, (row, col) = sudoku_solver.SudokuSolver().count_solutions(
+      sudoku, limit=3)
+  if nr_solutions != 3 or sudoku.get(row, col) != ' ':
+    raise RuntimeError('Testing failed, counted {} solutions at {}.'.format(
+        nr_solutions, (row, col)))
+  print('Tests of counting solutions in {!r} passed.'.format(path))
+
+
+def test_geometry(path):
+  for cell in range(81):
+    row, col = sudoku_data.CELL_LOCATIONS[cell]
+    peers = {
+        other for other in range(81) if other != cell and
+        (other // 9 == row or other % 9 == col or
+         (other // 27, other % 9 // 3) == (row // 3, col // 3))
+    }
+    if set(sudoku_data.CELL_PEERS[cell]) != peers or len(peers) != 20:
+      raise RuntimeError('Testing failed, wrong peers of {}.'.format(cell))
+    for unit, position in sudoku_data.CELL_UNITS[cell]:
+      if sudoku_data.UNITS[unit][position] != cell:
+        raise RuntimeError('Testing failed, wrong units of {}.'.format(cell))
+  for file_name in sorted(os.listdir(path)):
+    sudoku, _ = read_data_file(os.path.join(path, file_name))
+    for row in range(9):
+      for col in range(9):
+        for value in '123456789':
+          clone = sudoku.clone()
+          clone.set(row, col, value)
+          # The number at the location itself is not checked.
+          if (sudoku.is_valid() and
+              sudoku.is_valid_value(row, col, value) != clone.is_valid()):
+            raise RuntimeError('Testing failed, {} at {} {} in {}.'.format(
+                value, row, col, file_name))
+  print('Tests of geometry in {!r} passed.'.format(path))
+
+
+def test_box_sizes():
+  for box_size in (2, 4, 5):
+    geometry = sudoku_data.get_geometry(box_size)
+    size = geometry.size
+    nr_peers = 2 * (size - 1) + (box_size - 1)**2
+    if any(len(peers) != nr_peers for peers in geometry.cell_peers):
+      raise RuntimeError('Testing failed, wrong peers of box size {}.'.format(
+          box_size))
+    solver = sudoku_solver.SudokuSolver()
+    full_sudoku = sudoku_data.SudokuData(box_size)
+    solver.solve(full_sudoku, engine='bitmask')
+    if not full_sudoku.is_solved():
+      raise RuntimeError('Testing failed, box size {} not filled.'.format(
+          box_size))
+    # A location is emptied, so the sudoku has one solution.
+    sudoku = full_sudoku.clone()
+    sudoku.set(0, 0, ' ')
+    if solver.count_solutions(sudoku) != (1, None):
+      raise RuntimeError('Testing failed, box size {} not unique.'.format(
+          box_size))
+    # Every third location is emptied, still easy enough for every engine, but
+    # the sudoku may have more than one solution.
+    for cell in range(0, geometry.nr_cells, 3):
+      row, col = geometry.cell_locations[cell]
+      sudoku.set(row, col, ' ')
+    line = sudoku.to_line()
+    copy = sudoku_data.SudokuData(box_size)
+    copy.from_line(line)
+    if (copy.to_line() != line or
+        pickle.loads(pickle.dumps(sudoku)).to_line() != line):
+      raise RuntimeError('Testing failed, box size {} not kept.'.format(
+          box_size))
+    for engine in (None, 'bitmask', 'stack', 'dlx'):
+      clone = sudoku.clone()
+      solution = solver.solve(clone, engine=engine)
+      if (solution is None or not clone.is_solved() or
+          any(value not in ('.', solved)
+              for value, solved in zip(line, clone.to_line()))):
+        raise RuntimeError('Testing failed, box size {} with {}.'.format(
+            box_size, engine))
+  # The set engine and its strategies only solve box size 3.
+  sudoku = sudoku_data.SudokuData(4)
+  for solver, engine in ((sudoku_solver.SudokuSolver(), 'set'),
+                         (sudoku_solver.SudokuSolver(strategies=('x_wing',)),
+                          None)):
+    try:
+      solver.solve(sudoku, engine=engine)
+    except ValueError:
+      pass
+    else:
+      raise RuntimeError('Testing failed, box size 4 solved by set engine.')
+  try:
+    sudoku_data.SudokuData(6)
+  except ValueError:
+    pass
+  else:
+    raise RuntimeError('Testing failed, box size 6 accepted.')
+  print('Tests of box sizes passed.')
 
 
 def test_solvers():
@@ -76,7 +361,23 @@ def test_solvers():
     data_path = 'test_data'
     if not os.path.exists(data_path):
       raise RuntimeError('No test_data directory found.')
+  test_geometry(os.path.join(data_path, 'partial'))
   test_solver(os.path.join(data_path, 'partial'), 'partial')
   test_solver(os.path.join(data_path, 'full'), 'fast')
   test_solver(os.path.join(data_path, 'full'), 'simple')
+  test_solver(os.path.join(data_path, 'full'), 'fast', use_trail=True)
+  test_strategies(os.path.join(data_path, 'full'))
+  test_stats(os.path.join(data_path, 'full'))
+  test_budget(os.path.join(data_path, 'full'))
+  test_solver(os.path.join(data_path, 'partial'), 'partial', engine='bitmask')
+  test_solver(os.path.join(data_path, 'full'), 'fast', engine='bitmask')
+  test_solver(os.path.join(data_path, 'full'), 'fast', engine='dlx')
+  test_solver(os.path.join(data_path, 'partial'), 'partial', engine='stack')
+  test_solver(os.path.join(data_path, 'full'), 'fast', engine='stack')
+  test_search(os.path.join(data_path, 'full'))
+  test_count_solutions(os.path.join(data_path, 'full'))
+  test_solve_many(os.path.join(data_path, 'full'), 1, True)
+  test_solve_many(os.path.join(data_path, 'full'), 2, True)
+  test_solve_many(os.path.join(data_path, 'full'), 2, False)
+  test_box_sizes()
   print('Tests passed.')
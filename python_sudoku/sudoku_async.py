@@ -0,0 +1,124 @@
+"""Asyncio API of the sudoku solver and generator.
+
+Solving and generating run in an executor, so the event loop is not blocked,
+and at most a number of them run at a time. A cancelled solve is aborted at its
+next node when it's already running in a thread.
+"""
+
+import asyncio
+import concurrent.futures
+import sudoku_generator
+import sudoku_solver
+import time
+import weakref
+
+
+def _solve(solver, sudoku, deadline, solve_args):
+  """Solves a sudoku in a worker.
+
+  Returns:
+    A tuple of the solution and the solved sudoku.
+  """
+  solution = solver.solve(sudoku, deadline=deadline, **solve_args)
+  return solution, sudoku
+
+
+class AsyncSudoku(object):
+  """Class for solving and generating sudokus with asyncio."""
+
+  def __init__(self,
+               generator=None,
+               max_concurrency=4,
+               executor=None,
+               **solver_args):
+    """Creates the asyncio API.
+
+    Args:
+      generator: The sudoku_generator.SudokuGenerator to get sudokus from, a new
+        one if None.
+      max_concurrency: The maximum number of sudokus solved or generated at a
+        time.
+      executor: A concurrent.futures.Executor to solve sudokus in, a thread pool
+        of max_concurrency threads if None. With a process pool, running solves
+        are not aborted when cancelled, use a timeout instead. Sudokus are
+        always generated in the thread pool, as the generator is shared.
+      **solver_args: Arguments of sudoku_solver.SudokuSolver.
+    """
+    self._generator = generator or sudoku_generator.SudokuGenerator()
+    self._thread_pool = concurrent.futures.ThreadPoolExecutor(max_concurrency)
+    self._executor = executor or self._thread_pool
+    self._max_concurrency = max_concurrency
+    # The semaphore of every event loop the API is used in, as a semaphore is
+    # bound to the loop it's first waited in.
+    self._semaphores = weakref.WeakKeyDictionary()
+    self._solver_args = solver_args
+
+  def _get_semaphore(self):
+    """Gets the semaphore of the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = self._semaphores.get(loop)
+    if semaphore is None:
+      semaphore = asyncio.Semaphore(self._max_concurrency)
+      self._semaphores[loop] = semaphore
+    return semaphore
+
+  def close(self):
+    """Shuts down the thread pool, waiting for the running work."""
+    self._thread_pool.shutdown()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *unused_args):
+    self.close()
+
+  async def solve(self, sudoku, timeout=None, **solve_args):
+    """Solves a sudoku.
+
+    Args:
+      sudoku: A sudoku to solve. An object of sudoku_data.SudokuData. It is
+        filled in when solved, and not changed if cancelled or timed out.
+      timeout: The maximum number of seconds to solve, or None.
+      **solve_args: Other arguments of sudoku_solver.SudokuSolver.solve().
+
+    Returns:
+      Same as sudoku_solver.SudokuSolver.solve().
+
+    Raises:
+      sudoku_solver.BudgetExceededError: If the timeout or the max_nodes is
+        exceeded.
+      asyncio.CancelledError: If cancelled.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    solver = sudoku_solver.SudokuSolver(**self._solver_args)
+    async with self._get_semaphore():
+      loop = asyncio.get_running_loop()
+      future = loop.run_in_executor(self._executor, _solve, solver,
+                                    sudoku.clone(), deadline, solve_args)
+      try:
+        solution, solved_sudoku = await future
+      except asyncio.CancelledError:
+        solver.abort()
+        raise
+    if solution is not None:
+      sudoku.copy(solved_sudoku)
+    return solution
+
+  async def get_sudoku(self, level='EASY'):
+    """Gets a sudoku from the generator.
+
+    Args:
+      level: The level of the sudoku.
+
+    Returns:
+      Same as sudoku_generator.SudokuGenerator.get_sudoku().
+
+    Raises:
+      ValueError: If the level is not valid.
+      asyncio.CancelledError: If cancelled. A sudoku being generated is still
+        added to the generator for later.
+    """
+    async with self._get_semaphore():
+      loop = asyncio.get_running_loop()
+      return await loop.run_in_executor(self._thread_pool,
+                                        self._generator.get_sudoku, level)
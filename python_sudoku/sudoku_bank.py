@@ -0,0 +1,193 @@
+"""Persistent bank of generated sudokus.
+
+The sudokus are kept in a SQLite database indexed by level, number of clues and
+difficulty score. Every sudoku of a level has a slot number from 0 to the number
+of sudokus of the level, so a random sudoku of a level is drawn with a single
+index lookup. A drawn sudoku is removed, and the last sudoku of the level is
+moved to its slot.
+
+To fill the default bank used by the UI:
+
+  python3 sudoku_bank.py --min_sudokus 100
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sqlite3
+import sudoku_canonical
+import sudoku_data
+import sudoku_generator
+import threading
+
+# The bank used by the UI if it exists.
+DEFAULT_BANK_FILE = os.path.join(
+    os.path.expanduser('~'), '.magic_sudoku_bank.db')
+
+_LEVELS = ('EASY', 'MEDIUM', 'HARD', 'CHALLENGER')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sudokus (
+  id INTEGER PRIMARY KEY,
+  level TEXT NOT NULL,
+  slot INTEGER NOT NULL,
+  nr_clues INTEGER NOT NULL,
+  score REAL NOT NULL,
+  canonical_key TEXT NOT NULL UNIQUE,
+  sudoku TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS sudokus_level_slot ON sudokus (level, slot);
+CREATE INDEX IF NOT EXISTS sudokus_level_clues_score
+  ON sudokus (level, nr_clues, score);
+"""
+
+
+class SudokuBank(object):
+  """Class for a persistent bank of sudokus."""
+
+  def __init__(self, file_name):
+    """Opens a bank, creating it if it doesn't exist.
+
+    Args:
+      file_name: The name of the SQLite database file.
+    """
+    # The bank may be used from other threads, such as the thread pool of
+    # sudoku_async, so the connection is shared and guarded by a lock. The
+    # transactions are begun explicitly, see _transaction().
+    self._connection = sqlite3.connect(
+        file_name, isolation_level=None, check_same_thread=False)
+    self._lock = threading.Lock()
+    self._connection.executescript(_SCHEMA)
+
+  def close(self):
+    with self._lock:
+      self._connection.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *unused_args):
+    self.close()
+
+  @contextlib.contextmanager
+  def _transaction(self):
+    """Runs a write transaction on the connection.
+
+    The database is locked for writing from the start, so the sudokus counted
+    in the transaction are not changed by other banks on the same file until it
+    ends.
+
+    Yields:
+      The connection.
+    """
+    with self._lock:
+      self._connection.execute('BEGIN IMMEDIATE')
+      try:
+        yield self._connection
+      except BaseException:
+        self._connection.execute('ROLLBACK')
+        raise
+      self._connection.execute('COMMIT')
+
+  def _count(self, level):
+    """Gets the number of sudokus of a level, which is also the next slot."""
+    return self._connection.execute(
+        'SELECT COUNT(*) FROM sudokus WHERE level = ?', (level,)).fetchone()[0]
+
+  def count(self, level=None):
+    """Gets the number of sudokus of a level, or of all levels if None."""
+    with self._lock:
+      if level is None:
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM sudokus').fetchone()[0]
+      return self._count(level)
+
+  def add(self, sudoku, level, score):
+    """Adds a sudoku unless an equivalent one is already in the bank.
+
+    Args:
+      sudoku: The sudoku to add. An object of sudoku_data.SudokuData.
+      level: The level of the sudoku.
+      score: The difficulty score of the sudoku.
+
+    Returns:
+      True if the sudoku is added.
+
+    Raises:
+      ValueError: If the level is not valid, or the sudoku has another box size
+        than 3.
+    """
+    if level not in _LEVELS:
+      raise ValueError('Level {} is not valid.'.format(level))
+    if sudoku.box_size != 3:
+      raise ValueError('A bank only keeps sudokus with a box size of 3.')
+    line = sudoku.to_line()
+    canonical_key = sudoku_canonical.get_canonical_key(sudoku)
+    with self._transaction() as connection:
+      if connection.execute('SELECT 1 FROM sudokus WHERE canonical_key = ?',
+                            (canonical_key,)).fetchone():
+        return False
+      connection.execute(
+          'INSERT INTO sudokus '
+          '(level, slot, nr_clues, score, canonical_key, sudoku) '
+          'VALUES (?, ?, ?, ?, ?, ?)',
+          (level, self._count(level),
+           sudoku.geometry.nr_cells - line.count('.'), score, canonical_key,
+           line))
+    return True
+
+  def draw(self, level):
+    """Draws a random sudoku of a level, which is removed from the bank.
+
+    Args:
+      level: The level of the sudoku.
+
+    Returns:
+      A sudoku_data.SudokuData, or None if there is no sudoku of the level.
+    """
+    with self._transaction() as connection:
+      count = self._count(level)
+      if not count:
+        return None
+      slot = random.randrange(count)
+      row = connection.execute(
+          'SELECT sudoku FROM sudokus WHERE level = ? AND slot = ?',
+          (level, slot)).fetchone()
+      if row is None:
+        return None
+      connection.execute('DELETE FROM sudokus WHERE level = ? AND slot = ?',
+                         (level, slot))
+      # The last sudoku fills the slot, so the slots stay contiguous.
+      connection.execute(
+          'UPDATE sudokus SET slot = ? WHERE level = ? AND slot = ?',
+          (slot, level, count - 1))
+    sudoku = sudoku_data.SudokuData()
+    sudoku.from_line(row[0])
+    return sudoku
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Fills a bank of sudokus.')
+  parser.add_argument(
+      '--bank', default=DEFAULT_BANK_FILE, help='The bank file to fill.')
+  parser.add_argument(
+      '--min_sudokus',
+      type=int,
+      default=100,
+      help='Generates until every level has this number of sudokus.')
+  parser.add_argument(
+      '--max_generations',
+      type=int,
+      default=None,
+      help='The maximum number of sudokus to generate.')
+  args = parser.parse_args()
+  with SudokuBank(args.bank) as bank:
+    generator = sudoku_generator.SudokuGenerator(bank=bank)
+    generator.fill_bank(args.min_sudokus, args.max_generations)
+    for level in _LEVELS:
+      print('{}: {} sudokus'.format(level, bank.count(level)))
+
+
+if __name__ == '__main__':
+  main()
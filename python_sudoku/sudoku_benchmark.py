@@ -0,0 +1,307 @@
+"""Benchmark of the sudoku solver and generator.
+
+The solver is measured on a fixed corpus, the solvable sudokus in
+test_data/full and some well known hard sudokus, in every solve() mode, and on
+large sudokus with every engine solving them, within a timeout. The generator is
+measured for every level. The random numbers are seeded, so runs
+are comparable, and the results are written as JSON:
+
+  python3 sudoku_benchmark.py --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sudoku_data
+import sudoku_generator
+import sudoku_rating
+import sudoku_solver
+import sys
+import time
+
+# Well known hard sudokus, each has one solution.
+HARD_SUDOKUS = {
+    'inkala_2012': ('8..........36......7..9.2...5...7.......457.....1...3...1'
+                    '....68..85...1..9....4..'),
+    'ai_escargot': ('1....7.9..3..2...8..96..5....53..9...1..8...26....4...3..'
+                    '....1..4......7..7...3..'),
+    'easter_monster': ('1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7'
+                       '.....6...3...9.8...2.....1'),
+    'norvig_hardest': ('4.....8.5.3..........7......2.....6.....8.4......1.....'
+                       '..6.3.7.5..2.....1.4......'),
+}
+
+# The solve() modes to measure, each is a tuple of the name, the arguments of
+# SudokuSolver, the arguments of solve(), and whether to measure it on the hard
+# sudokus. The simple solver backtracks without removing any possible values,
+# which takes minutes on some hard sudokus.
+MODES = (
+    ('fast', {}, {}, True),
+    ('fast_trail', {'use_trail': True}, {}, True),
+    ('fast_strategies', {'strategies': sudoku_solver.STRATEGIES}, {}, True),
+    ('fast_bitmask', {}, {'engine': 'bitmask'}, True),
+    ('fast_stack', {}, {'engine': 'stack'}, True),
+    ('fast_dlx', {}, {'engine': 'dlx'}, True),
+    ('partial', {}, {'partial': True}, True),
+    ('partial_bitmask', {}, {'partial': True, 'engine': 'bitmask'}, True),
+    ('simple', {}, {'simple': True}, False),
+)
+
+
+# The large sudokus measured, each is a tuple of the box size and the number of
+# spaces, emptied at random locations of a random full sudoku.
+LARGE_SUDOKUS = ((4, 160), (5, 300))
+# The engines measured on the large sudokus, which solve every box size.
+LARGE_ENGINES = ('bitmask', 'stack', 'dlx')
+
+
+def get_test_data_path():
+  """Gets the path of test_data, from the repository or from this directory."""
+  data_path = 'python_sudoku/test_data'
+  if not os.path.exists(data_path):
+    data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'test_data')
+    if not os.path.exists(data_path):
+      raise RuntimeError('No test_data directory found.')
+  return data_path
+
+
+def read_corpus(data_path):
+  """Reads the solvable sudokus in test_data/full.
+
+  Returns:
+    A list of tuples of name and sudoku, sorted by name.
+  """
+  path = os.path.join(data_path, 'full')
+  corpus = []
+  for file_name in sorted(os.listdir(path)):
+    with open(os.path.join(path, file_name), 'r') as f:
+      lines = f.read().split('\n')
+    # The number of moves of the solution, -1 if not solvable.
+    if int(lines[9]) < 0:
+      continue
+    sudoku = sudoku_data.SudokuData()
+    sudoku.from_lines(lines)
+    corpus.append((file_name, sudoku))
+  return corpus
+
+
+def get_hard_corpus():
+  """Gets HARD_SUDOKUS as a list of tuples of name and sudoku."""
+  corpus = []
+  for name, line in sorted(HARD_SUDOKUS.items()):
+    sudoku = sudoku_data.SudokuData()
+    sudoku.from_line(line)
+    corpus.append((name, sudoku))
+  return corpus
+
+
+def get_large_corpus(seed, large_sudokus=LARGE_SUDOKUS):
+  """Makes the large sudokus, the same for the same seed.
+
+  Args:
+    seed: The seed of the random numbers.
+    large_sudokus: Tuples of the box size and the number of spaces.
+
+  Returns:
+    A list of tuples of name and sudoku.
+  """
+  random.seed(seed)
+  solver = sudoku_solver.SudokuSolver()
+  corpus = []
+  for box_size, nr_spaces in large_sudokus:
+    sudoku = sudoku_data.SudokuData(box_size)
+    solver.solve(sudoku)
+    geometry = sudoku.geometry
+    for cell in random.sample(range(geometry.nr_cells), nr_spaces):
+      row, col = geometry.cell_locations[cell]
+      sudoku.set(row, col, ' ')
+    corpus.append(('{0}x{0}_{1}'.format(sudoku.size, nr_spaces), sudoku))
+  return corpus
+
+
+def get_percentile(sorted_values, percentile):
+  """Gets a percentile of sorted values by the nearest rank."""
+  if not sorted_values:
+    return None
+  rank = max(1, -(-len(sorted_values) * percentile // 100))
+  return sorted_values[int(rank) - 1]
+
+
+def benchmark_mode(corpus, solver_args, solve_args, repeats, seed):
+  """Measures a solve() mode.
+
+  Returns:
+    A dictionary of the results.
+  """
+  random.seed(seed)
+  solver = sudoku_solver.SudokuSolver(**solver_args)
+  latencies = []
+  nr_not_solvable = 0
+  for _ in range(repeats):
+    for _, sudoku in corpus:
+      clone = sudoku.clone()
+      start = time.perf_counter()
+      solution = solver.solve(clone, **solve_args)
+      latencies.append(time.perf_counter() - start)
+      if solution is None:
+        nr_not_solvable += 1
+  total = sum(latencies)
+  latencies.sort()
+  return {
+      'nr_solves': len(latencies),
+      'nr_not_solvable': nr_not_solvable,
+      'seconds': total,
+      'solves_per_second': len(latencies) / total if total else None,
+      'p50_ms': get_percentile(latencies, 50) * 1000,
+      'p99_ms': get_percentile(latencies, 99) * 1000,
+  }
+
+
+def benchmark_large(corpus, engine, timeout):
+  """Measures an engine on the large sudokus, each within a timeout.
+
+  Returns:
+    A dictionary of the results of every sudoku.
+  """
+  solver = sudoku_solver.SudokuSolver()
+  results = {}
+  for name, sudoku in corpus:
+    start = time.perf_counter()
+    try:
+      solver.solve(
+          sudoku.clone(), engine=engine, deadline=time.monotonic() + timeout)
+      budget_exceeded = False
+    except sudoku_solver.BudgetExceededError:
+      budget_exceeded = True
+    results[name] = {
+        'seconds': time.perf_counter() - start,
+        'budget_exceeded': budget_exceeded,
+    }
+  return results
+
+
+def benchmark_generator(level, nr_sudokus, seed):
+  """Measures generating sudokus of a level with a new generator.
+
+  Returns:
+    A dictionary of the results.
+  """
+  random.seed(seed)
+  generator = sudoku_generator.SudokuGenerator()
+  start = time.perf_counter()
+  for _ in range(nr_sudokus):
+    generator.get_sudoku(level=level)
+  seconds = time.perf_counter() - start
+  return {
+      'nr_sudokus': nr_sudokus,
+      'seconds': seconds,
+      'sudokus_per_second': nr_sudokus / seconds if seconds else None,
+  }
+
+
+def run_benchmark(repeats=3,
+                  nr_generated=10,
+                  seed=0,
+                  modes=None,
+                  large_timeout=10,
+                  large_sudokus=LARGE_SUDOKUS):
+  """Runs the benchmark.
+
+  Args:
+    repeats: The number of times to solve the corpus in every mode.
+    nr_generated: The number of sudokus to generate for every level.
+    seed: The seed of the random numbers.
+    modes: The names of the modes in MODES to measure, all if None.
+    large_timeout: The maximum number of seconds to solve a large sudoku, or 0
+      to not measure the large sudokus.
+    large_sudokus: Tuples of the box size and the number of spaces of the large
+      sudokus.
+
+  Returns:
+    A dictionary of the results.
+
+  Raises:
+    ValueError: If a mode is not valid.
+  """
+  mode_names = [name for name, _, _, _ in MODES]
+  for mode in modes or ():
+    if mode not in mode_names:
+      raise ValueError('Mode {} is not valid.'.format(mode))
+  corpus = read_corpus(get_test_data_path())
+  hard_corpus = get_hard_corpus()
+  results = {
+      'python': platform.python_version(),
+      'seed': seed,
+      'repeats': repeats,
+      'nr_sudokus': len(corpus),
+      'nr_hard_sudokus': len(hard_corpus),
+      'solver': {},
+      'large': {},
+      'generator': {},
+  }
+  for name, solver_args, solve_args, with_hard in MODES:
+    if modes is not None and name not in modes:
+      continue
+    results['solver'][name] = benchmark_mode(
+        corpus + hard_corpus if with_hard else corpus, solver_args, solve_args,
+        repeats, seed)
+  if large_timeout:
+    large_corpus = get_large_corpus(seed, large_sudokus)
+    for engine in LARGE_ENGINES:
+      results['large'][engine] = benchmark_large(large_corpus, engine,
+                                                 large_timeout)
+  for level in sudoku_rating.LEVELS:
+    if nr_generated:
+      results['generator'][level] = benchmark_generator(
+          level, nr_generated, seed)
+  return results
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Benchmarks the sudoku solver and generator.')
+  parser.add_argument(
+      '--repeats',
+      type=int,
+      default=3,
+      help='The number of times to solve the corpus in every mode.')
+  parser.add_argument(
+      '--nr_generated',
+      type=int,
+      default=10,
+      help='The number of sudokus to generate for every level.')
+  parser.add_argument(
+      '--seed', type=int, default=0, help='The seed of the random numbers.')
+  parser.add_argument(
+      '--large_timeout',
+      type=float,
+      default=10,
+      help='The maximum number of seconds to solve a large sudoku, 0 to skip.')
+  parser.add_argument(
+      '--modes',
+      default=None,
+      help='Comma separated modes to measure, all if not set.')
+  parser.add_argument(
+      '--output',
+      default=None,
+      help='The file to write the JSON results to, stdout if not set.')
+  args = parser.parse_args()
+  results = run_benchmark(
+      repeats=args.repeats,
+      nr_generated=args.nr_generated,
+      seed=args.seed,
+      modes=args.modes.split(',') if args.modes else None,
+      large_timeout=args.large_timeout)
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+  else:
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    print()
+
+
+if __name__ == '__main__':
+  main()
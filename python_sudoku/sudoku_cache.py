@@ -0,0 +1,152 @@
+"""Cache of sudoku solutions.
+
+A solution is stored as the values of the solved sudoku, keyed by the values
+of the sudoku solved, see sudoku_data.SudokuData.to_bytes(). The least recently
+used solutions are evicted first. A cached solution also solves any sudoku
+filled in from the sudoku, as long as every number filled in agrees with it, so
+hints of a sudoku being played are found without solving it again.
+"""
+
+import collections
+import sudoku_data
+
+_SPACE = ord(' ')
+
+
+def _is_consistent(values, solution):
+  """Whether every number in values is the same in solution."""
+  return all(value == _SPACE or value == solved
+             for value, solved in zip(values, solution))
+
+
+class SolutionCache(object):
+  """A bounded cache of sudoku solutions with LRU eviction."""
+
+  def __init__(self, max_entries=1024, max_bytes=1 << 20):
+    """Creates an empty cache.
+
+    Args:
+      max_entries: The maximum number of solutions.
+      max_bytes: The maximum number of bytes of the keys and the solutions.
+    """
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    # An ordered dictionary mapping keys to solutions, from the least recently
+    # used.
+    self._solutions = collections.OrderedDict()
+    self.nr_bytes = 0
+    self.nr_hits = 0
+    self.nr_misses = 0
+
+  def __len__(self):
+    return len(self._solutions)
+
+  def _lookup(self, values, puzzle):
+    """Finds the solution of values, or of the puzzle values were filled from.
+
+    Returns:
+      The solution as bytes, or None if no cached solution agrees with values.
+    """
+    keys = [values]
+    if puzzle is not None:
+      keys.append(puzzle.to_bytes())
+    for key in keys:
+      solution = self._solutions.get(key)
+      if solution is not None and _is_consistent(values, solution):
+        self._solutions.move_to_end(key)
+        self.nr_hits += 1
+        return solution
+    self.nr_misses += 1
+    return None
+
+  def put(self, sudoku, solved_sudoku):
+    """Caches the solution of a sudoku, evicting the least recently used ones.
+
+    Args:
+      sudoku: An object of sudoku_data.SudokuData.
+      solved_sudoku: The sudoku solved.
+    """
+    key = sudoku.to_bytes()
+    solution = solved_sudoku.to_bytes()
+    old_solution = self._solutions.pop(key, None)
+    if old_solution is not None:
+      self.nr_bytes -= len(key) + len(old_solution)
+    self._solutions[key] = solution
+    self.nr_bytes += len(key) + len(solution)
+    while self._solutions and (len(self._solutions) > self.max_entries or
+                               self.nr_bytes > self.max_bytes):
+      old_key, old_solution = self._solutions.popitem(last=False)
+      self.nr_bytes -= len(old_key) + len(old_solution)
+
+  def get_solved_sudoku(self, sudoku, puzzle=None):
+    """Gets a cached solution agreeing with a sudoku.
+
+    Args:
+      sudoku: An object of sudoku_data.SudokuData.
+      puzzle: The sudoku that sudoku is filled in from, or None.
+
+    Returns:
+      The sudoku solved as a sudoku_data.SudokuData, or None if not cached.
+    """
+    solution = self._lookup(sudoku.to_bytes(), puzzle)
+    if solution is None:
+      return None
+    solved_sudoku = sudoku_data.SudokuData(sudoku.box_size)
+    solved_sudoku.from_line(solution.decode('latin-1'))
+    return solved_sudoku
+
+  def solve(self, sudoku, solver, puzzle=None, **solve_args):
+    """Solves a sudoku with a cached solution, or with a solver and caches it.
+
+    Args:
+      sudoku: A sudoku to solve. An object of sudoku_data.SudokuData.
+      solver: The sudoku_solver.SudokuSolver to solve the sudoku if no cached
+        solution agrees with it.
+      puzzle: The sudoku that sudoku is filled in from, or None. A solution of
+        sudoku is cached for the puzzle too.
+      **solve_args: Other arguments of sudoku_solver.SudokuSolver.solve(),
+        except partial.
+
+    Returns:
+      Same as sudoku_solver.SudokuSolver.solve(). The moves are in the order of
+        the locations when the solution is cached.
+    """
+    values = sudoku.to_bytes()
+    solution = self._lookup(values, puzzle)
+    if solution is None:
+      original = sudoku.clone()
+      moves = solver.solve(sudoku, **solve_args)
+      if moves is not None:
+        self.put(original, sudoku)
+        if puzzle is not None and _is_consistent(puzzle.to_bytes(), values):
+          self.put(puzzle, sudoku)
+      return moves
+    moves = []
+    for index, value in enumerate(values):
+      if value == _SPACE:
+        row, col = divmod(index, sudoku.size)
+        move = (row, col, chr(solution[index]))
+        sudoku.set(*move)
+        moves.append(move)
+    return moves
+
+  def get_hint(self, sudoku, puzzle=None):
+    """Gets a move from a cached solution agreeing with a sudoku.
+
+    Args:
+      sudoku: An object of sudoku_data.SudokuData. It is not changed.
+      puzzle: The sudoku that sudoku is filled in from, or None.
+
+    Returns:
+      A move as a tuple of row, column and value of the first space, or None if
+        there is no space or no cached solution.
+    """
+    values = sudoku.to_bytes()
+    index = values.find(_SPACE)
+    if index < 0:
+      return None
+    solution = self._lookup(values, puzzle)
+    if solution is None:
+      return None
+    row, col = divmod(index, sudoku.size)
+    return row, col, chr(solution[index])
@@ -0,0 +1,205 @@
+"""Possible numbers and conflicts of a sudoku being played.
+
+The grid keeps the possible numbers of every location, and the conflicts of
+every number, up to date as numbers are filled in or erased, which costs a visit
+of the peers of the location. So the possible numbers, the conflicts and whether
+the sudoku is solved are known without scanning the sudoku. The singles, a
+location with only one possible number or a number with only one possible
+location in a region, are kept in sets as they appear.
+"""
+
+
+class CandidateGrid(object):
+  """Possible numbers and conflicts of a sudoku kept in sync with its numbers."""
+
+  def __init__(self, sudoku):
+    """Creates a grid for a sudoku.
+
+    Args:
+      sudoku: An object of sudoku_data.SudokuData. It is copied, so later
+        changes must be made by set() too.
+    """
+    self.reset(sudoku)
+
+  def reset(self, sudoku):
+    """Starts over with another sudoku, same as creating a new grid."""
+    self.sudoku = sudoku.clone()
+    geometry = sudoku.geometry
+    self._geometry = geometry
+    size = geometry.size
+    self._all_digits_mask = (1 << size) - 1
+    # The digit of every location, -1 for a space.
+    self._digits = [-1] * geometry.nr_cells
+    # The number of every digit in every region.
+    self._counts = [[0] * size for _ in geometry.units]
+    # The mask of the digits in every region.
+    self._unit_masks = [0] * len(geometry.units)
+    # The mask of the possible digits of every location, 0 if filled in.
+    self._candidates = [0] * geometry.nr_cells
+    # The mask of the possible positions of every digit in every region, 0 if
+    # the digit is in the region, indexed by unit * size + digit.
+    self._places = [0] * (len(geometry.units) * size)
+    # The number of peers with the same digit of every location.
+    self._conflicts = [0] * geometry.nr_cells
+    # The spaces with only one possible digit.
+    self._naked_singles = set()
+    # The keys of the places with only one possible position.
+    self._hidden_singles = set()
+    # The spaces without any possible digit, and the keys of the places without
+    # any possible position, which make the sudoku not solvable.
+    self._dead_cells = set()
+    self._dead_places = set()
+    # The number of pairs of peers with the same digit.
+    self.nr_conflicts = 0
+    self.nr_spaces = geometry.nr_cells
+    for key in range(len(self._places)):
+      self._update_place(key)
+    for cell in range(geometry.nr_cells):
+      self._set_candidates(cell, self._all_digits_mask)
+    for cell, value in enumerate(self.sudoku.to_line()):
+      if value != '.':
+        row, col = geometry.cell_locations[cell]
+        self.set(row, col, value)
+
+  def _set_candidates(self, cell, mask):
+    """Sets the possible digits of a location, updating the singles."""
+    changed = self._candidates[cell] ^ mask
+    if not changed:
+      return
+    self._candidates[cell] = mask
+    size = self._geometry.size
+    cell_units = self._geometry.cell_units[cell]
+    digit = 0
+    while changed:
+      if changed & 1:
+        for unit, position in cell_units:
+          key = unit * size + digit
+          self._places[key] ^= 1 << position
+          self._update_place(key)
+      changed >>= 1
+      digit += 1
+    self._naked_singles.discard(cell)
+    self._dead_cells.discard(cell)
+    if self._digits[cell] < 0:
+      if not mask:
+        self._dead_cells.add(cell)
+      elif not mask & (mask - 1):
+        self._naked_singles.add(cell)
+
+  def _update_place(self, key):
+    """Updates the singles of the possible positions of a digit in a region."""
+    self._hidden_singles.discard(key)
+    self._dead_places.discard(key)
+    unit, digit = divmod(key, self._geometry.size)
+    if self._counts[unit][digit]:
+      return
+    places = self._places[key]
+    if not places:
+      self._dead_places.add(key)
+    elif not places & (places - 1):
+      self._hidden_singles.add(key)
+
+  def _get_candidates(self, cell):
+    """Computes the possible digits of a location from its regions."""
+    if self._digits[cell] >= 0:
+      return 0
+    mask = self._all_digits_mask
+    for unit, _ in self._geometry.cell_units[cell]:
+      mask &= ~self._unit_masks[unit]
+    return mask
+
+  def _count_digit(self, cell, digit, delta):
+    """Adds delta to the number of a digit at a location and its peers."""
+    size = self._geometry.size
+    for unit, _ in self._geometry.cell_units[cell]:
+      counts = self._counts[unit]
+      counts[digit] += delta
+      if counts[digit]:
+        self._unit_masks[unit] |= 1 << digit
+      else:
+        self._unit_masks[unit] &= ~(1 << digit)
+      self._update_place(unit * size + digit)
+    digits = self._digits
+    conflicts = self._conflicts
+    for peer in self._geometry.cell_peers[cell]:
+      if digits[peer] == digit:
+        conflicts[peer] += delta
+        conflicts[cell] += delta
+        self.nr_conflicts += delta
+
+  def set(self, row, col, value):
+    """Fills in or erases a number, same as sudoku_data.SudokuData.set().
+
+    It visits the location and its peers only.
+
+    Args:
+      row: The row of the location.
+      col: The column of the location.
+      value: The number, or ' ' or '.' to erase the number.
+    """
+    geometry = self._geometry
+    cell = row * geometry.size + col
+    digit = -1 if value in ' .' else geometry.symbols.index(value)
+    old_digit = self._digits[cell]
+    if digit == old_digit:
+      return
+    self.sudoku.set(row, col, ' ' if digit < 0 else value)
+    if old_digit >= 0:
+      self._digits[cell] = -1
+      self.nr_spaces += 1
+      self._count_digit(cell, old_digit, -1)
+    if digit >= 0:
+      self._digits[cell] = digit
+      self.nr_spaces -= 1
+      self._count_digit(cell, digit, 1)
+    self._set_candidates(cell, self._get_candidates(cell))
+    for peer in geometry.cell_peers[cell]:
+      self._set_candidates(peer, self._get_candidates(peer))
+
+  def get_candidates(self, row, col):
+    """Gets the possible numbers of a location, empty if it is filled in."""
+    mask = self._candidates[row * self._geometry.size + col]
+    return [
+        symbol for digit, symbol in enumerate(self._geometry.symbols)
+        if mask >> digit & 1
+    ]
+
+  def is_valid_value(self, row, col, value):
+    """Same as sudoku_data.SudokuData.is_valid_value(), without the peers.
+
+    Args:
+      row: Row of the location.
+      col: Column of the location.
+      value: The value to check.
+
+    Returns:
+      True if the value is valid in the location.
+    """
+    if value == ' ':
+      return True
+    geometry = self._geometry
+    cell = row * geometry.size + col
+    digit = geometry.symbols.find(value)
+    if digit < 0:
+      return False
+    # The number at the location itself is not checked.
+    own = 1 if self._digits[cell] == digit else 0
+    return all(self._counts[unit][digit] == own
+               for unit, _ in geometry.cell_units[cell])
+
+  def is_conflict(self, row, col):
+    """Whether the number at a location is the same as a peer."""
+    return self._conflicts[row * self._geometry.size + col] > 0
+
+  def is_solvable(self):
+    """Whether the sudoku may be solvable, without any obvious contradiction.
+
+    A sudoku is not solvable if a number is repeated in a region, or a location
+    or a number in a region has no possible place left. Otherwise it may still
+    be not solvable.
+    """
+    return not (self.nr_conflicts or self._dead_cells or self._dead_places)
+
+  def is_solved(self):
+    """Same as sudoku_data.SudokuData.is_solved(), without a scan."""
+    return not self.nr_spaces and not self.nr_conflicts
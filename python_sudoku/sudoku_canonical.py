@@ -0,0 +1,365 @@
+"""Canonical form of sudokus.
+
+Relabeling the numbers, permuting the rows in a band, the columns in a stack,
+the bands, the stacks, and transposing all keep a sudoku valid and its solutions
+equivalent. The canonical form of a sudoku is the lexicographically minimal
+line of 81 characters among all of its equivalent sudokus, where a space is '0'.
+Equivalent sudokus have the same canonical form, so it can be used as a key to
+deduplicate sudokus and to cache their solutions.
+"""
+
+import itertools
+import random
+import sudoku_data
+
+# All the permutations of 3 bands, stacks, rows in a band or columns in a stack.
+_PERMUTATIONS = list(itertools.permutations(range(3)))
+
+
+def _calculate_column_orders():
+  """Calculates all the orders of columns keeping the stacks.
+
+  Returns:
+    A list of tuples of the column order, the stack order, and the index in
+      _PERMUTATIONS of the column order in every stack.
+  """
+  column_orders = []
+  for stacks in _PERMUTATIONS:
+    for permutations in itertools.product(range(6), repeat=3):
+      column_order = tuple(stack * 3 + _PERMUTATIONS[permutations[stack]][i]
+                           for stack in stacks
+                           for i in range(3))
+      column_orders.append((column_order, stacks, permutations))
+  return column_orders
+
+
+def _calculate_permuted_masks():
+  """Calculates 3-bit masks of numbers of a stack after permuting columns.
+
+  Returns:
+    A list where the item [mask][permutation] is the mask after permuting with
+      the permutation, where the first column is the highest bit.
+  """
+  permuted_masks = []
+  for mask in range(8):
+    permuted_masks.append([
+        sum(1 << (2 - i) for i in range(3) if mask >> permutation[i] & 1)
+        for permutation in _PERMUTATIONS
+    ])
+  return permuted_masks
+
+
+_COLUMN_ORDERS = _calculate_column_orders()
+_PERMUTED_MASKS = _calculate_permuted_masks()
+
+
+class Transform(object):
+  """A transformation of a sudoku into an equivalent sudoku.
+
+  The sudoku is transposed first if needed, then row i of the result is the row
+  rows[i], column j of the result is the column cols[j], and every number is
+  relabeled with labels.
+  """
+
+  def __init__(self, transpose, rows, cols, labels):
+    self.transpose = transpose
+    self.rows = tuple(rows)
+    self.cols = tuple(cols)
+    # A dictionary mapping every number to its new number.
+    self.labels = dict(labels)
+
+  def apply(self, sudoku):
+    """Returns a new sudoku_data.SudokuData transformed from a sudoku."""
+    line = sudoku.to_line()
+    result = sudoku_data.SudokuData()
+    for row in range(9):
+      for col in range(9):
+        if self.transpose:
+          value = line[self.cols[col] * 9 + self.rows[row]]
+        else:
+          value = line[self.rows[row] * 9 + self.cols[col]]
+        if value == '.':
+          continue
+        result.set(row, col, self.labels.get(value, value))
+    return result
+
+  def inverse(self):
+    """Returns the transformation that undoes this transformation."""
+    inverse_rows = [0] * 9
+    inverse_cols = [0] * 9
+    for i in range(9):
+      inverse_rows[self.rows[i]] = i
+      inverse_cols[self.cols[i]] = i
+    labels = {label: value for value, label in self.labels.items()}
+    if self.transpose:
+      return Transform(True, inverse_cols, inverse_rows, labels)
+    return Transform(False, inverse_rows, inverse_cols, labels)
+
+
+def random_transform():
+  """Returns a random transformation."""
+  rows = []
+  for band in random.sample(range(3), 3):
+    rows.extend(band * 3 + row for row in random.sample(range(3), 3))
+  cols = []
+  for stack in random.sample(range(3), 3):
+    cols.extend(stack * 3 + col for col in random.sample(range(3), 3))
+  digits = [str(i) for i in range(1, 10)]
+  labels = dict(zip(digits, random.sample(digits, 9)))
+  return Transform(random.randrange(2) == 1, rows, cols, labels)
+
+
+def _get_allowed_rows(row_order):
+  """Gets the rows that can be the next row after the rows in row_order."""
+  if len(row_order) % 3 == 0:
+    used_bands = {int(row / 3) for row in row_order}
+    return [row for row in range(9) if int(row / 3) not in used_bands]
+  band = int(row_order[-1] / 3)
+  return [
+      row for row in range(band * 3, band * 3 + 3) if row not in row_order
+  ]
+
+
+def _relabel_row(values, col_order, labels):
+  """Relabels a row, adding labels for the new numbers.
+
+  Args:
+    values: The values of the row, where '.' is a space.
+    col_order: The order of the columns.
+    labels: A dictionary mapping numbers to their labels, which is updated.
+
+  Returns:
+    The relabeled row as a string, where '0' is a space.
+  """
+  key = []
+  for col in col_order:
+    value = values[col]
+    if value == '.':
+      key.append('0')
+    else:
+      label = labels.get(value)
+      if label is None:
+        label = chr(ord('1') + len(labels))
+        labels[value] = label
+      key.append(label)
+  return ''.join(key)
+
+
+def _get_state(transpose, row_order, col_order, labels, empty_rows,
+               empty_cols):
+  """Gets the state of a candidate that decides its remaining rows.
+
+  Empty rows in a band, and empty columns, are interchangeable, so candidates
+  only differing by them have the same state, and only one of them is kept.
+  Sparse sudokus would have too many candidates otherwise.
+
+  Args:
+    transpose: Whether the candidate is transposed, 0 or 1.
+    row_order: The rows of the candidate so far.
+    col_order: The column order of the candidate.
+    labels: The labels of the candidate so far.
+    empty_rows: The set of the empty rows of the grid of the candidate.
+    empty_cols: The set of the empty columns of the grid of the candidate.
+
+  Returns:
+    A hashable state.
+  """
+  if empty_rows:
+    used_rows = frozenset(row for row in row_order if row not in empty_rows)
+    nr_empty_rows = tuple(
+        sum(1 for row in row_order if row in empty_rows and row // 3 == band)
+        for band in range(3))
+  else:
+    used_rows = frozenset(row_order)
+    nr_empty_rows = None
+  # The next row is in the band of the last row, unless a band is finished.
+  band = row_order[-1] // 3 if len(row_order) % 3 else None
+  cols = col_order
+  if empty_cols:
+    cols = tuple(-1 if col in empty_cols else col for col in col_order)
+  return (transpose, used_rows, nr_empty_rows, band, cols,
+          tuple(sorted(labels.items())))
+
+
+def _get_first_rows(grids):
+  """Finds the first rows and column orders of the canonical form.
+
+  The first row doesn't depend on any labels, so only the positions of its
+  numbers matter, which are compared as 9-bit masks.
+
+  Returns:
+    A list of tuples of transpose, row, column order and labels that all give
+      the minimal first row, with one of the column orders only differing by
+      empty columns.
+  """
+  empty_cols = [{col for col in range(9) if all(row[col] == '.' for row in grid)}
+                for grid in grids]
+  best_mask = None
+  firsts = []
+  for transpose, grid in enumerate(grids):
+    for row in range(9):
+      values = grid[row]
+      stack_masks = [
+          sum(1 << i for i in range(3) if values[stack * 3 + i] != '.')
+          for stack in range(3)
+      ]
+      for col_order, stacks, permutations in _COLUMN_ORDERS:
+        mask = 0
+        for stack in stacks:
+          mask = mask << 3 | _PERMUTED_MASKS[stack_masks[stack]][
+              permutations[stack]]
+        if best_mask is None or mask < best_mask:
+          best_mask = mask
+          firsts = {}
+        if mask == best_mask:
+          cols = col_order
+          if empty_cols[transpose]:
+            cols = tuple(-1 if col in empty_cols[transpose] else col
+                         for col in col_order)
+          firsts.setdefault((transpose, row, cols), col_order)
+  return [(transpose, row, col_order, {})
+          for (transpose, row, _), col_order in firsts.items()]
+
+
+def canonicalize(sudoku):
+  """Finds the canonical form of a sudoku.
+
+  Args:
+    sudoku: An object of sudoku_data.SudokuData.
+
+  Returns:
+    A tuple of the canonical form as a line of 81 characters where a space is
+      '0', and a Transform transforming the sudoku to its canonical form.
+  """
+  line = sudoku.to_line()
+  rows = [line[row * 9:row * 9 + 9] for row in range(9)]
+  grids = (rows, [''.join(row[col] for row in rows) for col in range(9)])
+  empty_rows = [{row for row in range(9) if grid[row] == '.' * 9}
+                for grid in grids]
+  # All the candidates giving the minimal lines found so far, each is a tuple of
+  # transpose, row order, column order and labels.
+  candidates = [(transpose, (row,), col_order, labels)
+                for transpose, row, col_order, labels in _get_first_rows(grids)]
+  for transpose, row_order, col_order, labels in candidates:
+    _relabel_row(grids[transpose][row_order[0]], col_order, labels)
+  canonical_rows = [
+      _relabel_row(grids[candidates[0][0]][candidates[0][1][0]],
+                   candidates[0][2], {})
+  ]
+  for _ in range(8):
+    best_key = None
+    next_candidates = []
+    for transpose, row_order, col_order, labels in candidates:
+      for row in _get_allowed_rows(row_order):
+        new_labels = dict(labels)
+        key = _relabel_row(grids[transpose][row], col_order, new_labels)
+        if best_key is None or key < best_key:
+          best_key = key
+          next_candidates = []
+          # Candidates with the same state give the same remaining rows, so
+          # only one of them is kept.
+          seen = set()
+        if key == best_key:
+          state = _get_state(transpose, row_order + (row,), col_order,
+                             new_labels, empty_rows[transpose],
+                             empty_rows[1 - transpose])
+          if state not in seen:
+            seen.add(state)
+            next_candidates.append(
+                (transpose, row_order + (row,), col_order, new_labels))
+    candidates = next_candidates
+    canonical_rows.append(best_key)
+  transpose, row_order, col_order, labels = candidates[0]
+  # Numbers not in the sudoku get the remaining labels in order.
+  for value in '123456789':
+    if value not in labels:
+      labels[value] = chr(ord('1') + len(labels))
+  return ''.join(canonical_rows), Transform(transpose == 1, row_order,
+                                            col_order, labels)
+
+
+def get_canonical_key(sudoku):
+  """Gets the canonical form of a sudoku as a line of 81 characters."""
+  return canonicalize(sudoku)[0]
+
+
+class CanonicalIndex(object):
+  """A hash index of sudokus by their canonical forms.
+
+  Every sudoku can have its solution stored in the canonical form, so the
+  solution of any equivalent sudoku is found without solving it.
+  """
+
+  def __init__(self):
+    # A dictionary mapping canonical forms to the canonical solutions, or None
+    # if the solution is not known.
+    self._solutions = {}
+
+  def __len__(self):
+    return len(self._solutions)
+
+  def __contains__(self, sudoku):
+    return get_canonical_key(sudoku) in self._solutions
+
+  def add(self, sudoku, solved_sudoku=None):
+    """Adds a sudoku to the index.
+
+    Args:
+      sudoku: An object of sudoku_data.SudokuData.
+      solved_sudoku: The sudoku solved, or None if unknown.
+
+    Returns:
+      True if no equivalent sudoku is in the index yet.
+    """
+    key, transform = canonicalize(sudoku)
+    is_new = key not in self._solutions
+    if solved_sudoku is not None:
+      self._solutions[key] = transform.apply(solved_sudoku).to_line()
+    elif is_new:
+      self._solutions[key] = None
+    return is_new
+
+  def get_solved_sudoku(self, sudoku):
+    """Gets the solved sudoku of an equivalent sudoku in the index.
+
+    Args:
+      sudoku: An object of sudoku_data.SudokuData.
+
+    Returns:
+      The solved sudoku as a sudoku_data.SudokuData, or None if no equivalent
+        sudoku with solution is in the index.
+    """
+    key, transform = canonicalize(sudoku)
+    solution = self._solutions.get(key)
+    if solution is None:
+      return None
+    canonical_solved = sudoku_data.SudokuData()
+    canonical_solved.from_line(solution)
+    return transform.inverse().apply(canonical_solved)
+
+  def solve(self, sudoku, solver):
+    """Solves a sudoku, using the solution of an equivalent sudoku if any.
+
+    Args:
+      sudoku: A sudoku to solve. An object of sudoku_data.SudokuData.
+      solver: A sudoku_solver.SudokuSolver to solve the sudoku if no equivalent
+        sudoku with solution is in the index.
+
+    Returns:
+      Same as sudoku_solver.SudokuSolver.solve().
+    """
+    solved_sudoku = self.get_solved_sudoku(sudoku)
+    if solved_sudoku is None:
+      original = sudoku.clone()
+      solution = solver.solve(sudoku)
+      if solution is not None:
+        self.add(original, sudoku)
+      return solution
+    solution = []
+    for row in range(9):
+      for col in range(9):
+        if sudoku.get(row, col) == ' ':
+          value = solved_sudoku.get(row, col)
+          sudoku.set(row, col, value)
+          solution.append((row, col, value))
+    return solution
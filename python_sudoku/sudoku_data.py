@@ -1,74 +1,337 @@
-"""Sudoku data."""
+"""Sudoku data.
+
+A sudoku has boxes of box_size x box_size locations, and box_size x box_size
+boxes, so it has size = box_size * box_size rows, columns and numbers. The
+classic sudoku has a box size of 3. The numbers are the first size characters
+of SYMBOLS.
+"""
+
+import operator
+
+# Character code of a space.
+_SPACE = ord(' ')
+# The characters of the numbers of the sudokus of all sizes, in order.
+SYMBOLS = '123456789ABCDEFGHIJKLMNOP'
+# The box sizes supported, limited by SYMBOLS.
+BOX_SIZES = (2, 3, 4, 5)
+
+
+class Geometry(object):
+  """The locations and the units of the sudokus of a box size.
+
+  A unit is a row, column, or a box where each number will appear once and only
+  once. Cells are indexed row * size + col. The tables are shared by the hot
+  paths of the data and the solvers, so they are never calculated again, see
+  get_geometry().
+  """
+
+  def __init__(self, box_size):
+    size = box_size * box_size
+    self.box_size = box_size
+    self.size = size
+    self.nr_cells = size * size
+    # The numbers of the sudoku.
+    self.symbols = SYMBOLS[:size]
+    # All the valid values, the space and the numbers.
+    self.valid_values = (' ' + self.symbols).encode('latin-1')
+    # The index of the top left location of every box.
+    self.box_starts = tuple(band * box_size * size + stack * box_size
+                            for band in range(box_size)
+                            for stack in range(box_size))
+    # The cells of every unit, the rows, then the columns, then the boxes.
+    units = [
+        tuple(row * size + col for col in range(size)) for row in range(size)
+    ]
+    units.extend(
+        tuple(row * size + col for row in range(size)) for col in range(size))
+    units.extend(
+        tuple(start + i * size + j
+              for i in range(box_size)
+              for j in range(box_size))
+        for start in self.box_starts)
+    self.units = tuple(units)
+    # For every box, a function getting the values of its cells from the values
+    # of all the cells.
+    self.box_getters = tuple(
+        operator.itemgetter(*cells) for cells in self.units[size * 2:])
+    # For every cell, the 3 tuples of unit and position in the unit of the cell,
+    # its row, its column and its box.
+    cell_units = [[] for _ in range(self.nr_cells)]
+    for unit, cells in enumerate(self.units):
+      for position, cell in enumerate(cells):
+        cell_units[cell].append((unit, position))
+    self.cell_units = tuple(tuple(unit_positions)
+                            for unit_positions in cell_units)
+    # For every cell, the other cells sharing a unit with it, in order.
+    self.cell_peers = tuple(
+        tuple(
+            sorted({
+                peer for unit, _ in self.cell_units[cell]
+                for peer in self.units[unit]
+            } - {cell})) for cell in range(self.nr_cells))
+    # For every cell, the tuple of its row and column.
+    self.cell_locations = tuple(
+        divmod(cell, size) for cell in range(self.nr_cells))
+
+
+# The geometry of every box size, created when first needed.
+_GEOMETRIES = {}
+
+
+def get_geometry(box_size=3):
+  """Gets the Geometry of a box size.
+
+  Raises:
+    ValueError: If the box size is not in BOX_SIZES.
+  """
+  geometry = _GEOMETRIES.get(box_size)
+  if geometry is None:
+    if box_size not in BOX_SIZES:
+      raise ValueError('Box size {} is not valid.'.format(box_size))
+    geometry = Geometry(box_size)
+    _GEOMETRIES[box_size] = geometry
+  return geometry
+
+
+# The geometry of the classic sudoku.
+_GEOMETRY = get_geometry(3)
+# The cells of every unit, the rows, then the columns, then the boxes.
+UNITS = _GEOMETRY.units
+# For every cell, the 3 tuples of unit and position in the unit of the cell, its
+# row, its column and its box.
+CELL_UNITS = _GEOMETRY.cell_units
+# For every cell, the other 20 cells sharing a unit with it, in order.
+CELL_PEERS = _GEOMETRY.cell_peers
+# For every cell, the tuple of its row and column.
+CELL_LOCATIONS = _GEOMETRY.cell_locations
+
+
+def _has_duplicates(values):
+  """Whether a number appears more than once in the values of a region."""
+  numbers = values.replace(b' ', b'')
+  return len(set(numbers)) != len(numbers)
+
+
+class _Row(object):
+  """A row of a sudoku that reads and writes the cells of the sudoku."""
+
+  __slots__ = ('_cells', '_start', '_size')
+
+  def __init__(self, cells, start, size):
+    self._cells = cells
+    self._start = start
+    self._size = size
+
+  def __len__(self):
+    return self._size
+
+  def __getitem__(self, col):
+    if isinstance(col, slice):
+      return [self[i] for i in range(self._size)[col]]
+    if col < 0:
+      col += self._size
+    if col < 0 or col >= self._size:
+      raise IndexError('Column {} is out of range.'.format(col))
+    return chr(self._cells[self._start + col])
+
+  def __setitem__(self, col, value):
+    if col < 0:
+      col += self._size
+    if col < 0 or col >= self._size:
+      raise IndexError('Column {} is out of range.'.format(col))
+    self._cells[self._start + col] = ord(value)
+
+  def __iter__(self):
+    return iter(self._cells[self._start:self._start + self._size].decode(
+        'latin-1'))
+
+  def __eq__(self, other):
+    return list(self) == list(other)
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __repr__(self):
+    return repr(list(self))
 
 
 class SudokuData(object):
-  """Class for sudoku data."""
+  """Class for sudoku data.
+
+  The locations are kept row by row in a bytearray with the character code of
+  every value, so copying and hashing a sudoku are single memory operations.
+  Every value is a single character, either a space or a number.
+  """
+
+  __slots__ = ('_cells', '_size', '_geometry')
+
+  def __init__(self, box_size=3):
+    """Creates an empty sudoku.
+
+    Args:
+      box_size: The number of rows and columns of a box, see BOX_SIZES.
 
-  def __init__(self):
-    self.data = [[' '] * 9 for _ in range(9)]
-    self._regions = None
+    Raises:
+      ValueError: If the box size is not valid.
+    """
+    self._geometry = get_geometry(box_size)
+    self._size = self._geometry.size
+    self._cells = bytearray(b' ' * self._geometry.nr_cells)
+
+  @property
+  def box_size(self):
+    return self._geometry.box_size
+
+  @property
+  def size(self):
+    """The number of rows, columns and numbers."""
+    return self._size
+
+  @property
+  def geometry(self):
+    return self._geometry
+
+  @property
+  def data(self):
+    """A list of the rows, each row is a list like object of the values.
+
+    Changing a value of a row changes the sudoku.
+    """
+    size = self._size
+    return [_Row(self._cells, row * size, size) for row in range(size)]
+
+  @data.setter
+  def data(self, rows):
+    size = self._size
+    for row in range(size):
+      for col in range(size):
+        self._cells[row * size + col] = ord(rows[row][col])
 
   def from_lines(self, lines):
     """Load data from a list of lines.
 
     Args:
       lines: A list of lines with numbers or space separated by common. Only the
-        first 9 lines will be used.
+        first size lines will be used.
 
     Raises:
       RuntimeError: If the lines doesn't have correct format.
     """
-    if len(lines) < 9:
-      raise RuntimeError('The number of lines is less than 9.')
-    for i in range(9):
-      self.data[i] = lines[i].split(',')
-      if len(self.data[i]) != 9:
-        raise RuntimeError('The line does not contain 9 values. {}'.format(
-            lines[i]))
+    size = self._size
+    if len(lines) < size:
+      raise RuntimeError('The number of lines is less than {}.'.format(size))
+    for i in range(size):
+      values = lines[i].split(',')
+      if len(values) != size:
+        raise RuntimeError('The line does not contain {} values. {}'.format(
+            size, lines[i]))
+      for value in values:
+        if len(value) != 1 or ord(value) > 255:
+          raise RuntimeError(
+              'The line contains a value that is not a character. {}'.format(
+                  lines[i]))
+      self._cells[i * size:i * size + size] = ''.join(values).encode('latin-1')
+
+  def from_line(self, line):
+    """Load data from a line of size * size characters.
+
+    Args:
+      line: A line with the numbers of the sudoku row by row, where '.' or '0'
+        is a space. Only the first size * size characters will be used.
+
+    Raises:
+      RuntimeError: If the line doesn't have correct format.
+    """
+    nr_cells = len(self._cells)
+    if len(line) < nr_cells:
+      raise RuntimeError('The line does not contain {} values. {}'.format(
+          nr_cells, line))
+    try:
+      cells = line[:nr_cells].encode('latin-1')
+    except UnicodeEncodeError:
+      raise RuntimeError(
+          'The line contains a value that is not a character. {}'.format(line))
+    self._cells[:] = cells.replace(b'.', b' ').replace(b'0', b' ')
+
+  def to_line(self):
+    """Returns the numbers row by row as a line of size * size characters.
+
+    A space is represented as '.'.
+    """
+    return self._cells.decode('latin-1').replace(' ', '.')
+
+  def to_lines(self):
+    """Returns the numbers as a list of size lines separated by comma."""
+    size = self._size
+    values = self._cells.decode('latin-1')
+    return [
+        ','.join(values[row * size:row * size + size]) for row in range(size)
+    ]
+
+  def to_bytes(self):
+    """Returns the character codes of the values as bytes.
+
+    The bytes can be used as a compact key of the sudoku.
+    """
+    return bytes(self._cells)
 
   def copy(self, other):
     """Copy another sudoku."""
-    for row in range(9):
-      for col in range(9):
-        self.data[row][col] = other.data[row][col]
+    self._cells[:] = other._cells
+    self._size = other._size
+    self._geometry = other._geometry
 
-  def set(self, row, col, value):
-    self.data[row][col] = value
+  def clone(self):
+    """Returns a copy of this sudoku."""
+    clone = SudokuData.__new__(SudokuData)
+    clone._cells = bytearray(self._cells)
+    clone._size = self._size
+    clone._geometry = self._geometry
+    return clone
 
-  def get(self, row, col):
-    return self.data[row][col]
+  def __eq__(self, other):
+    if not isinstance(other, SudokuData):
+      return NotImplemented
+    return self._cells == other._cells
 
-  def print_data(self):
-    for row in range(9):
-      print(','.join(self.data[row]))
+  def __ne__(self, other):
+    result = self.__eq__(other)
+    if result is NotImplemented:
+      return result
+    return not result
 
-  def _calculate_regions(self):
-    """Calculate all the regions of a sukoku.
+  def __hash__(self):
+    # Changing the sudoku changes the hash, so don't change a sudoku used as a
+    # key.
+    return hash(bytes(self._cells))
 
-    A region is a row, a column, or a box. Each region is a list of all the
-    locations (a tuple of row, column) in that region. As the regions are
-    independent of the numbers, this only needs to be calculated once.
-    """
+  def __getstate__(self):
+    if self._size == 9:
+      return bytes(self._cells)
+    return self._geometry.box_size, bytes(self._cells)
+
+  def __setstate__(self, state):
+    box_size = 3
+    if isinstance(state, tuple):
+      box_size, state = state
+    self._geometry = get_geometry(box_size)
+    self._size = self._geometry.size
+    self._cells = bytearray(state)
+
+  def set(self, row, col, value):
+    self._cells[row * self._size + col] = ord(value)
+
+  def get(self, row, col):
+    return chr(self._cells[row * self._size + col])
 
-    # Calculate all the regions, which is either a row, a column, or a box.
-    # Regions for all rows.
-    self._regions = [[(row, col) for col in range(9)] for row in range(9)]
-    # Regions for all columns.
-    self._regions.extend([[(row, col) for row in range(9)] for col in range(9)])
-    # Regions for all boxes.
-    for low in [0, 3, 6]:
-      for left in [0, 3, 6]:
-        box = []
-        for row in range(low, low + 3):
-          box.extend([(row, col) for col in range(left, left + 3)])
-        self._regions.append(box)
+  def print_data(self):
+    for line in self.to_lines():
+      print(line)
 
   def is_solved(self):
     """Check if this sudoku is already solved."""
-    for row in range(9):
-      for col in range(9):
-        if self.data[row][col] == ' ':
-          return False
+    if _SPACE in self._cells:
+      return False
     return self.is_valid()
 
   def is_valid(self):
@@ -80,21 +343,23 @@ class SudokuData(object):
     Returns:
       True if the sudoku is valid.
     """
-    # Get all the regions, which is either a row, a column, or a box.
-    if self._regions is None:
-      self._calculate_regions()
-    # Check if it is valid in every region.
-    for region in self._regions:
-      value_set = set()
-      for row, col in region:
-        value = self.data[row][col]
-        if value == ' ':
-          continue
-        if len(value) != 1 or ord(value) < ord('1') or ord(value) > ord('9'):
-          return False
-        if value in value_set:
-          return False
-        value_set.add(value)
+    cells = self._cells
+    geometry = self._geometry
+    size = self._size
+    # Every value must be a space or a number.
+    if cells.translate(None, geometry.valid_values):
+      return False
+    # Check if it is valid in every region, which is either a row, a column, or
+    # a box.
+    for row in range(size):
+      if _has_duplicates(cells[row * size:row * size + size]):
+        return False
+    for col in range(size):
+      if _has_duplicates(cells[col::size]):
+        return False
+    for get_box in geometry.box_getters:
+      if _has_duplicates(bytes(get_box(cells))):
+        return False
     return True
 
   def is_valid_value(self, row, col, value):
@@ -110,19 +375,9 @@ class SudokuData(object):
     """
     if value == ' ':
       return True
-    for i in range(9):
-      if i != row:
-        if self.data[i][col] == value:
-          return False
-    for i in range(9):
-      if i != col:
-        if self.data[row][i] == value:
-          return False
-    low = int(row / 3) * 3
-    left = int(col / 3) * 3
-    for i in range(low, low + 3):
-      for j in range(left, left + 3):
-        if i != row and j != col:
-          if self.data[i][j] == value:
-            return False
+    cells = self._cells
+    value = ord(value)
+    for peer in self._geometry.cell_peers[row * self._size + col]:
+      if cells[peer] == value:
+        return False
     return True
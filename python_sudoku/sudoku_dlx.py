@@ -0,0 +1,249 @@
+"""Sudoku solver with Dancing Links (Algorithm X).
+
+A sudoku is modeled as an exact cover problem. Every choice of a number at a
+location is a row of the matrix, and covers 4 columns, the constraints that the
+location has a number, and that its row, its column and its box have the number.
+A solution is a set of rows covering every column exactly once. The matrix is
+kept as circular doubly linked lists in flat arrays, see
+https://arxiv.org/abs/cs/0011047.
+
+The search is recursive, one level for every number filled in, and every level
+covers and uncovers the nodes of a row one by one. For sudokus with a box size
+of 5 that makes it much slower than the bitmask engine of sudoku_solver on some
+sudokus, see the large sudokus of sudoku_benchmark.
+"""
+
+import random
+
+
+def _get_columns(row, col, digit, box_size):
+  """Gets the columns covered by filling in a digit at a location.
+
+  Node 0 is the root and the column headers follow it, the constraints of the
+  locations, the rows, the columns, then the boxes.
+  """
+  size = box_size * box_size
+  nr_cells = size * size
+  box = row // box_size * box_size + col // box_size
+  return (1 + row * size + col, 1 + nr_cells + row * size + digit,
+          1 + nr_cells * 2 + col * size + digit,
+          1 + nr_cells * 3 + box * size + digit)
+
+
+def _build_links(box_size):
+  """Builds the links of the full exact cover matrix of a box size.
+
+  Returns:
+    A tuple of lists of the left, right, up, down links and the column of every
+      node, and the size of every column.
+  """
+  size = box_size * box_size
+  nr_columns = size * size * 4
+  first_row_node = nr_columns + 1
+  nr_nodes = first_row_node + size * size * size * 4
+  left = [0] * nr_nodes
+  right = [0] * nr_nodes
+  up = list(range(nr_nodes))
+  down = list(range(nr_nodes))
+  column = [0] * nr_nodes
+  column_size = [0] * first_row_node
+  for node in range(first_row_node):
+    left[node] = node - 1 if node else nr_columns
+    right[node] = node + 1 if node < nr_columns else 0
+  for choice in range(size * size * size):
+    row, digit = divmod(choice, size * size)
+    col, digit = divmod(digit, size)
+    first = first_row_node + choice * 4
+    for i, header in enumerate(_get_columns(row, col, digit, box_size)):
+      node = first + i
+      left[node] = first + (i + 3) % 4
+      right[node] = first + (i + 1) % 4
+      # Append the node at the bottom of the column.
+      up[node] = up[header]
+      down[node] = header
+      down[up[header]] = node
+      up[header] = node
+      column[node] = header
+      column_size[header] += 1
+  return left, right, up, down, column, column_size
+
+
+# The links of the full matrix of every box size, copied for every sudoku to
+# solve. Built when first needed.
+_LINKS = {3: _build_links(3)}
+
+
+def _get_links(box_size):
+  links = _LINKS.get(box_size)
+  if links is None:
+    links = _build_links(box_size)
+    _LINKS[box_size] = links
+  return links
+
+
+class DlxSolver(object):
+  """Class for sudoku solver with Dancing Links."""
+
+  def __init__(self, randomize_type='min'):
+    # Type of ranomizing, can be random, min or max. With min or max, the
+    # numbers of a location are tried in increasing or decreasing order.
+    self.randomize_type = randomize_type
+    # A function called before trying every row, which can abort the search by
+    # raising an exception. None if not needed.
+    self.node_callback = None
+    self._left = None
+    self._right = None
+    self._up = None
+    self._down = None
+    self._column = None
+    self._size = None
+
+  def _cover(self, header):
+    """Removes a column and all the rows in it from the matrix."""
+    left, right, up, down = self._left, self._right, self._up, self._down
+    column, size = self._column, self._size
+    right[left[header]] = right[header]
+    left[right[header]] = left[header]
+    i = down[header]
+    while i != header:
+      j = right[i]
+      while j != i:
+        down[up[j]] = down[j]
+        up[down[j]] = up[j]
+        size[column[j]] -= 1
+        j = right[j]
+      i = down[i]
+
+  def _uncover(self, header):
+    """Restores a column removed by _cover()."""
+    left, right, up, down = self._left, self._right, self._up, self._down
+    column, size = self._column, self._size
+    i = up[header]
+    while i != header:
+      j = left[i]
+      while j != i:
+        size[column[j]] += 1
+        down[up[j]] = j
+        up[down[j]] = j
+        j = left[j]
+      i = up[i]
+    right[left[header]] = header
+    left[right[header]] = header
+
+  def _initialize(self, sudoku):
+    """Initializes the matrix and covers the numbers already filled in.
+
+    Returns:
+      False if the sudoku is not valid.
+    """
+    if not sudoku.is_valid():
+      return False
+    box_size = sudoku.box_size
+    (self._left, self._right, self._up, self._down, self._column,
+     self._size) = [list(links) for links in _get_links(box_size)]
+    symbols = sudoku.geometry.symbols
+    for row in range(sudoku.size):
+      for col in range(sudoku.size):
+        value = sudoku.get(row, col)
+        if value != ' ':
+          for header in _get_columns(row, col, symbols.index(value), box_size):
+            self._cover(header)
+    return True
+
+  def _get_rows(self, header):
+    """Gets the first nodes of the rows in a column in the order to try."""
+    rows = []
+    down = self._down
+    node = down[header]
+    while node != header:
+      rows.append(node)
+      node = down[node]
+    if self.randomize_type == 'max':
+      rows.reverse()
+    elif self.randomize_type != 'min':
+      random.shuffle(rows)
+    return rows
+
+  def _search(self, choices, solutions, limit):
+    """Searches solutions recursively.
+
+    Args:
+      choices: The nodes of the rows chosen so far.
+      solutions: The list to add the solutions found to, each solution is a list
+        of nodes of the rows chosen.
+      limit: Stops after this number of solutions are found.
+
+    Returns:
+      True if the limit is reached.
+    """
+    right, size = self._right, self._size
+    header = right[0]
+    if not header:
+      solutions.append(list(choices))
+      return len(solutions) >= limit
+    # Choose the column with the least number of rows.
+    min_size = size[header]
+    node = right[header]
+    while node and min_size > 1:
+      if size[node] < min_size:
+        header = node
+        min_size = size[node]
+      node = right[node]
+    if not min_size:
+      return False
+
+    self._cover(header)
+    done = False
+    for row_node in self._get_rows(header):
+      if self.node_callback is not None:
+        self.node_callback()
+      choices.append(row_node)
+      node = right[row_node]
+      while node != row_node:
+        self._cover(self._column[node])
+        node = right[node]
+      done = self._search(choices, solutions, limit)
+      node = self._left[row_node]
+      while node != row_node:
+        self._uncover(self._column[node])
+        node = self._left[node]
+      choices.pop()
+      if done:
+        break
+    self._uncover(header)
+    return done
+
+  def solve(self, sudoku, limit=1):
+    """Finds solutions of a sudoku.
+
+    Args:
+      sudoku: A sudoku to solve. An object of sudoku_data.SudokuData. It is not
+        changed.
+      limit: The maximum number of solutions to find.
+
+    Returns:
+      A list of at most limit solutions. Each solution is a list of moves with
+        each move as a tuple of row, column and value, where value is a
+        character of sudoku_data.SYMBOLS.
+    """
+    if not self._initialize(sudoku):
+      return []
+    solutions = []
+    self._search([], solutions, limit)
+    size = sudoku.size
+    symbols = sudoku.geometry.symbols
+    first_row_node = size * size * 4 + 1
+    moves = []
+    for choices in solutions:
+      solution = []
+      for node in choices:
+        choice = (node - first_row_node) // 4
+        row, digit = divmod(choice, size * size)
+        col, digit = divmod(digit, size)
+        solution.append((row, col, symbols[digit]))
+      moves.append(solution)
+    return moves
+
+  def count_solutions(self, sudoku, limit=2):
+    """Counts the solutions of a sudoku, up to a limit."""
+    return len(self.solve(sudoku, limit=limit))
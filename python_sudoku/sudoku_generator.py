@@ -1,129 +1,343 @@
 """Sudoku generator."""
 
 import random
+import sudoku_canonical
 import sudoku_data
+import sudoku_rating
 import sudoku_solver
+import threading
+import time
+
+# Number of locations emptied at first when making a sudoku of every level, for
+# a sudoku of 81 cells. The numbers are scaled by the number of cells for other
+# sizes.
+_LEVEL_NR_SPACES = {'EASY': 44, 'MEDIUM': 50, 'HARD': 56, 'CHALLENGER': 56}
+# Number of sudokus made at most by get_sudoku() for a level of sudokus with
+# other box sizes than 3, which take seconds to make.
+_NR_TRIES_OTHER_SIZES = 3
+# Seconds get_sudoku() waits at most for the background thread to generate a
+# sudoku of the level, which may never come if the level is rarely made.
+_BACKGROUND_TIMEOUT = 10
 
 
 class SudokuGenerator(object):
   """Class for sudoku generator."""
 
-  def __init__(self):
+  def __init__(self, bank=None, nr_derivations=0, box_size=3):
+    """Creates a generator.
+
+    Args:
+      bank: A sudoku_bank.SudokuBank to serve sudokus from first, or None.
+      nr_derivations: The number of sudokus derived from every generated sudoku
+        for the cache, see derive_sudokus().
+      box_size: The box size of the sudokus, see sudoku_data.BOX_SIZES.
+
+    Raises:
+      ValueError: If the box size is not valid, or a bank is given for sudokus
+        of other box sizes than 3.
+    """
+    self.geometry = sudoku_data.get_geometry(box_size)
+    if bank is not None and box_size != 3:
+      raise ValueError('A bank only serves sudokus with a box size of 3.')
     self._level = 0
+    self._bank = bank
+    self.nr_derivations = nr_derivations
     self._solver = sudoku_solver.SudokuSolver()
-    self._max_solver = sudoku_solver.SudokuSolver(randomize_type='max')
-    self._min_solver = sudoku_solver.SudokuSolver(randomize_type='min')
     self._sudoku_map = {'EASY': [], 'MEDIUM': [], 'HARD': [], 'CHALLENGER': []}
+    # Guards the sudoku map, and is notified when a sudoku is added to or taken
+    # from the map.
+    self._condition = threading.Condition()
+    # Guards the solver, which is shared by the background thread and the
+    # callers.
+    self._solver_lock = threading.RLock()
+    # The thread generating sudokus in the background, None if not started.
+    self._thread = None
+    self._stopped = False
 
   def is_partial_solvable(self, sudoku):
     """Whether the sudoku can be solved by partial solver."""
-    clone = sudoku_data.SudokuData()
-    clone.copy(sudoku)
-    for _ in range(80):
-      partial_solution = self._solver.solve(clone, partial=True)
-      if not partial_solution:
-        break
+    clone = sudoku.clone()
+    with self._solver_lock:
+      for _ in range(self.geometry.nr_cells - 1):
+        partial_solution = self._solver.solve(clone, partial=True)
+        if not partial_solution:
+          break
     return clone.is_solved()
 
   def make_one_solution(self, sudoku, full_sudoku):
-    """Make a sudoku has only one solution."""
-    for _ in range(80):
-      clone1 = sudoku_data.SudokuData()
-      clone1.copy(sudoku)
-      self._max_solver.solve(clone1)
-      clone2 = sudoku_data.SudokuData()
-      clone2.copy(sudoku)
-      self._min_solver.solve(clone2)
-      is_same = True
-      start_row = random.randrange(9)
-      start_col = random.randrange(9)
-      for i in range(9):
-        for j in range(9):
-          row = int((start_row + i) % 9)
-          col = int((start_col + j) % 9)
-          if clone1.get(row, col) != clone2.get(row, col):
-            is_same = False
-            sudoku.set(row, col, full_sudoku.get(row, col))
-            break
-        if not is_same:
-          break
-      if is_same:
+    """Make a sudoku has only one solution.
+
+    While the sudoku has more than one solution, fills in the number of the full
+    sudoku at a location where two solutions differ.
+    """
+    for _ in range(self.geometry.nr_cells - 1):
+      with self._solver_lock:
+        nr_solutions, location = self._solver.count_solutions(sudoku, limit=2)
+      if nr_solutions < 2:
         return
+      row, col = location
+      sudoku.set(row, col, full_sudoku.get(row, col))
 
   def get_sudoku_level(self, sudoku):
-    """Gets the level of the generated sudoku."""
-    nr_missing = 0
-    for row in range(9):
-      for col in range(9):
-        if sudoku.get(row, col) == ' ':
-          nr_missing += 1
-    if not self.is_partial_solvable(sudoku) or nr_missing > 52:
-      return 'CHALLENGER'
-    elif nr_missing <= 46:
-      return 'EASY'
-    elif nr_missing <= 49:
-      return 'MEDIUM'
-    else:
-      return 'HARD'
-
-  def generate_sudoku(self):
-    """Generates a new sudoku and add it to the correct level."""
-    min_nr_sudoku = min([len(sudoku) for sudoku in self._sudoku_map.values()])
-    # We already have enough sudoku in the cache.
-    if min_nr_sudoku > 10:
-      return
-    nr_spaces = 56
-    sudoku = sudoku_data.SudokuData()
-    self._solver.solve(sudoku)
-    full_sudoku = sudoku_data.SudokuData()
-    full_sudoku.copy(sudoku)
+    """Gets the level of the generated sudoku, see sudoku_rating.
+
+    Raises:
+      ValueError: If the sudoku is not solvable.
+    """
+    return sudoku_rating.rate_sudoku(sudoku).level
+
+  def _move_to_level(self, sudoku, full_sudoku, rating, level):
+    """Empties or fills in locations of a sudoku until it has a level.
+
+    Every location is visited once in random order. While the sudoku is easier
+    than the level, the number is removed if the sudoku still has one solution.
+    While it is harder, the number of the full sudoku is filled in.
+
+    Returns:
+      The rating of the sudoku, which may still not have the level.
+    """
+    target = sudoku_rating.LEVELS.index(level)
+    locations = list(self.geometry.cell_locations)
+    random.shuffle(locations)
+    for row, col in locations:
+      current = sudoku_rating.LEVELS.index(rating.level)
+      if current == target:
+        break
+      value = sudoku.get(row, col)
+      if current < target and value != ' ':
+        sudoku.set(row, col, ' ')
+        with self._solver_lock:
+          nr_solutions, _ = self._solver.count_solutions(sudoku, limit=2)
+        if nr_solutions != 1:
+          sudoku.set(row, col, value)
+          continue
+      elif current > target and value == ' ':
+        sudoku.set(row, col, full_sudoku.get(row, col))
+      else:
+        continue
+      rating = sudoku_rating.rate_sudoku(sudoku)
+    return rating
+
+  def _make_sudoku(self, level=None):
+    """Makes a new sudoku.
+
+    Args:
+      level: The level to aim for, or None for any level.
+
+    Returns:
+      A tuple of the sudoku and its sudoku_rating.Rating.
+    """
+    nr_cells = self.geometry.nr_cells
+    nr_spaces = _LEVEL_NR_SPACES.get(level, 56) * nr_cells // 81
+    sudoku = sudoku_data.SudokuData(self.geometry.box_size)
+    with self._solver_lock:
+      self._solver.solve(sudoku)
+    full_sudoku = sudoku.clone()
     nr_removed = 0
     while nr_removed < nr_spaces:
-      row = random.randrange(9)
-      col = random.randrange(9)
+      row = random.randrange(self.geometry.size)
+      col = random.randrange(self.geometry.size)
       if sudoku.get(row, col) != ' ':
         sudoku.set(row, col, ' ')
         nr_removed += 1
     self.make_one_solution(sudoku, full_sudoku)
-    curr_level = self.get_sudoku_level(sudoku)
-    sudoku_list = self._sudoku_map[curr_level]
-    if len(sudoku_list) < 100:
-      sudoku_list.append(sudoku)
+    rating = sudoku_rating.rate_sudoku(sudoku)
+    if level is not None:
+      rating = self._move_to_level(sudoku, full_sudoku, rating, level)
+    return sudoku, rating
+
+  def derive_sudokus(self, sudoku, nr_sudokus):
+    """Derives new sudokus from a sudoku without solving them.
+
+    Every sudoku is transformed from the sudoku by a random transformation that
+    keeps it valid, see sudoku_canonical.random_transform(), so it has the same
+    number of solutions and the same level.
+
+    Args:
+      sudoku: An object of sudoku_data.SudokuData.
+      nr_sudokus: The number of sudokus to derive.
+
+    Returns:
+      A list of at most nr_sudokus sudokus, all different from each other and
+        from the sudoku. Empty for sudokus with other box sizes than 3, which
+        have no transformations.
+    """
+    if sudoku.box_size != 3:
+      return []
+    keys = {sudoku.to_bytes()}
+    sudokus = []
+    for _ in range(nr_sudokus * 2):
+      if len(sudokus) >= nr_sudokus:
+        break
+      derived = sudoku_canonical.random_transform().apply(sudoku)
+      key = derived.to_bytes()
+      if key not in keys:
+        keys.add(key)
+        sudokus.append(derived)
+    return sudokus
+
+  def generate_sudoku(self, level=None):
+    """Generates a new sudoku and add it to the correct level.
+
+    The sudokus derived from it are added to the same level.
+
+    Args:
+      level: The level to aim for, or None for the level with the least
+        sudokus in the cache.
+    """
+    # We already have enough sudoku in the cache.
+    if self._is_cache_full():
+      return
+    if level is None:
+      with self._condition:
+        level = min(self._sudoku_map,
+                    key=lambda level: len(self._sudoku_map[level]))
+    sudoku, rating = self._make_sudoku(level)
+    curr_level = rating.level
+    sudokus = [sudoku] + self.derive_sudokus(sudoku, self.nr_derivations)
+    with self._condition:
+      sudoku_list = self._sudoku_map[curr_level]
+      nr_free = 100 - len(sudoku_list)
+      if nr_free > 0:
+        sudoku_list.extend(sudokus[:nr_free])
+        self._condition.notify_all()
+
+  def fill_bank(self, min_nr_sudokus, max_nr_generations=None):
+    """Generates sudokus to the bank until every level has enough sudokus.
+
+    Args:
+      min_nr_sudokus: The number of sudokus every level should have.
+      max_nr_generations: The maximum number of sudokus to generate, or None to
+        generate until every level has enough sudokus.
+
+    Returns:
+      The number of sudokus added to the bank.
+    """
+    nr_added = 0
+    nr_generations = 0
+    while (max_nr_generations is None or
+           nr_generations < max_nr_generations):
+      levels = [
+          level for level in self._sudoku_map
+          if self._bank.count(level) < min_nr_sudokus
+      ]
+      if not levels:
+        break
+      sudoku, rating = self._make_sudoku(min(levels, key=self._bank.count))
+      nr_generations += 1
+      if rating.level in levels and self._bank.add(sudoku, rating.level,
+                                                   rating.score):
+        nr_added += 1
+    return nr_added
+
+  def _is_cache_full(self):
+    """Whether every level has enough sudokus in the cache."""
+    with self._condition:
+      return min([len(sudoku) for sudoku in self._sudoku_map.values()]) > 10
 
   def _get_sudoku_with_level(self, level):
-    sudoku_list = self._sudoku_map[level]
-    if not sudoku_list:
-      return None
-    sudoku = sudoku_list[-1]
-    del sudoku_list[-1]
-    return sudoku
+    with self._condition:
+      sudoku_list = self._sudoku_map[level]
+      if not sudoku_list:
+        return None
+      sudoku = sudoku_list[-1]
+      del sudoku_list[-1]
+      self._condition.notify_all()
+      return sudoku
+
+  def _generate_in_background(self):
+    """Generates sudokus until stopped, waiting while the cache is full."""
+    while True:
+      with self._condition:
+        while not self._stopped and self._is_cache_full():
+          self._condition.wait()
+        if self._stopped:
+          return
+      self.generate_sudoku()
+
+  def start_background_generation(self):
+    """Starts generating sudokus in a background thread.
+
+    While the thread is running, get_sudoku() only takes the sudokus already
+    generated.
+    """
+    if self._thread is not None:
+      return
+    self._stopped = False
+    self._thread = threading.Thread(target=self._generate_in_background)
+    self._thread.daemon = True
+    self._thread.start()
 
-  def get_sudoku(self, level='EASY'):
+  def stop_background_generation(self):
+    """Stops the background thread after the sudoku being generated."""
+    if self._thread is None:
+      return
+    with self._condition:
+      self._stopped = True
+      self._condition.notify_all()
+    self._thread.join()
+    self._thread = None
+
+  def get_sudoku(self, level='EASY', block=True, timeout=_BACKGROUND_TIMEOUT):
     """Generates a random sudoku problem.
 
     Args:
       level: The level of the sudoku to get.
+      block: When generating in background, whether to wait for a sudoku of the
+        level to be generated.
+      timeout: When generating in background and blocking, the seconds to wait
+        for a sudoku of the level, after which the sudoku is generated in the
+        calling thread instead.
 
     Returns:
-      A random generated sudoku problem.
+      A random generated sudoku problem. When generating in background and not
+        blocking, None if no sudoku of the level is generated yet.
     """
     level = level.upper()
     if level not in {'EASY', 'MEDIUM', 'HARD', 'CHALLENGER'}:
       raise ValueError('Level {} is not valid.'.format(level))
+    if self._bank is not None:
+      sudoku = self._bank.draw(level)
+      if sudoku is not None:
+        return sudoku
+    if self._thread is not None:
+      deadline = time.monotonic() + timeout
+      with self._condition:
+        sudoku = self._get_sudoku_with_level(level)
+        while sudoku is None and block and not self._stopped:
+          remaining = deadline - time.monotonic()
+          if remaining <= 0:
+            break
+          self._condition.wait(remaining)
+          sudoku = self._get_sudoku_with_level(level)
+      if sudoku is not None or not block:
+        return sudoku
+    if self.geometry.box_size != 3:
+      # Only a few sudokus are made for the level, without reserves.
+      for _ in range(_NR_TRIES_OTHER_SIZES):
+        sudoku, rating = self._make_sudoku(level)
+        if rating.level == level:
+          break
+      return sudoku
     # Always generates two sudokus for reserves.
     for _ in range(2):
       self.generate_sudoku()
     sudoku = None
     for _ in range(100):
-      self.generate_sudoku()
+      self.generate_sudoku(level)
       sudoku = self._get_sudoku_with_level(level)
       if sudoku:
         break
     if not sudoku:
       # If can't get a sudoku with the correct level, just return
-      # a sudoku with any level.
-      for curr_level, sudoku_list in self._sudoku_map.items():
-        if sudoku_list:
-          sudoku = self._get_sudoku_with_level(curr_level)
-          break
+      # a sudoku with any level. The lock is held for the whole scan, as other
+      # threads may take the sudokus meanwhile.
+      with self._condition:
+        for sudoku_list in self._sudoku_map.values():
+          if sudoku_list:
+            sudoku = sudoku_list.pop()
+            self._condition.notify_all()
+            break
+    if not sudoku:
+      sudoku, _ = self._make_sudoku(level)
     return sudoku
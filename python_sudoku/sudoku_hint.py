@@ -0,0 +1,73 @@
+"""Hints of a sudoku being played.
+
+A hint session is a sudoku_candidates.CandidateGrid, which keeps the singles up
+to date as numbers are filled in or erased, so the next deduction is found
+without scanning the sudoku. When no single is left, the hint is taken from the
+solution, cached so the sudoku is solved at most once.
+"""
+
+import sudoku_cache
+import sudoku_candidates
+import sudoku_solver
+
+
+class HintSession(sudoku_candidates.CandidateGrid):
+  """Hints of a sudoku kept in sync with the numbers filled in."""
+
+  def __init__(self, sudoku, puzzle=None, solver=None, cache=None):
+    """Creates a session for a sudoku.
+
+    Args:
+      sudoku: An object of sudoku_data.SudokuData. It is copied, so later
+        changes must be made by set() too.
+      puzzle: The sudoku that sudoku is filled in from, or None, see
+        sudoku_cache.SolutionCache.solve().
+      solver: The sudoku_solver.SudokuSolver to solve the sudoku when no single
+        is left, a new one if None.
+      cache: The sudoku_cache.SolutionCache of the solutions, a new one if None.
+    """
+    if solver is None:
+      solver = sudoku_solver.SudokuSolver()
+    if cache is None:
+      cache = sudoku_cache.SolutionCache()
+    self._solver = solver
+    self._cache = cache
+    super(HintSession, self).__init__(sudoku)
+    self._puzzle = puzzle
+
+  def reset(self, sudoku, puzzle=None):
+    """Starts over with another sudoku, same as creating a new session."""
+    super(HintSession, self).reset(sudoku)
+    self._puzzle = puzzle
+
+  def get_hint(self):
+    """Gets the next move.
+
+    A hidden single is preferred as it's the easiest to find, then a naked
+    single, then a move of the solution.
+
+    Returns:
+      A tuple of row, column, value and technique, where the technique is
+        'hidden_single', 'naked_single' or 'solution'. None if the sudoku is
+        filled in or not solvable.
+    """
+    if not self.nr_spaces or not self.is_solvable():
+      return None
+    geometry = self._geometry
+    if self._hidden_singles:
+      key = next(iter(self._hidden_singles))
+      unit, digit = divmod(key, geometry.size)
+      position = self._places[key].bit_length() - 1
+      row, col = geometry.cell_locations[geometry.units[unit][position]]
+      return row, col, geometry.symbols[digit], 'hidden_single'
+    if self._naked_singles:
+      cell = next(iter(self._naked_singles))
+      digit = self._candidates[cell].bit_length() - 1
+      row, col = geometry.cell_locations[cell]
+      return row, col, geometry.symbols[digit], 'naked_single'
+    clone = self.sudoku.clone()
+    solution = self._cache.solve(clone, self._solver, self._puzzle)
+    if not solution:
+      return None
+    row, col, value = solution[0]
+    return row, col, value, 'solution'
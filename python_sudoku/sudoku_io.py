@@ -0,0 +1,158 @@
+"""Streaming reader and writer of sudoku files.
+
+Two formats are supported. The 'line' format has a sudoku per line with 81
+characters, where '.' or '0' is a space. The 'comma' format has a sudoku per 9
+lines with the numbers or space separated by comma, the same as
+SudokuData.from_lines, and sudokus are separated by empty lines. Files whose
+names end with '.gz' are compressed with gzip.
+"""
+
+import gzip
+import itertools
+import sudoku_data
+import sudoku_solver
+
+# The formats of sudoku files.
+_FORMATS = ('line', 'comma')
+
+
+def _open(file_name, mode):
+  """Opens a plain or gzip text file."""
+  if file_name.endswith('.gz'):
+    return gzip.open(file_name, mode + 't')
+  return open(file_name, mode)
+
+
+def _check_format(format):
+  if format not in _FORMATS:
+    raise ValueError('Format {} is not valid.'.format(format))
+
+
+def detect_format(file_name):
+  """Detects the format of a sudoku file from its first non-empty line.
+
+  Args:
+    file_name: The name of the file.
+
+  Returns:
+    The format of the file, 'comma' if the first line has a comma, otherwise
+      'line'.
+  """
+  with _open(file_name, 'r') as f:
+    for line in f:
+      line = line.strip()
+      if line and not line.startswith('#'):
+        return 'comma' if ',' in line else 'line'
+  return 'line'
+
+
+def read_sudokus(file_name, format=None):
+  """Reads sudokus from a file one at a time.
+
+  Lines that are empty or start with '#' are skipped in the 'line' format.
+
+  Args:
+    file_name: The name of the file.
+    format: The format of the file, 'line' or 'comma'. Detected from the file
+      if None.
+
+  Yields:
+    The sudokus in the file as sudoku_data.SudokuData.
+
+  Raises:
+    RuntimeError: If the file doesn't have correct format.
+  """
+  if format is None:
+    format = detect_format(file_name)
+  _check_format(format)
+  with _open(file_name, 'r') as f:
+    if format == 'line':
+      for line in f:
+        line = line.strip()
+        if not line or line.startswith('#'):
+          continue
+        sudoku = sudoku_data.SudokuData()
+        sudoku.from_line(line)
+        yield sudoku
+    else:
+      lines = []
+      for line in f:
+        line = line.rstrip('\r\n')
+        if not line:
+          continue
+        lines.append(line)
+        if len(lines) == 9:
+          sudoku = sudoku_data.SudokuData()
+          sudoku.from_lines(lines)
+          lines = []
+          yield sudoku
+      if lines:
+        raise RuntimeError('The number of lines is less than 9.')
+
+
+def _write_sudoku(f, sudoku, format):
+  """Writes a sudoku to an opened file."""
+  if format == 'line':
+    f.write(sudoku.to_line() + '\n')
+  else:
+    f.write('\n'.join(sudoku.to_lines()) + '\n\n')
+
+
+def write_sudokus(file_name, sudokus, format='line'):
+  """Writes sudokus to a file one at a time.
+
+  Args:
+    file_name: The name of the file.
+    sudokus: An iterable of sudoku_data.SudokuData to write.
+    format: The format of the file, 'line' or 'comma'.
+
+  Returns:
+    The number of sudokus written.
+  """
+  _check_format(format)
+  nr_sudokus = 0
+  with _open(file_name, 'w') as f:
+    for sudoku in sudokus:
+      _write_sudoku(f, sudoku, format)
+      nr_sudokus += 1
+  return nr_sudokus
+
+
+def solve_file(input_name, output_name, format=None, workers=1, **solve_args):
+  """Solves all the sudokus in a file and writes the solutions to another.
+
+  Sudokus are read, solved and written one chunk at a time, so the files can be
+  larger than the memory.
+
+  Args:
+    input_name: The name of the file with the sudokus.
+    output_name: The name of the file to write the solved sudokus to, in the
+      same format as the input file. A sudoku that can't be solved is written
+      unchanged.
+    format: The format of the input file, 'line' or 'comma'. Detected from the
+      file if None.
+    workers: The number of worker processes, see sudoku_solver.solve_many().
+    **solve_args: Other arguments of sudoku_solver.solve_many().
+
+  Returns:
+    A tuple of the number of sudokus and the number of them not solvable.
+  """
+  if format is None:
+    format = detect_format(input_name)
+  # solve_many() only reads a few chunks ahead, so the sudokus buffered by tee
+  # are bounded.
+  sudokus, pending_sudokus = itertools.tee(read_sudokus(input_name, format))
+  solutions = sudoku_solver.solve_many(
+      pending_sudokus, workers=workers, **solve_args)
+  nr_sudokus = 0
+  nr_not_solvable = 0
+  with _open(output_name, 'w') as f:
+    for sudoku, (_, solution) in zip(sudokus, solutions):
+      if solution is None:
+        nr_not_solvable += 1
+      else:
+        for row, col, value in solution:
+          sudoku.set(row, col, value)
+      _write_sudoku(f, sudoku, format)
+      nr_sudokus += 1
+  return nr_sudokus, nr_not_solvable
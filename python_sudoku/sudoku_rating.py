@@ -0,0 +1,103 @@
+"""Difficulty rating of sudokus.
+
+A sudoku is rated by the techniques needed to solve it the way a human does. The
+solver applies all the techniques it can in rounds, and every application adds
+the score of the technique. When no technique applies, the rest is solved by
+guessing, and every guess adds a much higher score.
+"""
+
+import collections
+import sudoku_solver
+
+# The levels from the easiest to the hardest.
+LEVELS = ('EASY', 'MEDIUM', 'HARD', 'CHALLENGER')
+
+# Score of every application of a technique. Techniques not listed score 1.
+TECHNIQUE_SCORES = {
+    'hidden_single': 1,
+    'naked_single': 2,
+    # The strategies only applied by solvers created with them.
+    'pointing': 5,
+    'box_line': 5,
+    'naked_pairs': 10,
+    'hidden_pairs': 15,
+    'naked_triples': 20,
+    'hidden_triples': 25,
+    'x_wing': 30,
+}
+# Score of every number tried when no technique applies.
+_GUESS_SCORE = 50
+# Score of every round of techniques, as later rounds depend on earlier ones.
+_ROUND_SCORE = 5
+# The highest score of every level but the hardest, for a sudoku of 81 cells.
+# The scores are scaled by the number of cells for other sizes. They are picked
+# by hand between the scores of the easy, hard and challenger sudokus of
+# test_data, so they must be checked again when the scores above change.
+_LEVEL_MAX_SCORES = (('EASY', 76), ('MEDIUM', 88), ('HARD', 120))
+
+
+class Rating(object):
+  """The difficulty rating of a sudoku."""
+
+  def __init__(self, technique_counts, nr_rounds, nr_guesses, nr_cells=81):
+    # Number of times every technique is applied.
+    self.technique_counts = technique_counts
+    # Number of rounds of techniques applied.
+    self.nr_rounds = nr_rounds
+    # Number of numbers tried when no technique applies, 0 if the sudoku can be
+    # solved with techniques only.
+    self.nr_guesses = nr_guesses
+    self.score = (
+        sum(TECHNIQUE_SCORES.get(technique, 1) * count
+            for technique, count in technique_counts.items()) +
+        _ROUND_SCORE * nr_rounds + _GUESS_SCORE * nr_guesses)
+    self.level = get_level(self.score, nr_guesses, nr_cells)
+
+  def __repr__(self):
+    return 'Rating(score={}, level={}, rounds={}, guesses={}, {})'.format(
+        self.score, self.level, self.nr_rounds, self.nr_guesses,
+        dict(self.technique_counts))
+
+
+def get_level(score, nr_guesses=0, nr_cells=81):
+  """Gets the level of a score. A sudoku needing guesses is the hardest."""
+  if nr_guesses:
+    return LEVELS[-1]
+  for level, max_score in _LEVEL_MAX_SCORES:
+    if score <= max_score * nr_cells / 81:
+      return level
+  return LEVELS[-1]
+
+
+def rate_sudoku(sudoku, solver=None):
+  """Rates the difficulty of a sudoku.
+
+  Args:
+    sudoku: An object of sudoku_data.SudokuData. It is not changed.
+    solver: The sudoku_solver.SudokuSolver to use. A new solver trying numbers
+      in increasing order is used if None, so the rating is deterministic.
+
+  Returns:
+    A Rating.
+
+  Raises:
+    ValueError: If the sudoku is not solvable.
+  """
+  if solver is None:
+    solver = sudoku_solver.SudokuSolver(randomize_type='min')
+  clone = sudoku.clone()
+  technique_counts = collections.Counter()
+  nr_rounds = 0
+  nr_cells = sudoku.geometry.nr_cells
+  for _ in range(nr_cells):
+    moves = solver.solve(clone, partial=True)
+    if not moves:
+      break
+    technique_counts.update(solver.technique_counts)
+    nr_rounds += 1
+  nr_guesses = 0
+  if not clone.is_solved():
+    if solver.solve(clone, engine='bitmask') is None:
+      raise ValueError('The sudoku is not solvable.')
+    nr_guesses = solver.nr_guesses
+  return Rating(technique_counts, nr_rounds, nr_guesses, nr_cells)
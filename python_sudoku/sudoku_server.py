@@ -0,0 +1,363 @@
+"""Local HTTP server solving and generating sudokus with JSON.
+
+The server only listens on localhost. Every sudoku is a line of 81 characters
+row by row, where '.' or '0' is a space.
+
+  POST /solve     {"sudoku": line} -> {"solution": line or null}
+  POST /hint      {"sudoku": line} -> {"hint": [row, col, value] or null}
+  POST /validate  {"sudoku": line} -> {"valid": bool, "solved": bool,
+                                       "nr_solutions": 0, 1 or 2}
+  GET  /generate?level=EASY       -> {"level": level, "sudoku": line}
+
+The solving requests are solved by a pool of worker processes, each within a
+number of nodes, and answered with 503 when the nodes run out or 504 when
+waiting for them times out. Requests coming at about the same time are sent to
+a worker together as a batch, so a busy server sends fewer and bigger messages
+to the workers. Sudokus are generated in the background for every level ahead
+of the requests. Run it with:
+
+  python3 sudoku_server.py --port 8080
+"""
+
+import argparse
+import concurrent.futures
+import http.server
+import json
+import multiprocessing
+import queue
+import sudoku_cache
+import sudoku_data
+import sudoku_generator
+import sudoku_solver
+import threading
+import time
+import urllib.parse
+
+_ACTIONS = ('solve', 'hint', 'validate')
+# Number of sudokus derived from every generated sudoku, same as the UI.
+_NR_DERIVATIONS = 3
+
+# The solver of a worker process.
+_worker_solver = None
+# The solutions cached by a worker process, as the same sudokus are often
+# solved again.
+_worker_cache = None
+# The maximum number of nodes to solve a sudoku in a worker process.
+_worker_max_nodes = None
+
+
+def _initialize_worker(max_nodes):
+  """Creates the solver of a worker process."""
+  global _worker_solver, _worker_cache, _worker_max_nodes
+  _worker_solver = sudoku_solver.SudokuSolver()
+  _worker_cache = sudoku_cache.SolutionCache()
+  _worker_max_nodes = max_nodes
+
+
+def _solve(sudoku):
+  """Solves a sudoku in a worker process, None if it is not valid."""
+  if not sudoku.is_valid():
+    return None
+  return _worker_cache.solve(
+      sudoku, _worker_solver, max_nodes=_worker_max_nodes)
+
+
+def _run_action(action, line):
+  """Runs an action on a sudoku in a worker process.
+
+  Returns:
+    A tuple of the HTTP status and the dictionary of the response.
+  """
+  sudoku = sudoku_data.SudokuData()
+  sudoku.from_line(line)
+  try:
+    if action == 'solve':
+      solution = _solve(sudoku)
+      return 200, {'solution': None if solution is None else sudoku.to_line()}
+    if action == 'hint':
+      # Same as the hint of the UI, a move found without guessing if any.
+      solution = None
+      if sudoku.is_valid():
+        solution = _worker_solver.solve(
+            sudoku, partial=True, max_nodes=_worker_max_nodes)
+      if not solution:
+        solution = _solve(sudoku)
+      return 200, {'hint': list(solution[0]) if solution else None}
+    valid = sudoku.is_valid()
+    nr_solutions = 0
+    if valid:
+      nr_solutions, _ = _worker_solver.count_solutions(
+          sudoku, max_nodes=_worker_max_nodes)
+    return 200, {
+        'valid': valid,
+        'solved': valid and sudoku.is_solved(),
+        'nr_solutions': nr_solutions,
+    }
+  except sudoku_solver.BudgetExceededError as e:
+    return 503, {'error': str(e)}
+
+
+def _run_batch(batch):
+  """Runs a batch of tuples of action and line in a worker process."""
+  return [_run_action(action, line) for action, line in batch]
+
+
+class SolvingBackend(object):
+  """A pool of worker processes running solving requests in batches."""
+
+  def __init__(self,
+               workers=None,
+               max_batch_size=16,
+               max_delay=0.001,
+               max_nodes=100000):
+    """Starts the worker processes.
+
+    Args:
+      workers: The number of worker processes, the number of CPUs if None.
+      max_batch_size: The maximum number of requests sent to a worker at a time.
+      max_delay: The maximum number of seconds to wait for more requests to
+        batch with the first one.
+      max_nodes: The maximum number of nodes to solve a sudoku, or None.
+    """
+    self._max_batch_size = max_batch_size
+    self._max_delay = max_delay
+    self._pool = multiprocessing.Pool(
+        workers or multiprocessing.cpu_count(),
+        initializer=_initialize_worker,
+        initargs=(max_nodes,))
+    # Tuples of action, line and future of the requests not sent yet, and None
+    # to stop.
+    self._requests = queue.Queue()
+    self.nr_requests = 0
+    self.nr_batches = 0
+    self._thread = threading.Thread(target=self._send_batches)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def close(self):
+    """Stops the worker processes after the requests submitted."""
+    self._requests.put(None)
+    self._thread.join()
+    self._pool.close()
+    self._pool.join()
+
+  def submit(self, action, sudoku):
+    """Submits a request.
+
+    Args:
+      action: 'solve', 'hint' or 'validate'.
+      sudoku: An object of sudoku_data.SudokuData. It is not changed.
+
+    Returns:
+      A concurrent.futures.Future of a tuple of the HTTP status and the
+        dictionary of the response.
+
+    Raises:
+      ValueError: If the action is not valid.
+    """
+    if action not in _ACTIONS:
+      raise ValueError('Action {} is not valid.'.format(action))
+    future = concurrent.futures.Future()
+    self._requests.put((action, sudoku.to_line(), future))
+    return future
+
+  def _get_batch(self):
+    """Waits for the next batch of requests, or None to stop."""
+    request = self._requests.get()
+    if request is None:
+      return None
+    batch = [request]
+    deadline = time.monotonic() + self._max_delay
+    while len(batch) < self._max_batch_size:
+      try:
+        request = self._requests.get(
+            timeout=max(0, deadline - time.monotonic()))
+      except queue.Empty:
+        break
+      if request is None:
+        # Stops after sending this batch.
+        self._requests.put(None)
+        break
+      batch.append(request)
+    return batch
+
+  def _send_batches(self):
+    while True:
+      batch = self._get_batch()
+      if batch is None:
+        return
+      self.nr_requests += len(batch)
+      self.nr_batches += 1
+      futures = [future for _, _, future in batch]
+
+      def set_results(results, futures=futures):
+        for future, result in zip(futures, results):
+          future.set_result(result)
+
+      def set_exception(exception, futures=futures):
+        for future in futures:
+          future.set_exception(exception)
+
+      self._pool.apply_async(
+          _run_batch, ([(action, line) for action, line, _ in batch],),
+          callback=set_results,
+          error_callback=set_exception)
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+  """Handler of the requests of SudokuServer."""
+
+  def log_message(self, format, *args):
+    if self.server.verbose:
+      super(_RequestHandler, self).log_message(format, *args)
+
+  def _send_json(self, status, response):
+    body = json.dumps(response).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def _read_json(self):
+    """Reads the body of the request as a JSON object.
+
+    Raises:
+      ValueError: If the body is not a JSON object.
+    """
+    length = int(self.headers.get('Content-Length') or 0)
+    request = json.loads(self.rfile.read(length) or b'{}')
+    if not isinstance(request, dict):
+      raise ValueError('The request is not a JSON object.')
+    return request
+
+  def _generate(self, level):
+    sudoku = self.server.generator.get_sudoku(level=level)
+    self._send_json(200, {'level': level.upper(), 'sudoku': sudoku.to_line()})
+
+  def do_GET(self):
+    url = urllib.parse.urlparse(self.path)
+    if url.path != '/generate':
+      self._send_json(404, {'error': 'Path {} is not found.'.format(url.path)})
+      return
+    query = urllib.parse.parse_qs(url.query)
+    try:
+      self._generate(query.get('level', ['EASY'])[0])
+    except ValueError as e:
+      self._send_json(400, {'error': str(e)})
+
+  def do_POST(self):
+    action = self.path.strip('/')
+    if action not in _ACTIONS and action != 'generate':
+      self._send_json(404, {'error': 'Path {} is not found.'.format(self.path)})
+      return
+    try:
+      request = self._read_json()
+      if action == 'generate':
+        self._generate(str(request.get('level', 'EASY')))
+        return
+      sudoku = sudoku_data.SudokuData()
+      sudoku.from_line(str(request.get('sudoku', '')))
+    except (ValueError, RuntimeError) as e:
+      self._send_json(400, {'error': str(e)})
+      return
+    future = self.server.backend.submit(action, sudoku)
+    try:
+      status, response = future.result(timeout=self.server.request_timeout)
+    except concurrent.futures.TimeoutError:
+      status, response = 504, {
+          'error': 'The request is not done in {} seconds.'.format(
+              self.server.request_timeout)
+      }
+    self._send_json(status, response)
+
+
+class SudokuServer(http.server.ThreadingHTTPServer):
+  """HTTP server of sudokus on localhost."""
+
+  daemon_threads = True
+
+  def __init__(self,
+               port=8080,
+               workers=None,
+               max_batch_size=16,
+               max_nodes=100000,
+               request_timeout=60,
+               generator=None,
+               verbose=False):
+    """Starts the server, without serving requests yet.
+
+    Args:
+      port: The port to listen on localhost, any free port if 0.
+      workers: The number of worker processes, the number of CPUs if None.
+      max_batch_size: The maximum number of requests sent to a worker at a time.
+      max_nodes: The maximum number of nodes to solve a sudoku, or None.
+      request_timeout: The maximum number of seconds to wait for a solving
+        request, after which it's answered with 504, or None.
+      generator: The sudoku_generator.SudokuGenerator to generate sudokus in the
+        background, a new one if None.
+      verbose: Whether to log every request.
+    """
+    super(SudokuServer, self).__init__(('localhost', port), _RequestHandler)
+    self.verbose = verbose
+    self.request_timeout = request_timeout
+    # Starts the worker processes before any threads of this process.
+    self.backend = SolvingBackend(
+        workers=workers, max_batch_size=max_batch_size, max_nodes=max_nodes)
+    self.generator = generator or sudoku_generator.SudokuGenerator(
+        nr_derivations=_NR_DERIVATIONS)
+    self.generator.start_background_generation()
+
+  def server_close(self):
+    super(SudokuServer, self).server_close()
+    self.generator.stop_background_generation()
+    self.backend.close()
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Serves solving and generating sudokus on localhost.')
+  parser.add_argument(
+      '--port', type=int, default=8080, help='The port to listen on.')
+  parser.add_argument(
+      '--workers',
+      type=int,
+      default=None,
+      help='The number of worker processes, the number of CPUs if not set.')
+  parser.add_argument(
+      '--max_batch_size',
+      type=int,
+      default=16,
+      help='The maximum number of requests sent to a worker at a time.')
+  parser.add_argument(
+      '--max_nodes',
+      type=int,
+      default=100000,
+      help='The maximum number of nodes to solve a sudoku.')
+  parser.add_argument(
+      '--request_timeout',
+      type=float,
+      default=60,
+      help='The maximum number of seconds to wait for a solving request.')
+  parser.add_argument(
+      '--verbose', action='store_true', help='Logs every request.')
+  args = parser.parse_args()
+  server = SudokuServer(
+      port=args.port,
+      workers=args.workers,
+      max_batch_size=args.max_batch_size,
+      max_nodes=args.max_nodes,
+      request_timeout=args.request_timeout,
+      verbose=args.verbose)
+  print('Serving sudokus on http://localhost:{}'.format(
+      server.server_address[1]))
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+
+if __name__ == '__main__':
+  main()
@@ -1,8 +1,14 @@
 """Sudoku Solver."""
 
+import collections
 import copy
+import itertools
+import multiprocessing
+import queue
 import random
 import sudoku_data
+import sudoku_dlx
+import time
 
 # A region is a row, column, or a box where each number 1-9 will appear once and
 # only once.
@@ -13,6 +19,136 @@ _COLUMN_REGION = 1
 # A region represent a box.
 _BOX_REGION = 2
 
+# The engines that solve() can use. The set engine keeps candidates as sets of
+# characters, the bitmask engine keeps them as integers where bit d stands for
+# the number sudoku_data.SYMBOLS[d], the stack engine searches the bitmask state
+# with an explicit stack instead of recursion, see Search, and the dlx engine
+# solves the sudoku as an exact cover problem with Dancing Links. All but the
+# set engine solve sudokus of every box size, but the dlx engine can be much
+# slower than the bitmask engine for a box size of 5, which is the default for
+# box sizes other than 3.
+_ENGINES = ('set', 'bitmask', 'stack', 'dlx')
+
+# The strategies that the set engine can apply when no single number can be
+# filled in, from the cheapest to the most expensive. They only remove possible
+# values, so more single numbers can be filled in afterwards.
+STRATEGIES = ('pointing', 'box_line', 'naked_pairs', 'hidden_pairs',
+              'naked_triples', 'hidden_triples', 'x_wing')
+
+# Types of the changes recorded in the trail of the set engine, so that they can
+# be undone when a guess fails.
+# A possible value removed from a location.
+_TRAIL_VALUE = 0
+# A location moved between the groups of the number of possible values.
+_TRAIL_GROUP = 1
+# A location removed from the possible locations of a number in a region.
+_TRAIL_LOCATION = 2
+# All the possible locations of a number in a region removed.
+_TRAIL_LOCATIONS = 3
+# A unique location of a number in a region changed.
+_TRAIL_UNIQUE = 4
+
+# Number of bits set in every 9-bit mask.
+_MASK_COUNTS = [bin(mask).count('1') for mask in range(512)]
+# The digits (bit indexes) set in every 9-bit mask.
+_MASK_DIGITS = [
+    tuple(digit for digit in range(9) if mask >> digit & 1)
+    for mask in range(512)
+]
+
+
+# The geometry of the classic sudoku used by the set engine, where a region is a
+# unit of sudoku_data.
+# The cells of every region.
+_UNIT_CELLS = sudoku_data.UNITS
+# For every cell, the tuples of (region, position in region) it belongs to.
+_CELL_UNITS = sudoku_data.CELL_UNITS
+# For every cell, the other 20 cells sharing a region with it.
+_CELL_PEERS = sudoku_data.CELL_PEERS
+# For every cell, the tuple of its row and column.
+_CELL_LOCATIONS = sudoku_data.CELL_LOCATIONS
+# For every cell, the locations of its peers.
+_PEER_LOCATIONS = tuple(
+    tuple(_CELL_LOCATIONS[peer] for peer in peers) for peers in _CELL_PEERS)
+# Every region as a tuple of region type, region number and the list of its
+# locations as tuples of row and column.
+_REGIONS = [(unit // 9, unit % 9, [_CELL_LOCATIONS[cell] for cell in cells])
+            for unit, cells in enumerate(_UNIT_CELLS)]
+# For every cell, the box it is in.
+_CELL_BOXES = tuple(units[2][0] - 18 for units in _CELL_UNITS)
+# For every cell, a dictionary mapping every value to the keys of the possible
+# locations of the value in the regions of the cell, see _get_region_keys().
+_REGION_KEYS = tuple({
+    value: tuple((unit // 9, unit % 9, value) for unit, _ in units)
+    for value in '123456789'
+} for units in _CELL_UNITS)
+
+
+class _MaskCounts(dict):
+  """Number of bits set in every mask, calculated when first needed."""
+
+  def __missing__(self, mask):
+    count = bin(mask).count('1')
+    self[mask] = count
+    return count
+
+
+class _MaskDigits(dict):
+  """The digits (bit indexes) set in every mask, calculated when first needed."""
+
+  def __missing__(self, mask):
+    digits = tuple(
+        digit for digit in range(mask.bit_length()) if mask >> digit & 1)
+    self[mask] = digits
+    return digits
+
+
+class _BitmaskTables(object):
+  """The tables of the bitmask engine for the sudokus of a box size."""
+
+  def __init__(self, geometry):
+    size = geometry.size
+    self.size = size
+    self.nr_cells = geometry.nr_cells
+    self.nr_units = len(geometry.units)
+    self.all_digits_mask = (1 << size) - 1
+    self.symbols = geometry.symbols
+    # A dictionary mapping every number to its digit.
+    self.digits = {symbol: digit for digit, symbol in enumerate(self.symbols)}
+    self.unit_cells = geometry.units
+    # For every cell, the tuples of the region, the index of its first possible
+    # positions, and the bit of the cell in the positions.
+    self.cell_units = tuple(
+        tuple((unit, unit * size, 1 << position)
+              for unit, position in units)
+        for units in geometry.cell_units)
+    self.cell_peers = geometry.cell_peers
+    self.cell_locations = geometry.cell_locations
+    # For every index of the possible positions, the tuple of the region and
+    # the digit.
+    self.location_keys = tuple(
+        divmod(index, size) for index in range(self.nr_units * size))
+    if size == 9:
+      self.mask_counts = _MASK_COUNTS
+      self.mask_digits = _MASK_DIGITS
+    else:
+      # Tables of all the masks of 16 or 25 bits are too big.
+      self.mask_counts = _MaskCounts()
+      self.mask_digits = _MaskDigits()
+
+
+# The tables of the bitmask engine of every box size, created when first needed.
+_BITMASK_TABLES = {}
+
+
+def _get_bitmask_tables(geometry):
+  """Gets the _BitmaskTables of a sudoku_data.Geometry."""
+  tables = _BITMASK_TABLES.get(geometry.box_size)
+  if tables is None:
+    tables = _BitmaskTables(geometry)
+    _BITMASK_TABLES[geometry.box_size] = tables
+  return tables
+
 
 def _get_randomized_list(data):
   """Returns a randomized list."""
@@ -30,10 +166,104 @@ def _get_randomized_list(data):
   return randomized_data
 
 
+class BudgetExceededError(RuntimeError):
+  """Raised by SudokuSolver.solve() when the deadline or the nodes run out.
+
+  The sudoku is restored as before solving.
+  """
+
+  def __init__(self, message, stats=None):
+    super(BudgetExceededError, self).__init__(message)
+    # The SolverStats of the solve until it's aborted.
+    self.stats = stats
+
+
+class SolverStats(object):
+  """Statistics of solving sudokus.
+
+  The statistics of many solves can be merged into one, also from other
+  processes as the statistics can be pickled.
+  """
+
+  def __init__(self):
+    # Number of calls to solve().
+    self.nr_solves = 0
+    # Number of sudokus found not solvable.
+    self.nr_not_solvable = 0
+    # Number of solves aborted by BudgetExceededError.
+    self.nr_budget_exceeded = 0
+    # Number of numbers tried at locations when no technique applies.
+    self.nr_guesses = 0
+    # The maximum number of guesses on top of each other.
+    self.max_depth = 0
+    # Number of times the possible values of the whole sudoku are initialized.
+    self.nr_initializations = 0
+    # Number of possible values removed.
+    self.nr_eliminations = 0
+    # Number of initializations avoided by the trail.
+    self.rebuilds_avoided = 0
+    # Number of times every technique is applied.
+    self.technique_counts = collections.Counter()
+    # Seconds spent in every phase: 'solve' for the whole solve() calls,
+    # 'initialize' for initializing the possible values, and 'strategies' for
+    # applying the strategies.
+    self.phase_times = collections.Counter()
+
+  def merge(self, other):
+    """Adds the statistics of another SolverStats to this one."""
+    self.nr_solves += other.nr_solves
+    self.nr_not_solvable += other.nr_not_solvable
+    self.nr_budget_exceeded += other.nr_budget_exceeded
+    self.nr_guesses += other.nr_guesses
+    self.max_depth = max(self.max_depth, other.max_depth)
+    self.nr_initializations += other.nr_initializations
+    self.nr_eliminations += other.nr_eliminations
+    self.rebuilds_avoided += other.rebuilds_avoided
+    self.technique_counts.update(other.technique_counts)
+    self.phase_times.update(other.phase_times)
+
+  def to_dict(self):
+    """Returns the statistics as a dictionary, for example to dump as JSON."""
+    return {
+        'nr_solves': self.nr_solves,
+        'nr_not_solvable': self.nr_not_solvable,
+        'nr_budget_exceeded': self.nr_budget_exceeded,
+        'nr_guesses': self.nr_guesses,
+        'max_depth': self.max_depth,
+        'nr_initializations': self.nr_initializations,
+        'nr_eliminations': self.nr_eliminations,
+        'rebuilds_avoided': self.rebuilds_avoided,
+        'technique_counts': dict(self.technique_counts),
+        'phase_times': dict(self.phase_times),
+    }
+
+  def __repr__(self):
+    return 'SolverStats({})'.format(self.to_dict())
+
+
 class SudokuSolver(object):
   """Class for sudoku solver."""
 
-  def __init__(self, randomize_type='random'):
+  def __init__(self,
+               randomize_type='random',
+               use_trail=False,
+               strategies=(),
+               collect_stats=False):
+    """Creates a solver.
+
+    Args:
+      randomize_type: Type of ranomizing, can be random, min or max.
+      use_trail: Whether the set engine undoes failed guesses with a trail.
+      strategies: The names of the strategies in STRATEGIES that the set engine
+        applies before guessing.
+      collect_stats: Whether to collect statistics in stats and last_stats.
+
+    Raises:
+      ValueError: If a strategy is not valid.
+    """
+    for strategy in strategies:
+      if strategy not in STRATEGIES:
+        raise ValueError('Strategy {} is not valid.'.format(strategy))
     self._sudoku = sudoku_data.SudokuData()
     self._possible_values = [[set()] * 9 for _ in range(9)]
     # A list grouping locations by the number of possible values.
@@ -46,6 +276,54 @@ class SudokuSolver(object):
     self._unique_locations = {}
     # Type of ranomizing, can be random, min or max.
     self.randomize_type = randomize_type
+    # Whether the set engine undoes failed guesses with a trail of changes
+    # instead of reinitializing all the possible values and locations.
+    self.use_trail = use_trail
+    # The trail of changes, a list of tuples of the change type and the data
+    # needed to undo it. None if the changes are not recorded.
+    self._trail = None
+    # Number of reinitializations avoided by the trail since the solver is
+    # created.
+    self.rebuilds_avoided = 0
+    # The strategies applied in the order of STRATEGIES.
+    self.strategies = [
+        strategy for strategy in STRATEGIES if strategy in strategies
+    ]
+    # Number of times every technique is applied by the last solve(), such as
+    # 'naked_single' for a location with only one possible number, and
+    # 'hidden_single' for a number with only one possible location in a region.
+    # A strategy is counted every time it removes possible values.
+    self.technique_counts = collections.Counter()
+    # Number of numbers tried at locations by the last solve() when no
+    # technique applies.
+    self.nr_guesses = 0
+    # The SolverStats of all the solve() calls, and of the last one. None if
+    # statistics are not collected, so that they cost nothing.
+    self.stats = SolverStats() if collect_stats else None
+    self.last_stats = None
+    # The budget of the current solve(): whether it's limited, the deadline in
+    # time.monotonic() seconds or None, the maximum number of nodes or None,
+    # and the number of nodes so far.
+    self._limited = False
+    self._deadline = None
+    self._max_nodes = None
+    self._nr_nodes = 0
+    # Whether abort() is called.
+    self._aborted = False
+    if collect_stats:
+      # Count the eliminations only with statistics, as they are the hot path.
+      self._remove_possible_values = self._remove_possible_values_with_stats
+      self._bitmask_eliminate = self._bitmask_eliminate_with_stats
+    # State of the bitmask engine. Candidates of every cell as a 9-bit mask,
+    # possible positions of every number in every region as a 9-bit mask
+    # indexed by region * 9 + digit, numbers already placed in every region as
+    # a 9-bit mask, and the digit + 1 filled in every cell, or 0 if empty.
+    self._candidates = [0] * 81
+    self._locations = [0] * 243
+    self._placed = [0] * 27
+    self._values = [0] * 81
+    # The _BitmaskTables of the sudoku of the bitmask engine.
+    self._tables = _get_bitmask_tables(sudoku_data.get_geometry(3))
 
   def _get_region_keys(self, row, col, value):
     """Gets the key for the possible location dictionary that a particular location and value impacts.
@@ -61,8 +339,7 @@ class SudokuSolver(object):
     Returns:
       The keys to the map of possible locations.
     """
-    return [(_ROW_REGION, row, value), (_COLUMN_REGION, col, value),
-            (_BOX_REGION, int(row / 3) * 3 + int(col / 3), value)]
+    return _REGION_KEYS[row * 9 + col][value]
 
   def _remove_possible_values(self, row, col, value):
     """Removes one possible number at a particular location.
@@ -73,23 +350,39 @@ class SudokuSolver(object):
       value: A character between '1' and '9' to remove as a possible value.
     """
     if value in self._possible_values[row][col]:
+      trail = self._trail
       orig_len = len(self._possible_values[row][col])
       self._possible_values[row][col].remove(value)
+      if trail is not None:
+        trail.append((_TRAIL_VALUE, (row, col), value))
       # Update the dictionary grouping the location by number of possible
       # values.
       if (row, col) in self._location_groups[orig_len]:
         self._location_groups[orig_len].remove((row, col))
         self._location_groups[orig_len - 1].add((row, col))
+        if trail is not None:
+          trail.append((_TRAIL_GROUP, (row, col), (orig_len, orig_len - 1)))
       # Update the possible locations for the regions this location impacts.
-      for key in self._get_region_keys(row, col, value):
+      for key in _REGION_KEYS[row * 9 + col][value]:
         if key in self._possible_locations:
           locations = self._possible_locations[key]
           if (row, col) in locations:
             locations.remove((row, col))
+            if trail is not None:
+              trail.append((_TRAIL_LOCATION, key, (row, col)))
             if len(locations) == 1:
               for l in locations:
+                if trail is not None:
+                  trail.append(
+                      (_TRAIL_UNIQUE, key, self._unique_locations.get(key)))
                 self._unique_locations[key] = l
 
+  def _remove_possible_values_with_stats(self, row, col, value):
+    """_remove_possible_values counting the elimination in last_stats."""
+    if value in self._possible_values[row][col]:
+      self.last_stats.nr_eliminations += 1
+      SudokuSolver._remove_possible_values(self, row, col, value)
+
   def _update_possible_values(self, row, col, value):
     """Updates possible values when adding a number at a particular location.
 
@@ -98,31 +391,57 @@ class SudokuSolver(object):
       col: The col of the location.
       value: A character between '1' and '9' to be added at the location.
     """
+    trail = self._trail
     possible_values = self._possible_values[row][col]
     group = self._location_groups[len(possible_values)]
     if (row, col) in group:
       group.remove((row, col))
+      if trail is not None:
+        trail.append((_TRAIL_GROUP, (row, col), (len(possible_values), None)))
     for c in copy.copy(possible_values):
       if c != value:
         self._remove_possible_values(row, col, c)
-    for i in range(9):
-      if i != row and self._sudoku.get(i, col) == ' ':
-        self._remove_possible_values(i, col, value)
-    for i in range(9):
-      if i != col and self._sudoku.get(row, i) == ' ':
-        self._remove_possible_values(row, i, value)
-    low = int(row / 3) * 3
-    left = int(col / 3) * 3
-    for i in range(low, low + 3):
-      for j in range(left, left + 3):
-        if (i != row or j != col) and self._sudoku.get(i, j) == ' ':
-          self._remove_possible_values(i, j, value)
-    # Remove possible locations as this location is filled in.
-    for key in self._get_region_keys(row, col, value):
+    sudoku = self._sudoku
+    for peer_row, peer_col in _PEER_LOCATIONS[row * 9 + col]:
+      if sudoku.get(peer_row, peer_col) == ' ':
+        self._remove_possible_values(peer_row, peer_col, value)
+    # Remove possible locations as this location is filled in. A value that is
+    # not a number has no possible locations.
+    for key in _REGION_KEYS[row * 9 + col].get(value, ()):
       if key in self._possible_locations:
+        if trail is not None:
+          trail.append((_TRAIL_LOCATIONS, key, self._possible_locations[key]))
         del self._possible_locations[key]
       if key in self._unique_locations:
+        if trail is not None:
+          trail.append((_TRAIL_UNIQUE, key, self._unique_locations[key]))
+        del self._unique_locations[key]
+
+  def _rewind_trail(self, mark):
+    """Undoes the changes recorded in the trail after a mark.
+
+    Args:
+      mark: The length of the trail before the changes to undo.
+    """
+    trail = self._trail
+    while len(trail) > mark:
+      change_type, key, data = trail.pop()
+      if change_type == _TRAIL_VALUE:
+        row, col = key
+        self._possible_values[row][col].add(data)
+      elif change_type == _TRAIL_GROUP:
+        orig_len, new_len = data
+        if new_len is not None:
+          self._location_groups[new_len].remove(key)
+        self._location_groups[orig_len].add(key)
+      elif change_type == _TRAIL_LOCATION:
+        self._possible_locations[key].add(data)
+      elif change_type == _TRAIL_LOCATIONS:
+        self._possible_locations[key] = data
+      elif data is None:
         del self._unique_locations[key]
+      else:
+        self._unique_locations[key] = data
 
   def _initialize_possible_values(self):
     """Initializes possible values at every location."""
@@ -166,8 +485,192 @@ class SudokuSolver(object):
 
   def _initialize_data(self):
     """Initializes possible values and possible locations."""
+    stats = self.last_stats
+    if stats is None:
+      self._initialize_possible_values()
+      self._initialize_possible_locations()
+      return
+    start = time.perf_counter()
     self._initialize_possible_values()
     self._initialize_possible_locations()
+    stats.phase_times['initialize'] += time.perf_counter() - start
+    stats.nr_initializations += 1
+
+  def _remove_values_from(self, locations, values):
+    """Removes possible values from locations.
+
+    Returns:
+      True if any possible value is removed.
+    """
+    removed = False
+    for row, col in locations:
+      possible_values = self._possible_values[row][col]
+      for value in values:
+        if value in possible_values:
+          self._remove_possible_values(row, col, value)
+          removed = True
+    return removed
+
+  def _apply_pointing(self):
+    """Applies pointing pairs and triples.
+
+    When the possible locations of a number in a box are all in one row or
+    column, the number can't be anywhere else in the row or column.
+    """
+    for _, box, _ in _REGIONS[18:]:
+      for value in '123456789':
+        locations = self._possible_locations.get((_BOX_REGION, box, value))
+        if not locations or len(locations) > 3:
+          continue
+        rows = {row for row, _ in locations}
+        cols = {col for _, col in locations}
+        if len(rows) == 1:
+          row = rows.pop()
+          others = [(row, col) for col in range(9) if (row, col) not in locations]
+        elif len(cols) == 1:
+          col = cols.pop()
+          others = [(row, col) for row in range(9) if (row, col) not in locations]
+        else:
+          continue
+        if self._remove_values_from(others, value):
+          return True
+    return False
+
+  def _apply_box_line(self):
+    """Applies box/line reduction.
+
+    When the possible locations of a number in a row or column are all in one
+    box, the number can't be anywhere else in the box.
+    """
+    for region_type, region, _ in _REGIONS[:18]:
+      for value in '123456789':
+        locations = self._possible_locations.get((region_type, region, value))
+        if not locations or len(locations) > 3:
+          continue
+        boxes = {_CELL_BOXES[row * 9 + col] for row, col in locations}
+        if len(boxes) != 1:
+          continue
+        _, _, box_locations = _REGIONS[18 + boxes.pop()]
+        others = [
+            location for location in box_locations
+            if location not in locations
+        ]
+        if self._remove_values_from(others, value):
+          return True
+    return False
+
+  def _apply_naked_subsets(self, size):
+    """Applies naked pairs or triples.
+
+    When the possible values of a number of locations in a region are that
+    number of values in total, the values can't be anywhere else in the region.
+    """
+    for _, _, region_locations in _REGIONS:
+      locations = [(row, col)
+                   for row, col in region_locations
+                   if 2 <= len(self._possible_values[row][col]) <= size and
+                   self._sudoku.get(row, col) == ' ']
+      for subset in itertools.combinations(locations, size):
+        values = set()
+        for row, col in subset:
+          values |= self._possible_values[row][col]
+        if len(values) != size:
+          continue
+        others = [(row, col)
+                  for row, col in region_locations
+                  if (row, col) not in subset and
+                  self._sudoku.get(row, col) == ' ']
+        if self._remove_values_from(others, values):
+          return True
+    return False
+
+  def _apply_hidden_subsets(self, size):
+    """Applies hidden pairs or triples.
+
+    When a number of values in a region are possible in that number of
+    locations in total, no other value is possible in those locations.
+    """
+    for region_type, region, _ in _REGIONS:
+      values = [
+          value for value in '123456789'
+          if 2 <= len(self._possible_locations.get(
+              (region_type, region, value), ())) <= size
+      ]
+      for subset in itertools.combinations(values, size):
+        locations = set()
+        for value in subset:
+          locations |= self._possible_locations[(region_type, region, value)]
+        if len(locations) != size:
+          continue
+        others = {
+            value for row, col in locations
+            for value in self._possible_values[row][col]
+        } - set(subset)
+        if self._remove_values_from(locations, others):
+          return True
+    return False
+
+  def _apply_x_wing(self):
+    """Applies X-wing.
+
+    When a number is possible in exactly the same two columns of two rows, it
+    can't be anywhere else in those columns, and the same with rows and columns
+    swapped.
+    """
+    for region_type in (_ROW_REGION, _COLUMN_REGION):
+      for value in '123456789':
+        # The two other coordinates for every row (or column) that has exactly
+        # two possible locations.
+        pairs = {}
+        for region in range(9):
+          locations = self._possible_locations.get((region_type, region, value))
+          if locations and len(locations) == 2:
+            pairs[region] = tuple(
+                sorted(location[1 - region_type] for location in locations))
+        for first, second in itertools.combinations(sorted(pairs), 2):
+          if pairs[first] != pairs[second]:
+            continue
+          others = []
+          for region in range(9):
+            if region == first or region == second:
+              continue
+            for other in pairs[first]:
+              if region_type == _ROW_REGION:
+                others.append((region, other))
+              else:
+                others.append((other, region))
+          others = [(row, col)
+                    for row, col in others
+                    if self._sudoku.get(row, col) == ' ']
+          if self._remove_values_from(others, value):
+            return True
+    return False
+
+  def _apply_strategies(self):
+    """Applies the first strategy that removes any possible values.
+
+    Returns:
+      True if any possible value is removed.
+    """
+    for strategy in self.strategies:
+      if strategy == 'pointing':
+        applied = self._apply_pointing()
+      elif strategy == 'box_line':
+        applied = self._apply_box_line()
+      elif strategy == 'naked_pairs':
+        applied = self._apply_naked_subsets(2)
+      elif strategy == 'naked_triples':
+        applied = self._apply_naked_subsets(3)
+      elif strategy == 'hidden_pairs':
+        applied = self._apply_hidden_subsets(2)
+      elif strategy == 'hidden_triples':
+        applied = self._apply_hidden_subsets(3)
+      else:
+        applied = self._apply_x_wing()
+      if applied:
+        self.technique_counts[strategy] += 1
+        return True
+    return False
 
   def _partial_solve(self):
     """Solves a sudoku with approaches similar to human strategies.
@@ -182,6 +685,17 @@ class SudokuSolver(object):
         value, where value is a character between '1' and '9'. Returns None if
         the sudoku becomes invalid after partial solve.
     """
+    # Apply the strategies until a single number can be filled in.
+    if self.strategies:
+      if self.last_stats is not None:
+        start = time.perf_counter()
+      while (not self._location_groups[0] and not self._location_groups[1] and
+             not self._unique_locations):
+        if not self._apply_strategies():
+          break
+      if self.last_stats is not None:
+        self.last_stats.phase_times['strategies'] += (
+            time.perf_counter() - start)
     # If some location can't have any possible values, there is no solution.
     if self._location_groups[0]:
       return None
@@ -197,6 +711,7 @@ class SudokuSolver(object):
           move_set.add(move)
           solution.append(move)
           self._sudoku.set(row, col, value)
+          self.technique_counts['hidden_single'] += 1
         else:
           conflict_found = True
           break
@@ -212,6 +727,7 @@ class SudokuSolver(object):
               move_set.add(move)
               solution.append(move)
               self._sudoku.set(row, col, value)
+              self.technique_counts['naked_single'] += 1
             else:
               conflict_found = True
               break
@@ -227,13 +743,16 @@ class SudokuSolver(object):
       self._update_possible_values(row, col, value)
     return solution
 
-  def _fast_solve(self):
+  def _fast_solve(self, depth=0):
     """Solves a sudoku combining human strategies and guessing numbers.
 
     This function combines the common approaches that human uses with number
     guessing when those approaches are not able to solve the problems. It can
     solve any solvable sudokus.
 
+    Args:
+      depth: The number of guesses the sudoku is solved on top of.
+
     Returns:
       A solution as a list of moves with each move as a tuple of row, column and
         value, where value is a character between '1' and '9'. Returns None if
@@ -284,15 +803,26 @@ class SudokuSolver(object):
     # Try for every possible values.
     try_solution = None
     for value in possible_values:
+      self.nr_guesses += 1
+      if self._limited:
+        self._check_budget()
+      if self._trail is not None:
+        mark = len(self._trail)
       self._sudoku.set(row, col, value)
       self._update_possible_values(row, col, value)
-      try_solution = self._fast_solve()
+      if self.last_stats is not None:
+        self.last_stats.max_depth = max(self.last_stats.max_depth, depth + 1)
+      try_solution = self._fast_solve(depth + 1)
       if try_solution is None:
         # Fail to get valid solution, revert the try.
         self._sudoku.set(row, col, ' ')
-        # We can incrementally update, but just reinitialize it seems to be fast
-        # enough.
-        self._initialize_data()
+        if self._trail is None:
+          # We can incrementally update, but just reinitialize it seems to be
+          # fast enough.
+          self._initialize_data()
+        else:
+          self._rewind_trail(mark)
+          self.rebuilds_avoided += 1
       else:
         # We have a successful try.
         solution.append((row, col, value))
@@ -303,12 +833,16 @@ class SudokuSolver(object):
     # sudoku is not solvable. Revert previous moves.
     for row, col, _ in solution:
       self._sudoku.set(row, col, ' ')
-      # We can incrementally update, but just reinitialize it seems to be fast
-      # enough.
-      self._initialize_data()
+      if self._trail is None:
+        # We can incrementally update, but just reinitialize it seems to be
+        # fast enough.
+        self._initialize_data()
+      else:
+        # The caller rewinds the trail to before this try.
+        self.rebuilds_avoided += 1
     return None
 
-  def _simple_solve(self):
+  def _simple_solve(self, start=0):
     """Solves a sudoku with simple recursive algorithm.
 
     This function uses simple recursive algorithm without run time optimization.
@@ -316,56 +850,795 @@ class SudokuSolver(object):
     solving a single sudoku, but will be too slow for solving a lot of sudokus
     or generating a lot of random sudoku problems.
 
+    Args:
+      start: The index row * 9 + col of the first location that may be empty.
+        The sudoku is only checked to be valid at the start, as every number
+        filled in afterwards is valid.
+
     Returns:
       A solution as a list of moves with each move as a tuple of row, column and
         value, where value is a character between '1' and '9'. Returns None if
         the sudoku is not solvable.
     """
-    if not self._sudoku.is_valid():
+    if not start and not self._sudoku.is_valid():
       return None
+    geometry = self._sudoku.geometry
     solution = []
-    for row in range(9):
-      for col in range(9):
-        if self._sudoku.get(row, col) == ' ':
-          possible_values = []
-          for i in range(9):
-            value = chr(i + ord('1'))
-            if self._sudoku.is_valid_value(row, col, value):
-              possible_values.append(value)
-          if not possible_values:
-            return None
-          try_solution = None
-          for value in possible_values:
-            self._sudoku.set(row, col, value)
-            try_solution = self._simple_solve()
-            if try_solution is None:
-              self._sudoku.set(row, col, ' ')
-            else:
-              solution.append((row, col, value))
-              solution.extend(try_solution)
-              break
+    for index in range(start, geometry.nr_cells):
+      row, col = geometry.cell_locations[index]
+      if self._sudoku.get(row, col) == ' ':
+        possible_values = []
+        for value in geometry.symbols:
+          if self._sudoku.is_valid_value(row, col, value):
+            possible_values.append(value)
+        if not possible_values:
+          return None
+        try_solution = None
+        for value in possible_values:
+          self.nr_guesses += 1
+          if self._limited:
+            self._check_budget()
+          self._sudoku.set(row, col, value)
+          try_solution = self._simple_solve(index + 1)
           if try_solution is None:
+            self._sudoku.set(row, col, ' ')
+          else:
+            solution.append((row, col, value))
+            solution.extend(try_solution)
+            break
+        if try_solution is None:
+          return None
+        return solution
+    return solution
+
+  def _bitmask_eliminate(self, cell, digit):
+    """Removes one possible digit at a cell for the bitmask engine.
+
+    Args:
+      cell: The index of the cell, which is row * 9 + col.
+      digit: The digit between 0 and 8 to remove as a possible value.
+    """
+    self._candidates[cell] &= ~(1 << digit)
+    locations = self._locations
+    for _, index, bit in self._tables.cell_units[cell]:
+      locations[index + digit] &= ~bit
+
+  def _bitmask_eliminate_with_stats(self, cell, digit):
+    """_bitmask_eliminate counting the elimination in last_stats."""
+    self.last_stats.nr_eliminations += 1
+    SudokuSolver._bitmask_eliminate(self, cell, digit)
+
+  def _bitmask_assign(self, cell, digit):
+    """Fills in a digit at a cell for the bitmask engine.
+
+    Args:
+      cell: The index of the cell, which is row * 9 + col.
+      digit: The digit between 0 and 8 to fill in.
+    """
+    tables = self._tables
+    candidates = self._candidates
+    bit = 1 << digit
+    for other in tables.mask_digits[candidates[cell] & ~bit]:
+      self._bitmask_eliminate(cell, other)
+    candidates[cell] = 0
+    self._values[cell] = digit + 1
+    locations = self._locations
+    placed = self._placed
+    for unit, index, _ in tables.cell_units[cell]:
+      locations[index + digit] = 0
+      placed[unit] |= bit
+    for peer in tables.cell_peers[cell]:
+      if candidates[peer] & bit:
+        self._bitmask_eliminate(peer, digit)
+
+  def _bitmask_initialize(self):
+    """Initializes the bitmask engine from the sudoku.
+
+    Returns:
+      False if the sudoku is not valid.
+    """
+    if not self._sudoku.is_valid():
+      return False
+    if self.last_stats is not None:
+      self.last_stats.nr_initializations += 1
+    tables = _get_bitmask_tables(self._sudoku.geometry)
+    self._tables = tables
+    all_digits_mask = tables.all_digits_mask
+    self._candidates = [all_digits_mask] * tables.nr_cells
+    self._locations = [all_digits_mask] * (tables.nr_units * tables.size)
+    self._placed = [0] * tables.nr_units
+    self._values = [0] * tables.nr_cells
+    digits = tables.digits
+    for cell, value in enumerate(self._sudoku.to_line()):
+      if value != '.':
+        self._bitmask_assign(cell, digits[value])
+    return True
+
+  def _bitmask_partial_solve(self):
+    """Bitmask version of _partial_solve.
+
+    Returns:
+      A list of moves with each move as a tuple of cell and digit. Returns None
+        if the sudoku becomes invalid after partial solve.
+    """
+    tables = self._tables
+    mask_counts = tables.mask_counts
+    mask_digits = tables.mask_digits
+    candidates = self._candidates
+    values = self._values
+    moves = {}
+    # Fill in numbers in the location where only one value is possible.
+    for cell in range(tables.nr_cells):
+      if not values[cell]:
+        mask = candidates[cell]
+        if not mask:
+          return None
+        if mask_counts[mask] == 1:
+          moves[cell] = mask_digits[mask][0]
+          self.technique_counts['naked_single'] += 1
+    # Fill in the numbers in a region where only one location is possible.
+    locations = self._locations
+    size = tables.size
+    for unit in range(tables.nr_units):
+      cells = tables.unit_cells[unit]
+      index = unit * size
+      for digit in range(size):
+        where = locations[index + digit]
+        if mask_counts[where] == 1:
+          cell = cells[mask_digits[where][0]]
+          if cell not in moves:
+            moves[cell] = digit
+            self.technique_counts['hidden_single'] += 1
+          elif moves[cell] != digit:
             return None
-          return solution
+    for cell, digit in moves.items():
+      # The number is no longer possible after the previous moves.
+      if not candidates[cell] >> digit & 1:
+        return None
+      self._bitmask_assign(cell, digit)
+    return list(moves.items())
+
+  def _bitmask_fast_solve(self, depth=0):
+    """Bitmask version of _fast_solve.
+
+    Args:
+      depth: The number of guesses the sudoku is solved on top of.
+
+    Returns:
+      A list of moves with each move as a tuple of cell and digit. Returns None
+        if the sudoku is not solvable.
+    """
+    solution = []
+    # Apply human strategies.
+    while True:
+      partial_solution = self._bitmask_partial_solve()
+      if partial_solution is None:
+        return None
+      elif not partial_solution:
+        break
+      else:
+        solution.extend(partial_solution)
+
+    guesses = self._bitmask_get_guesses()
+    if guesses is None:
+      return None
+    if not guesses:
+      # All locations are filled in.
+      return solution
+
+    # Try for every guess, the state is small enough to be saved and restored
+    # by copying.
+    for cell, digit in guesses:
+      self.nr_guesses += 1
+      if self._limited:
+        self._check_budget()
+      saved_state = (self._candidates[:], self._locations[:], self._placed[:],
+                     self._values[:])
+      self._bitmask_assign(cell, digit)
+      if self.last_stats is not None:
+        self.last_stats.max_depth = max(self.last_stats.max_depth, depth + 1)
+      try_solution = self._bitmask_fast_solve(depth + 1)
+      if try_solution is not None:
+        solution.append((cell, digit))
+        solution.extend(try_solution)
+        return solution
+      (self._candidates, self._locations, self._placed,
+       self._values) = saved_state
+    return None
+
+  def _bitmask_get_guesses(self):
+    """Gets the moves to guess when no single number can be filled in.
+
+    The guesses are either the possible numbers of the location with the least
+    number of possible values, or the possible locations of the number with the
+    least number of possible locations in a region, whichever are fewer. The
+    latter helps the most in big sudokus.
+
+    Returns:
+      A list of moves with each move as a tuple of cell and digit in the order
+        to try. An empty list if all locations are filled in, or None if a
+        number can't be placed in a region.
+    """
+    tables = self._tables
+    mask_counts = tables.mask_counts
+    mask_digits = tables.mask_digits
+    candidates = self._candidates
+    # Find the location where has the least number of possible values.
+    location = None
+    nr_possible_values = tables.size + 1
+    for cell, mask in enumerate(candidates):
+      if mask and mask_counts[mask] < nr_possible_values:
+        location = cell
+        nr_possible_values = mask_counts[mask]
+    if location is None:
+      return []
+
+    # A number without any possible location in a region can't be placed.
+    locations = self._locations
+    placed = self._placed
+    region_index = None
+    nr_possible_locations = nr_possible_values
+    for index, where in enumerate(locations):
+      if not where:
+        unit, digit = tables.location_keys[index]
+        if not placed[unit] >> digit & 1:
+          return None
+      elif mask_counts[where] < nr_possible_locations:
+        region_index = index
+        nr_possible_locations = mask_counts[where]
+
+    if region_index is None:
+      guesses = [(location, digit) for digit in mask_digits[candidates[location]]]
+    else:
+      unit, digit = tables.location_keys[region_index]
+      cells = tables.unit_cells[unit]
+      guesses = [(cells[position], digit)
+                 for position in mask_digits[locations[region_index]]]
+    if self.randomize_type == 'max':
+      guesses.reverse()
+    elif self.randomize_type != 'min':
+      guesses = _get_randomized_list(guesses)
+    return guesses
+
+  def _bitmask_solve(self, partial):
+    """Solves a sudoku with the bitmask engine.
+
+    Args:
+      partial: If true, use partial solver, otherwise use fast solver.
+
+    Returns:
+      Same as solve().
+    """
+    if not self._bitmask_initialize():
+      return None
+    if partial:
+      moves = self._bitmask_partial_solve()
+    else:
+      moves = self._bitmask_fast_solve()
+    if moves is None:
+      return None
+    return self._fill_in_bitmask_moves(moves)
+
+  def _fill_in_bitmask_moves(self, moves):
+    """Fills in the moves of the bitmask engine to the sudoku.
+
+    Args:
+      moves: A list of moves with each move as a tuple of cell and digit.
+
+    Returns:
+      The moves as a solution, same as solve().
+    """
+    tables = self._tables
+    solution = []
+    for cell, digit in moves:
+      row, col = tables.cell_locations[cell]
+      value = tables.symbols[digit]
+      self._sudoku.set(row, col, value)
+      solution.append((row, col, value))
     return solution
 
-  def solve(self, sudoku, partial=False, simple=False):
+  def start_search(self, sudoku):
+    """Starts a search for a solution that can be paused and resumed.
+
+    The solver is used by the search whenever it runs, so it can't be used by
+    another search or solve() between the runs. If statistics are collected,
+    the statistics of the search are in last_stats, and not merged into stats.
+
+    Args:
+      sudoku: A sudoku to solve. An object of sudoku_data.SudokuData. It is
+        filled in when the search is done with a solution.
+
+    Returns:
+      A Search, not run yet.
+    """
+    # The eliminations are counted in last_stats if statistics are collected.
+    self.last_stats = SolverStats() if self.stats is not None else None
+    return self._start_search(sudoku)
+
+  def _start_search(self, sudoku):
+    """Same as start_search() without changing the statistics."""
+    self._sudoku = sudoku
+    self.technique_counts = collections.Counter()
+    self.nr_guesses = 0
+    return Search(self)
+
+  def _dlx_solve(self):
+    """Solves a sudoku with the dlx engine.
+
+    Returns:
+      Same as solve().
+    """
+    if self.last_stats is not None:
+      self.last_stats.nr_initializations += 1
+    dlx_solver = sudoku_dlx.DlxSolver(self.randomize_type)
+    dlx_solver.node_callback = self._check_node
+    solutions = dlx_solver.solve(self._sudoku)
+    if not solutions:
+      return None
+    for row, col, value in solutions[0]:
+      self._sudoku.set(row, col, value)
+    return solutions[0]
+
+  def count_solutions(self, sudoku, limit=2, deadline=None, max_nodes=None):
+    """Counts the solutions of a sudoku, stopping at a limit.
+
+    The solutions are found by the dlx engine, which can be slow for a box size
+    of 5.
+
+    Args:
+      sudoku: A sudoku to count solutions. An object of sudoku_data.SudokuData.
+        It is not changed.
+      limit: Stops counting after this number of solutions are found.
+      deadline: Same as solve().
+      max_nodes: Same as solve().
+
+    Returns:
+      A tuple of the number of solutions found, at most limit, and a location as
+        a tuple of row and column where the first two solutions found have
+        different numbers, or None if less than two solutions are found.
+
+    Raises:
+      BudgetExceededError: If the deadline or max_nodes is exceeded, or counting
+        is aborted.
+    """
+    dlx_solver = sudoku_dlx.DlxSolver(self.randomize_type)
+    dlx_solver.node_callback = self._check_node
+    self._start_budget(deadline, max_nodes)
+    try:
+      solutions = dlx_solver.solve(sudoku, limit=limit)
+    finally:
+      self._limited = False
+    if len(solutions) < 2:
+      return len(solutions), None
+    first_values = {(row, col): value for row, col, value in solutions[0]}
+    locations = [(row, col)
+                 for row, col, value in solutions[1]
+                 if first_values[(row, col)] != value]
+    if self.randomize_type == 'min' or self.randomize_type == 'max':
+      location = min(locations)
+    else:
+      location = random.choice(locations)
+    return len(solutions), location
+
+  def abort(self):
+    """Aborts solving, now and later.
+
+    It can be called from another thread, and solve() raises
+    BudgetExceededError at the next node, with or without a deadline or
+    max_nodes, until reset_abort() is called. So a solve started right after
+    abort() is aborted too.
+    """
+    self._aborted = True
+    # Makes a running solve check the budget at every node.
+    self._limited = True
+
+  def reset_abort(self):
+    """Allows solving again after abort()."""
+    self._aborted = False
+
+  def _start_budget(self, deadline, max_nodes):
+    """Starts the budget of a solve, see solve()."""
+    self._limited = deadline is not None or max_nodes is not None
+    # abort() sets it too, so a solve without a budget is aborted as well.
+    if self._aborted:
+      self._limited = True
+    self._deadline = deadline
+    self._max_nodes = max_nodes
+    self._nr_nodes = 0
+
+  def _check_node(self):
+    """Checks the budget at a node if it's limited, see abort()."""
+    if self._limited:
+      self._check_budget()
+
+  def _check_budget(self):
+    """Counts a node, raising BudgetExceededError if the budget runs out."""
+    if self._aborted:
+      raise BudgetExceededError('Solving is aborted.')
+    self._nr_nodes += 1
+    if self._max_nodes is not None and self._nr_nodes > self._max_nodes:
+      raise BudgetExceededError('Solving exceeded {} nodes.'.format(
+          self._max_nodes))
+    if self._deadline is not None and time.monotonic() >= self._deadline:
+      raise BudgetExceededError('Solving exceeded the deadline.')
+
+  def solve(self,
+            sudoku,
+            partial=False,
+            simple=False,
+            engine=None,
+            deadline=None,
+            max_nodes=None):
     """Solves a sudoku.
 
     Args:
       sudoku: A sudoku to solve. An object of sudoku_data.SudokuData.
       partial: If true, use partial solver, otherwise use fast solver.
       simple: If true, use simple solver, otherwise use other solvers.
+      engine: The engine used by the partial and fast solvers, 'set',
+        'bitmask', 'stack' or 'dlx', or None for 'set' for sudokus with a box
+        size of 3 or a solver with strategies, and 'bitmask' for others. All
+        return the same moves for a sudoku with one solution. The set engine
+        applies the strategies, and only solves sudokus with a box size of 3.
+        The bitmask engine avoids allocating sets and hashing
+        locations. The stack engine is the bitmask engine without recursion,
+        and solves partially the same way. The dlx engine has predictable worst
+        case time for a box size of 3, but can't solve partially.
+      deadline: The time.monotonic() in seconds to abort solving at, or None.
+      max_nodes: The maximum number of nodes to search, or None. A node is a
+        number tried when no technique applies, or a row tried by the dlx
+        engine.
 
     Returns:
       A solution as a list of moves with each move as a tuple of row, column and
         value, where value is a character between '1' and '9'. Returns None if
         the sudoku is not solvable.
+
+    Raises:
+      ValueError: If the engine is not valid, it can't solve partially, or it
+        can't solve the box size of the sudoku.
+      BudgetExceededError: If the deadline or max_nodes is exceeded, or solving
+        is aborted. The sudoku is restored as before solving.
+    """
+    if engine is None:
+      engine = 'set' if sudoku.size == 9 or self.strategies else 'bitmask'
+    if engine not in _ENGINES:
+      raise ValueError('Engine {} is not valid.'.format(engine))
+    if engine == 'set' and sudoku.size != 9 and not simple:
+      raise ValueError('Engine {} can not solve box size {}.'.format(
+          engine, sudoku.box_size))
+    if partial and engine == 'dlx':
+      raise ValueError('Engine {} can not solve partially.'.format(engine))
+    self._start_budget(deadline, max_nodes)
+    if self.stats is not None:
+      self.last_stats = SolverStats()
+    rebuilds_avoided = self.rebuilds_avoided
+    start = time.perf_counter()
+    original = sudoku.clone()
+    try:
+      solution = self._solve(sudoku, partial, simple, engine)
+    except BudgetExceededError as e:
+      sudoku.copy(original)
+      self._trail = None
+      e.stats = self._update_stats(start, rebuilds_avoided, False, True)
+      raise
+    finally:
+      self._limited = False
+    if self.stats is not None:
+      self._update_stats(start, rebuilds_avoided, solution is None, False)
+    return solution
+
+  def _update_stats(self, start, rebuilds_avoided, not_solvable,
+                    budget_exceeded):
+    """Fills in the statistics of a solve() call.
+
+    Args:
+      start: The time.perf_counter() when the solve started.
+      rebuilds_avoided: The rebuilds_avoided when the solve started.
+      not_solvable: Whether the sudoku is found not solvable.
+      budget_exceeded: Whether the solve is aborted by BudgetExceededError.
+
+    Returns:
+      The SolverStats of the call, which is also last_stats and merged into
+        stats if statistics are collected.
     """
+    stats = self.last_stats if self.stats is not None else SolverStats()
+    stats.phase_times['solve'] += time.perf_counter() - start
+    stats.nr_solves = 1
+    stats.nr_not_solvable = 1 if not_solvable else 0
+    stats.nr_budget_exceeded = 1 if budget_exceeded else 0
+    stats.nr_guesses = self.nr_guesses
+    stats.rebuilds_avoided = self.rebuilds_avoided - rebuilds_avoided
+    stats.technique_counts.update(self.technique_counts)
+    if self.stats is not None:
+      self.stats.merge(stats)
+    return stats
+
+  def _solve(self, sudoku, partial, simple, engine):
+    """Solves a sudoku, same as solve() without checking the arguments."""
     self._sudoku = sudoku
+    self.technique_counts = collections.Counter()
+    self.nr_guesses = 0
     if simple:
       return self._simple_solve()
+    if engine == 'bitmask' or (engine == 'stack' and partial):
+      return self._bitmask_solve(partial)
+    if engine == 'stack':
+      search = self._start_search(sudoku)
+      search.run()
+      return search.solution
+    if engine == 'dlx':
+      return self._dlx_solve()
+    self._trail = None
     self._initialize_data()
+    if self.use_trail:
+      self._trail = []
     if partial:
       return self._partial_solve()
     return self._fast_solve()
+
+
+# Results of processing a node of a Search.
+_NODE_FAILED = 0
+_NODE_SOLVED = 1
+_NODE_BRANCHED = 2
+
+
+class Search(object):
+  """A search for a solution of a sudoku with an explicit stack.
+
+  The search works on the state of the bitmask engine of a solver, and tries the
+  same numbers in the same order as the bitmask fast solver, so it gives the
+  same moves. A node is a state after filling in a guessed number, and the
+  search can be paused after any number of nodes and resumed later.
+  """
+
+  def __init__(self, solver):
+    """Creates a search of the sudoku of a solver, use start_search() instead.
+
+    Args:
+      solver: The SudokuSolver with the sudoku to solve.
+    """
+    self._solver = solver
+    self._sudoku = solver._sudoku
+    # Number of nodes processed so far.
+    self.nr_nodes = 0
+    # Whether the search is done, either with a solution or not.
+    self.done = False
+    # The solution as returned by SudokuSolver.solve() when the search is done,
+    # None if it's not done or the sudoku is not solvable.
+    self.solution = None
+    # The moves of the current node as tuples of cell and digit.
+    self._moves = []
+    # Every frame is a list of the guesses to try, the index of the next guess
+    # to try, the state before the guess, and the number of moves before the
+    # guess.
+    self._stack = []
+    if solver._bitmask_initialize():
+      self._state = (solver._candidates, solver._locations, solver._placed,
+                     solver._values)
+    else:
+      self.done = True
+
+  def _process_node(self):
+    """Fills in all the numbers found without guessing at the current node.
+
+    Returns:
+      _NODE_SOLVED if solved, _NODE_FAILED if not solvable, or _NODE_BRANCHED
+        after pushing a frame to guess at the location with the least number of
+        possible values.
+    """
+    solver = self._solver
+    # Apply human strategies.
+    while True:
+      partial_solution = solver._bitmask_partial_solve()
+      if partial_solution is None:
+        return _NODE_FAILED
+      elif not partial_solution:
+        break
+      else:
+        self._moves.extend(partial_solution)
+
+    guesses = solver._bitmask_get_guesses()
+    if guesses is None:
+      return _NODE_FAILED
+    if not guesses:
+      # All locations are filled in.
+      return _NODE_SOLVED
+    self._stack.append([
+        guesses, 0,
+        (solver._candidates, solver._locations, solver._placed,
+         solver._values),
+        len(self._moves)
+    ])
+    if solver.last_stats is not None:
+      solver.last_stats.max_depth = max(solver.last_stats.max_depth,
+                                        len(self._stack))
+    return _NODE_BRANCHED
+
+  def _guess_next(self):
+    """Fills in the next number to try, backtracking as needed.
+
+    Returns:
+      False if there are no more numbers to try.
+    """
+    solver = self._solver
+    stack = self._stack
+    while stack:
+      frame = stack[-1]
+      guesses, index, state, nr_moves = frame
+      if index >= len(guesses):
+        stack.pop()
+        continue
+      frame[1] = index + 1
+      del self._moves[nr_moves:]
+      if index == len(guesses) - 1:
+        # The last try can change the saved state itself.
+        stack.pop()
+        (solver._candidates, solver._locations, solver._placed,
+         solver._values) = state
+      else:
+        (solver._candidates, solver._locations, solver._placed,
+         solver._values) = [list(values) for values in state]
+      cell, digit = guesses[index]
+      solver.nr_guesses += 1
+      if solver._limited:
+        solver._check_budget()
+      solver._bitmask_assign(cell, digit)
+      self._moves.append((cell, digit))
+      return True
+    return False
+
+  def _finish(self, solved):
+    """Marks the search done, filling in the sudoku if solved."""
+    self.done = True
+    self._stack = []
+    self._state = None
+    if solved:
+      self.solution = self._solver._fill_in_bitmask_moves(self._moves)
+
+  def run(self, max_nodes=None):
+    """Runs the search until it is done or a number of nodes are processed.
+
+    Args:
+      max_nodes: The maximum number of nodes to process in this run, or None to
+        run until done.
+
+    Returns:
+      True if the search is done, False if paused.
+    """
+    if self.done:
+      return True
+    solver = self._solver
+    solver._sudoku = self._sudoku
+    (solver._candidates, solver._locations, solver._placed,
+     solver._values) = self._state
+    nr_nodes = 0
+    while max_nodes is None or nr_nodes < max_nodes:
+      nr_nodes += 1
+      self.nr_nodes += 1
+      result = self._process_node()
+      if result == _NODE_SOLVED:
+        self._finish(True)
+        return True
+      if not self._guess_next():
+        self._finish(False)
+        return True
+    self._state = (solver._candidates, solver._locations, solver._placed,
+                   solver._values)
+    return False
+
+
+# The solver of a worker process of solve_many().
+_worker_solver = None
+
+
+def _initialize_worker(randomize_type, use_trail, strategies):
+  """Creates the solver of a worker process."""
+  global _worker_solver
+  _worker_solver = SudokuSolver(
+      randomize_type=randomize_type,
+      use_trail=use_trail,
+      strategies=strategies)
+
+
+def _solve_chunk(chunk, solve_args):
+  """Solves a chunk of tuples of index and sudoku in a worker process."""
+  return [(index, _worker_solver.solve(sudoku, **solve_args))
+          for index, sudoku in chunk]
+
+
+def _get_chunks(sudokus, chunksize):
+  """Yields lists of at most chunksize tuples of index and sudoku."""
+  chunk = []
+  for index, sudoku in enumerate(sudokus):
+    chunk.append((index, sudoku))
+    if len(chunk) == chunksize:
+      yield chunk
+      chunk = []
+  if chunk:
+    yield chunk
+
+
+def _get_done_chunk(done_chunks):
+  """Waits for a chunk solved by a worker and returns its results."""
+  results = done_chunks.get()
+  if isinstance(results, BaseException):
+    raise results
+  return results
+
+
+def solve_many(sudokus,
+               workers=None,
+               chunksize=16,
+               ordered=True,
+               randomize_type='random',
+               use_trail=False,
+               strategies=(),
+               **solve_args):
+  """Solves many sudokus with a pool of worker processes.
+
+  Every worker process has its own solver. Only a few chunks per worker are
+  read ahead from the sudokus, so they can come from a generator of any length.
+
+  Args:
+    sudokus: An iterable of sudoku_data.SudokuData to solve. The sudokus are not
+      changed.
+    workers: The number of worker processes, the number of CPUs if None. With 1
+      worker the sudokus are solved in this process.
+    chunksize: The number of sudokus sent to a worker at a time.
+    ordered: If true, yields the solutions in the order of the sudokus,
+      otherwise as soon as they are solved.
+    randomize_type: Type of ranomizing of the solvers, can be random, min or
+      max.
+    use_trail: Whether the solvers use a trail to undo failed guesses.
+    strategies: The strategies that the solvers apply before guessing.
+    **solve_args: Other arguments of SudokuSolver.solve().
+
+  Yields:
+    Tuples of the index of a sudoku in sudokus and its solution as returned by
+      SudokuSolver.solve().
+  """
+  if workers is None:
+    workers = multiprocessing.cpu_count()
+  if workers <= 1:
+    solver = SudokuSolver(
+        randomize_type=randomize_type,
+        use_trail=use_trail,
+        strategies=strategies)
+    for index, sudoku in enumerate(sudokus):
+      yield index, solver.solve(sudoku.clone(), **solve_args)
+    return
+
+  # Keep every worker busy while bounding the number of sudokus in memory.
+  max_pending = workers * 2
+  with multiprocessing.Pool(
+      workers,
+      initializer=_initialize_worker,
+      initargs=(randomize_type, use_trail, tuple(strategies))) as pool:
+    if ordered:
+      pending = collections.deque()
+      for chunk in _get_chunks(sudokus, chunksize):
+        pending.append(pool.apply_async(_solve_chunk, (chunk, solve_args)))
+        if len(pending) >= max_pending:
+          for result in pending.popleft().get():
+            yield result
+      while pending:
+        for result in pending.popleft().get():
+          yield result
+    else:
+      done_chunks = queue.Queue()
+      nr_pending = 0
+      for chunk in _get_chunks(sudokus, chunksize):
+        pool.apply_async(
+            _solve_chunk, (chunk, solve_args),
+            callback=done_chunks.put,
+            error_callback=done_chunks.put)
+        nr_pending += 1
+        if nr_pending >= max_pending:
+          for result in _get_done_chunk(done_chunks):
+            yield result
+          nr_pending -= 1
+      for _ in range(nr_pending):
+        for result in _get_done_chunk(done_chunks):
+          yield result
@@ -1,12 +1,42 @@
+import async_test
+import benchmark_test
+import cache_test
+import candidates_test
+import canonical_test
 import generator_test
+import hint_test
+import io_test
+import rating_test
+import server_test
 import solver_test
+import vectorized_test
 
 
 def main():
   print('Testing sudoku solver.')
   solver_test.test_solvers()
+  print('Testing sudoku io.')
+  io_test.test_io()
+  print('Testing sudoku vectorized checks.')
+  vectorized_test.test_vectorized()
+  print('Testing sudoku canonical form.')
+  canonical_test.test_canonical()
+  print('Testing sudoku solution cache.')
+  cache_test.test_caches()
+  print('Testing sudoku candidates.')
+  candidates_test.test_grids()
+  print('Testing sudoku hints.')
+  hint_test.test_hint_sessions()
+  print('Testing sudoku rating.')
+  rating_test.test_ratings()
   print('Testing sudoku generator.')
   generator_test.test_generators()
+  print('Testing sudoku benchmark.')
+  benchmark_test.test_benchmark()
+  print('Testing sudoku async API.')
+  async_test.test_async()
+  print('Testing sudoku server.')
+  server_test.test_servers()
 
 
 if __name__ == '__main__':
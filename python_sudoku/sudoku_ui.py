@@ -2,8 +2,11 @@
 
 import curses
 import os
+import sudoku_bank
+import sudoku_cache
 import sudoku_data
 import sudoku_generator
+import sudoku_hint
 import sudoku_solver
 
 _MENU = """
@@ -22,6 +25,7 @@ c       Change color
 b       Change color back
 a       Auto solve
 h       Hint
+p       Show/hide candidates
 u       Undo changes
 r       Redo changes
 Mouse   Move cursor
@@ -46,6 +50,17 @@ _WIN_MSG = """
 **********************
 """
 
+_GENERATING_MSG = """
+Generating a new sudoku...
+Any     Cancel
+"""
+
+# Milliseconds to wait for a key before checking if a new sudoku is generated.
+_GENERATING_TIMEOUT = 200
+# Number of sudokus derived from every generated sudoku, so the levels rarely
+# generated are filled quicker.
+_NR_DERIVATIONS = 3
+
 # change type.
 _NUMBER_CHANGE = 1
 _COLOR_CHANGE = 2
@@ -70,9 +85,25 @@ class SudokuUI(object):
     self.mouse_x = None
     self.mouse_y = None
     self.level = 'Easy'
+    # The level of the new sudoku waiting to be generated, or None.
+    self.pending_level = None
     self.sudoku = sudoku_data.SudokuData()
     self.solver = sudoku_solver.SudokuSolver()
-    self.generator = sudoku_generator.SudokuGenerator()
+    # Solutions of the sudokus played, so auto solve and hints don't solve the
+    # same sudoku again.
+    self.cache = sudoku_cache.SolutionCache()
+    # The possible numbers, conflicts and hints of the sudoku, kept in sync
+    # with every number changed.
+    self.board = sudoku_hint.HintSession(
+        self.sudoku, solver=self.solver, cache=self.cache)
+    # Whether to show the possible numbers of the spaces.
+    self.show_candidates = False
+    # Serves sudokus from the bank filled offline if there is one.
+    self.bank = None
+    if os.path.exists(sudoku_bank.DEFAULT_BANK_FILE):
+      self.bank = sudoku_bank.SudokuBank(sudoku_bank.DEFAULT_BANK_FILE)
+    self.generator = sudoku_generator.SudokuGenerator(
+        bank=self.bank, nr_derivations=_NR_DERIVATIONS)
     self._setup_colors()
     self.data_file = '/tmp/magic_sudoku.data'
     self.changes = []
@@ -94,8 +125,8 @@ class SudokuUI(object):
   def _save(self, file_name):
     """Save sudoku to a file."""
     with open(file_name, 'w') as f:
-      for i in range(9):
-        f.write(','.join(self.sudoku.data[i]) + '\n')
+      for line in self.sudoku.to_lines():
+        f.write(line + '\n')
       for i in range(9):
         f.write(','.join([str(c) for c in self.colors[i]]) + '\n')
       f.write(self.level)
@@ -165,7 +196,11 @@ class SudokuUI(object):
     title_y = int(up / 2)
     self.stdscr.attron(curses.color_pair(self.curr_color))
     self.stdscr.addstr(title_y, max(0, int((max_x - len(title)) / 2)), title)
+    # The possible numbers need 3 lines in a location.
+    show_candidates = self.show_candidates and delta_y >= 4
     subtitle = 'Press m for menu'
+    if self.show_candidates and not show_candidates:
+      subtitle = 'Press + to show candidates'
     self.stdscr.addstr(title_y + 1, max(0, int((max_x - len(subtitle)) / 2)),
                        subtitle)
     self.stdscr.attroff(curses.color_pair(self.curr_color))
@@ -228,16 +263,22 @@ class SudokuUI(object):
           if color != 0:
             self.stdscr.attroff(curses.color_pair(color))
 
-    # Draw numbers of the sudoku.
+    # Draw numbers of the sudoku, with the numbers in conflict with a peer
+    # reversed, and the possible numbers of the spaces if shown.
     for i in range(9):
       for j in range(9):
         number = self.sudoku.get(i, j)
+        if number == ' ' and show_candidates:
+          self._draw_candidates(i, j, up + i * delta_y, left + j * delta_x,
+                                delta_y, delta_x)
+          continue
         color = self.colors[i][j]
         if color != 0:
           self.stdscr.attron(curses.color_pair(color))
+        attributes = curses.A_REVERSE if self.board.is_conflict(i, j) else 0
         self.stdscr.addch(
             int(up + (i + 0.5) * delta_y), int(left + (j + 0.5) * delta_x),
-            number)
+            number, attributes)
         if color != 0:
           self.stdscr.attroff(curses.color_pair(color))
 
@@ -264,6 +305,37 @@ class SudokuUI(object):
       curses.curs_set(0)
       message_window.refresh()
 
+  def _draw_candidates(self, row, col, y, x, delta_y, delta_x):
+    """Draws the possible numbers of a space in 3 lines of 3 numbers.
+
+    Args:
+      row: The row of the space.
+      col: The column of the space.
+      y: The y of the top line of the space.
+      x: The x of the left line of the space.
+      delta_y: The height of the space with a line.
+      delta_x: The width of the space with a line.
+    """
+    for value in self.board.get_candidates(row, col):
+      index = int(value) - 1
+      self.stdscr.addch(
+          int(y + 1 + index // 3 * (delta_y - 1) / 3),
+          int(x + 1 + (index % 3 + 0.5) * (delta_x - 1) / 3), value,
+          curses.A_DIM)
+
+  def _get_puzzle(self):
+    """Gets the sudoku with only the fixed numbers."""
+    puzzle = sudoku_data.SudokuData()
+    for row in range(9):
+      for col in range(9):
+        if self.colors[row][col] == 0:
+          puzzle.set(row, col, self.sudoku.get(row, col))
+    return puzzle
+
+  def _reset_board(self):
+    """Starts the board over when the whole sudoku is changed."""
+    self.board.reset(self.sudoku, self._get_puzzle())
+
   def _change_number(self, row, col, new_value):
     """Change a number in a location.
 
@@ -281,10 +353,11 @@ class SudokuUI(object):
     if original_value != ' ' and self.colors[row][col] == 0:
       self.message = 'Can not change fixed number'
       return False
-    if self.sudoku.is_valid_value(row, col, new_value):
+    if self.board.is_valid_value(row, col, new_value):
       self.curr_row = row
       self.curr_col = col
       self.sudoku.set(self.curr_row, self.curr_col, new_value)
+      self.board.set(self.curr_row, self.curr_col, new_value)
       self.colors[self.curr_row][self.curr_col] = self.curr_color
       self.changes.append((_NUMBER_CHANGE, (self.curr_row, self.curr_col,
                                             original_value, new_value)))
@@ -316,8 +389,22 @@ class SudokuUI(object):
                            original_curr_color), (self.sudoku, self.colors,
                                                   self.curr_color))))
     self.redo_changes = []
+    self._reset_board()
     self._auto_save()
 
+  def _take_pending_sudoku(self):
+    """Changes to the pending new sudoku if it is already generated."""
+    sudoku = self.generator.get_sudoku(level=self.pending_level, block=False)
+    if sudoku is None:
+      self.message = _GENERATING_MSG
+      return
+    if self.message == _GENERATING_MSG:
+      self.message = None
+      curses.curs_set(1)
+    self.level = self.pending_level
+    self.pending_level = None
+    self._change_sudoku(sudoku)
+
   def _process_key(self, key):
     """Process the key and mouse events."""
     if self.message:
@@ -325,27 +412,32 @@ class SudokuUI(object):
         self.message = _NEW_SUDOKU_MSG
         self.confirm = _NEW_SUDOKU_CONFIRM
         return
+      if self.message == _GENERATING_MSG:
+        # Cancel the new sudoku.
+        self.pending_level = None
       self.message = None
       curses.curs_set(1)
       if self.confirm is not None:
         if self.confirm == _NEW_SUDOKU_CONFIRM:
           self.confirm = None
           if key == ord('0'):
-            self.level = 'Easy'
+            level = 'Easy'
           elif key == ord('1'):
-            self.level = 'Easy'
+            level = 'Easy'
           elif key == ord('2'):
-            self.level = 'Medium'
+            level = 'Medium'
           elif key == ord('3'):
-            self.level = 'Hard'
+            level = 'Hard'
           elif key == ord('4'):
-            self.level = 'Challenger'
+            level = 'Challenger'
           else:
             return
           if key == ord('0'):
+            self.level = level
             self._change_sudoku(sudoku_data.SudokuData())
           else:
-            self._change_sudoku(self.generator.get_sudoku(level=self.level))
+            self.pending_level = level
+            self._take_pending_sudoku()
     elif key == ord('-') or key == ord('_'):
       # Reduce size of the sudoku board.
       if self.height > 18:
@@ -375,9 +467,8 @@ class SudokuUI(object):
         curses.beep()
     elif key == ord('a') or key == ord('A'):
       # Automatically solve the sudoku.
-      clone = sudoku_data.SudokuData()
-      clone.copy(self.sudoku)
-      solution = self.solver.solve(clone)
+      clone = self.sudoku.clone()
+      solution = self.cache.solve(clone, self.solver, self._get_puzzle())
       if solution:
         self._change_color(self.curr_color + 1)
         for row, col, value in solution:
@@ -386,15 +477,10 @@ class SudokuUI(object):
         self.message = 'Not solvable'
     elif key == ord('h') or key == ord('H'):
       # Give hint of the next move.
-      clone = sudoku_data.SudokuData()
-      clone.copy(self.sudoku)
-      solution = self.solver.solve(clone, partial=True)
-      if not solution:
-        solution = self.solver.solve(clone)
-      if solution:
-        for row, col, value in solution:
-          self._change_number(row, col, value)
-          break
+      hint = self.board.get_hint()
+      if hint:
+        row, col, value, _ = hint
+        self._change_number(row, col, value)
       else:
         self.message = 'Not solvable'
     elif key == ord('n') or key == ord('N'):
@@ -410,6 +496,9 @@ class SudokuUI(object):
     elif key == ord('m') or key == ord('M'):
       # Show or hide menu.
       self.message = _MENU
+    elif key == ord('p') or key == ord('P'):
+      # Show or hide the possible numbers of the spaces.
+      self.show_candidates = not self.show_candidates
     elif key == ord('u') or key == ord('U'):
       # Undo changes.
       if self.changes:
@@ -417,6 +506,7 @@ class SudokuUI(object):
         if change_type == _NUMBER_CHANGE:
           row, col, original_value, _ = content
           self.sudoku.set(row, col, original_value)
+          self.board.set(row, col, original_value)
           self.curr_row = row
           self.curr_col = col
         elif change_type == _COLOR_CHANGE:
@@ -427,6 +517,7 @@ class SudokuUI(object):
           self.sudoku = original_sudoku
           self.colors = original_colors
           self.curr_color = original_curr_color
+          self._reset_board()
         del self.changes[-1]
         self.redo_changes.append((change_type, content))
         self._auto_save()
@@ -439,6 +530,7 @@ class SudokuUI(object):
         if change_type == _NUMBER_CHANGE:
           row, col, _, new_value = content
           self.sudoku.set(row, col, new_value)
+          self.board.set(row, col, new_value)
           self.curr_row = row
           self.curr_col = col
         elif change_type == _COLOR_CHANGE:
@@ -449,6 +541,7 @@ class SudokuUI(object):
           self.sudoku = new_sudoku
           self.colors = new_colors
           self.curr_color = new_curr_color
+          self._reset_board()
         del self.redo_changes[-1]
         self.changes.append((change_type, content))
         self._auto_save()
@@ -457,7 +550,7 @@ class SudokuUI(object):
     elif key >= ord('1') and key <= ord('9') or key == ord(' '):
       # Fill in a new number in the board. Space erases existing number.
       if self._change_number(self.curr_row, self.curr_col,
-                             chr(key)) and self.sudoku.is_solved():
+                             chr(key)) and self.board.is_solved():
         self.message = _WIN_MSG
 
   def _initialize_sudoku(self):
@@ -485,22 +578,34 @@ class SudokuUI(object):
           except IOError:
             self.data_file = None
             self.message = 'Failed to save'
+    self._reset_board()
 
   def run(self):
     """Run sudoku UI."""
     key = 0
     # Enable mouse click.
     curses.mousemask(1)
+    # Generates sudokus in the background and cache them, so a new sudoku is
+    # ready when it is really needed.
+    self.generator.start_background_generation()
     self._initialize_sudoku()
 
     while key != ord('q'):
-      self._process_key(key)
+      # No key is pressed before the timeout.
+      if key != -1:
+        self._process_key(key)
+      if self.pending_level is not None:
+        self._take_pending_sudoku()
       self._draw_board()
-      # Generates a sudoku every turn in the background and cache them to make
-      # it faster when a new sudoku is really needed.
-      self.generator.generate_sudoku()
-      # Get the input key.
+      # Get the input key, waiting for the new sudoku to be generated if any.
+      if self.pending_level is not None:
+        self.stdscr.timeout(_GENERATING_TIMEOUT)
+      else:
+        self.stdscr.timeout(-1)
       key = self.stdscr.getch()
+    self.generator.stop_background_generation()
+    if self.bank is not None:
+      self.bank.close()
 
 
 def _run_sudoku(stdscr):
@@ -0,0 +1,155 @@
+"""Vectorized checks of many sudokus at once with NumPy.
+
+NumPy is optional. Without it the checks fall back to SudokuData.is_valid and
+SudokuData.is_solved one sudoku at a time. Sudokus of different sizes are
+checked in a group for every size.
+"""
+
+import math
+import sudoku_data
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+
+def _calculate_codes(geometry):
+  """Calculates the table translating character codes to packed codes."""
+  # A value that is neither a space nor a number has the code size + 1.
+  codes = bytearray([geometry.size + 1] * 256)
+  codes[ord(' ')] = 0
+  for i, symbol in enumerate(geometry.symbols):
+    codes[ord(symbol)] = i + 1
+  return bytes(codes)
+
+
+# Tables translating the character codes of SudokuData.to_bytes() to the codes
+# in a packed sudoku, for every size.
+_CODES = {
+    sudoku_data.get_geometry(box_size).size:
+    _calculate_codes(sudoku_data.get_geometry(box_size))
+    for box_size in sudoku_data.BOX_SIZES
+}
+
+
+def has_numpy():
+  """Whether the vectorized checks are available."""
+  return numpy is not None
+
+
+def pack_sudokus(sudokus):
+  """Packs sudokus of the same size into an array of shape (N, size, size).
+
+  Args:
+    sudokus: A list of sudoku_data.SudokuData. An empty list is packed as
+      sudokus with a box size of 3.
+
+  Returns:
+    An array of uint8 where a space is 0, a number is its index in the symbols
+      plus 1, and any other value is size + 1.
+
+  Raises:
+    RuntimeError: If NumPy is not available.
+    ValueError: If the sudokus have different sizes.
+  """
+  if numpy is None:
+    raise RuntimeError('NumPy is not available.')
+  sizes = {sudoku.size for sudoku in sudokus}
+  if len(sizes) > 1:
+    raise ValueError('The sudokus have different sizes {}.'.format(
+        sorted(sizes)))
+  size = sizes.pop() if sizes else 9
+  codes = b''.join(sudoku.to_bytes() for sudoku in sudokus).translate(
+      _CODES[size])
+  return numpy.frombuffer(codes, dtype=numpy.uint8).reshape(-1, size, size)
+
+
+def _has_duplicates(bits, axis):
+  """Whether any region along an axis has a number more than once.
+
+  A region has no duplicates if and only if the sum of the bits of its numbers
+  equals their bitwise or.
+  """
+  return (bits.sum(axis=axis, dtype=numpy.uint32) != numpy.bitwise_or.reduce(
+      bits, axis=axis)).any(axis=1)
+
+
+def _check_packed(grids):
+  """Checks packed sudokus.
+
+  Args:
+    grids: An array of shape (N, size, size) returned by pack_sudokus().
+
+  Returns:
+    A tuple of two boolean arrays of shape (N,), whether every sudoku is valid
+      and whether it is solved.
+  """
+  nr_sudokus, size = grids.shape[:2]
+  box_size = math.isqrt(size)
+  # A space has no bit and a number n has bit n.
+  bits = numpy.left_shift(numpy.uint32(1), grids, dtype=numpy.uint32)
+  bits[grids == 0] = 0
+  # Move the locations of every box into a row.
+  boxes = bits.reshape(nr_sudokus, box_size, box_size, box_size,
+                       box_size).transpose(0, 1, 3, 2, 4)
+  boxes = boxes.reshape(nr_sudokus, size, size)
+  valid = ((grids <= size).all(axis=(1, 2)) & ~_has_duplicates(bits, 2) &
+           ~_has_duplicates(bits, 1) & ~_has_duplicates(boxes, 2))
+  solved = valid & (grids != 0).all(axis=(1, 2))
+  return valid, solved
+
+
+def _check_many(sudokus):
+  """Checks sudokus of any sizes, grouped by size.
+
+  Args:
+    sudokus: A list of sudoku_data.SudokuData, or an array returned by
+      pack_sudokus().
+
+  Returns:
+    Same as _check_packed(), in the order of the sudokus.
+  """
+  if isinstance(sudokus, numpy.ndarray):
+    return _check_packed(sudokus)
+  indexes_by_size = {}
+  for index, sudoku in enumerate(sudokus):
+    indexes_by_size.setdefault(sudoku.size, []).append(index)
+  if len(indexes_by_size) <= 1:
+    return _check_packed(pack_sudokus(sudokus))
+  valid = numpy.zeros(len(sudokus), dtype=bool)
+  solved = numpy.zeros(len(sudokus), dtype=bool)
+  for indexes in indexes_by_size.values():
+    valid[indexes], solved[indexes] = _check_packed(
+        pack_sudokus([sudokus[index] for index in indexes]))
+  return valid, solved
+
+
+def is_valid_many(sudokus):
+  """Checks whether many sudokus are valid, see SudokuData.is_valid.
+
+  Args:
+    sudokus: A list of sudoku_data.SudokuData of any sizes, or an array
+      returned by pack_sudokus().
+
+  Returns:
+    A boolean array, or a list of booleans if NumPy is not available.
+  """
+  if numpy is None:
+    return [sudoku.is_valid() for sudoku in sudokus]
+  return _check_many(sudokus)[0]
+
+
+def is_solved_many(sudokus):
+  """Checks whether many sudokus are solved, see SudokuData.is_solved.
+
+  Args:
+    sudokus: A list of sudoku_data.SudokuData of any sizes, or an array
+      returned by pack_sudokus().
+
+  Returns:
+    A boolean array, or a list of booleans if NumPy is not available.
+  """
+  if numpy is None:
+    return [sudoku.is_solved() for sudoku in sudokus]
+  return _check_many(sudokus)[1]
@@ -0,0 +1,75 @@
+import os
+import solver_test
+import sudoku_data
+import sudoku_solver
+import sudoku_vectorized
+
+
+def test_checks(name, sudokus, check_many, check):
+  results = [bool(result) for result in check_many(sudokus)]
+  expected_results = [check(sudoku) for sudoku in sudokus]
+  if results != expected_results:
+    print('Mismatch found for {}.'.format(name))
+    print('Expected results: {}'.format(expected_results))
+    print('Actual results: {}'.format(results))
+    raise RuntimeError('Testing failed.')
+  print('Tests of {} passed.'.format(name))
+
+
+def test_box_sizes(sudokus):
+  solver = sudoku_solver.SudokuSolver()
+  other_sudokus = []
+  for box_size in (2, 4, 5):
+    empty = sudoku_data.SudokuData(box_size)
+    solved = empty.clone()
+    solver.solve(solved, engine='bitmask')
+    duplicate = solved.clone()
+    duplicate.set(0, 1, solved.get(0, 0))
+    invalid = empty.clone()
+    invalid.set(1, 1, '0')
+    other_sudokus.extend([empty, solved, duplicate, invalid])
+  # As many sudokus as cells of a sudoku of box size 3.
+  small_sudokus = other_sudokus[:4] * 20 + other_sudokus[:1]
+  mixed_sudokus = sudokus + other_sudokus
+  for name, sudokus in (('small', small_sudokus), ('mixed', mixed_sudokus)):
+    test_checks('is_valid_many with {} sudokus'.format(name), sudokus,
+                sudoku_vectorized.is_valid_many,
+                lambda sudoku: sudoku.is_valid())
+    test_checks('is_solved_many with {} sudokus'.format(name), sudokus,
+                sudoku_vectorized.is_solved_many,
+                lambda sudoku: sudoku.is_solved())
+  packed = sudoku_vectorized.pack_sudokus(other_sudokus[4:8])
+  if packed.shape != (4, 16, 16):
+    raise RuntimeError('Testing failed, packed shape {}.'.format(packed.shape))
+  try:
+    sudoku_vectorized.pack_sudokus(mixed_sudokus)
+    raise RuntimeError('Testing failed, sudokus of different sizes packed.')
+  except ValueError:
+    pass
+
+
+def test_vectorized():
+  if not sudoku_vectorized.has_numpy():
+    print('NumPy is not available, skip vectorized tests.')
+    return
+  data_path = 'python_sudoku/test_data'
+  if not os.path.exists(data_path):
+    data_path = 'test_data'
+    if not os.path.exists(data_path):
+      raise RuntimeError('No test_data directory found.')
+  sudokus = []
+  for path in [os.path.join(data_path, 'partial'),
+               os.path.join(data_path, 'full')]:
+    for file_name in sorted(os.listdir(path)):
+      sudoku, _ = solver_test.read_data_file(os.path.join(path, file_name))
+      sudokus.append(sudoku)
+  test_checks('is_valid_many', sudokus, sudoku_vectorized.is_valid_many,
+              lambda sudoku: sudoku.is_valid())
+  test_checks('is_solved_many', sudokus, sudoku_vectorized.is_solved_many,
+              lambda sudoku: sudoku.is_solved())
+  packed = sudoku_vectorized.pack_sudokus(sudokus)
+  test_checks('is_valid_many with packed sudokus', sudokus,
+              lambda _: sudoku_vectorized.is_valid_many(packed),
+              lambda sudoku: sudoku.is_valid())
+  test_box_sizes(sudokus)
+  print('All tests passed.')